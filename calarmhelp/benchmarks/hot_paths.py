@@ -0,0 +1,264 @@
+"""
+Benchmarks for the pure-Python work done on every `/create_alarm` request.
+
+Each setup function builds its inputs once and returns the callable that is timed. Iteration
+counts are sized so one repeat takes roughly 50-200ms on a laptop.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Callable
+from zoneinfo import ZoneInfo
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from haystack import Pipeline, component, tracing
+from haystack.components.builders import PromptBuilder
+
+from calarmhelp.benchmarks.runner import benchmark
+from calarmhelp.services.calendarAlarmService import (
+    CalendarAlarmServicePipeline,
+    StageTimingTracer,
+    check_alarm_reply,
+    create_alarm_readout,
+    load_prompt_template,
+)
+from calarmhelp.services.extractionCache import normalize_input
+from calarmhelp.services.fastPathParser import FastPathParser
+from calarmhelp.services.traceExporter import TraceExporter, TraceRecorder
+from calarmhelp.services.util.util import (
+    AlarmBatchResult,
+    CalendarAlarmResponse,
+    Category,
+    GoogleCalendarInfoInput,
+    GoogleCalendarResponse,
+)
+
+USER_INPUT = "Respond to Tom at 5PM tomorrow with a 5 minute reminder."
+
+
+def sample_alarm() -> CalendarAlarmResponse:
+    now = datetime.now(ZoneInfo("America/New_York"))
+    event_time = now.replace(hour=17, minute=0, second=0, microsecond=0) + timedelta(
+        days=1
+    )
+    return CalendarAlarmResponse(
+        name="Respond to Tom",
+        category=Category.WORK,
+        lead_time=5,
+        event_time=event_time,
+        event_time_end=event_time + timedelta(minutes=30),
+        location="office",
+        error=False,
+        current_time=now,
+    )
+
+
+def sample_reply() -> str:
+    """An LLM reply as it arrives from the generator, wrapped in a markdown code block."""
+    return f"```json\n{sample_alarm().model_dump_json(indent=4)}\n```"
+
+
+@benchmark(iterations=20_000)
+def bench_create_alarm_readout():
+    alarm = sample_alarm()
+    return lambda: create_alarm_readout(alarm)
+
+
+@benchmark(iterations=200_000)
+def bench_clean_json_output():
+    # cleanJsonOutput does not use the instance, so skip building a pipeline
+    pipeline = object.__new__(CalendarAlarmServicePipeline)
+    reply = sample_reply()
+    return lambda: pipeline.cleanJsonOutput(reply)
+
+
+@benchmark(iterations=50_000)
+def bench_model_validate_json():
+    reply = sample_alarm().model_dump_json()
+    return lambda: CalendarAlarmResponse.model_validate_json(reply)
+
+
+@benchmark(iterations=20_000)
+def bench_check_alarm_reply():
+    reply = sample_reply()
+    return lambda: check_alarm_reply(reply)
+
+
+@benchmark(iterations=50_000)
+def bench_calendar_alarm_response_to_dict():
+    alarm = sample_alarm()
+    return alarm.to_dict
+
+
+@benchmark(iterations=20_000)
+def bench_calendar_info_input_to_json():
+    alarm = sample_alarm()
+    info = GoogleCalendarInfoInput(response=create_alarm_readout(alarm), theJson=alarm)
+    return info.to_json
+
+
+@benchmark(iterations=50_000)
+def bench_google_calendar_response_to_dict():
+    response = GoogleCalendarResponse(success="Event Created")
+    return response.to_dict
+
+
+@benchmark(iterations=50_000)
+def bench_google_calendar_response_to_json():
+    response = GoogleCalendarResponse(success="Event Created")
+    return response.to_json
+
+
+@benchmark(iterations=200_000)
+def bench_google_calendar_response_attribute_access():
+    response = GoogleCalendarResponse(success="Event Created")
+
+    def access():
+        response["error"]
+        response.success
+        response.error
+
+    return access
+
+
+@benchmark(iterations=200_000)
+def bench_google_calendar_response_create():
+    return lambda: GoogleCalendarResponse(success="Event Created")
+
+
+def sample_batch() -> AlarmBatchResult:
+    """A full `/create_alarms` batch: 48 alarms and two errors."""
+    alarm = sample_alarm()
+    info = GoogleCalendarInfoInput(response=create_alarm_readout(alarm), theJson=alarm)
+    errors = [GoogleCalendarResponse(error="Calendar not found")] * 2
+    return AlarmBatchResult([info] * 48 + errors)
+
+
+# The *_response_generic benchmarks render a body the way FastAPI renders a returned dict, the
+# *_response_bytes ones the way /create_alarm and /create_alarms render their typed results
+
+
+@benchmark(iterations=10_000)
+def bench_alarm_response_generic():
+    alarm = sample_alarm()
+    info = GoogleCalendarInfoInput(response=create_alarm_readout(alarm), theJson=alarm)
+    return lambda: JSONResponse(jsonable_encoder(info.to_dict()))
+
+
+@benchmark(iterations=50_000)
+def bench_alarm_response_bytes():
+    alarm = sample_alarm()
+    info = GoogleCalendarInfoInput(response=create_alarm_readout(alarm), theJson=alarm)
+    return lambda: Response(info.to_json_bytes(), media_type="application/json")
+
+
+@benchmark(iterations=300)
+def bench_batch_response_generic():
+    batch = sample_batch()
+    return lambda: JSONResponse(jsonable_encoder(batch.to_dict()))
+
+
+@benchmark(iterations=2_000)
+def bench_batch_response_bytes():
+    batch = sample_batch()
+    return lambda: Response(batch.to_json_bytes(), media_type="application/json")
+
+
+@benchmark(iterations=5_000)
+def bench_render_extraction_prompt():
+    builder = PromptBuilder(template=load_prompt_template())
+    prompt_input = {
+        "user_input": USER_INPUT,
+        "current_time": datetime.now(ZoneInfo("America/New_York")).isoformat(),
+    }
+    return lambda: builder.run(input=prompt_input)
+
+
+@benchmark(iterations=5_000)
+def bench_render_validation_prompt():
+    builder = PromptBuilder(template=load_prompt_template())
+    prompt_input = {
+        "user_input": USER_INPUT,
+        "current_time": datetime.now(ZoneInfo("America/New_York")).isoformat(),
+    }
+    reply = sample_reply()
+    return lambda: builder.run(
+        input=prompt_input,
+        properties_to_validate=reply,
+        validation_errors="- event_time_end must be after event_time",
+    )
+
+
+@benchmark(iterations=2_000)
+def bench_fast_path_parse():
+    parser = FastPathParser()
+    now = datetime.now(ZoneInfo("America/New_York")).replace(hour=9)
+    return lambda: parser.parse(USER_INPUT, now=now)
+
+
+@benchmark(iterations=100_000)
+def bench_normalize_input():
+    return lambda: normalize_input(USER_INPUT)
+
+
+@component
+class CannedGenerator:
+    """Stands in for the LLM, so only the pipeline and its tracing are timed."""
+
+    def __init__(self, reply: str):
+        self.reply = reply
+
+    @component.output_types(replies=list[str], meta=list[dict[str, Any]])
+    def run(self, prompt: str):
+        return {"replies": [self.reply], "meta": [{"model": "canned"}]}
+
+
+def pipeline_run(sample_rate: float, traced: bool = True) -> Callable[[], Any]:
+    """
+    Runs the prompt builder and a canned generator with the tracers a request uses.
+
+    Traces go to a sink that discards them, so the time is what tracing costs the request:
+    recording the spans and queueing the trace, not the upload.
+    """
+    recorder = TraceRecorder(
+        TraceExporter(lambda: lambda trace: None, sample_rate=sample_rate)
+    )
+    tracing.enable_tracing(StageTimingTracer(recorder))
+
+    pipeline = Pipeline()
+    pipeline.add_component("prompt_builder", PromptBuilder(load_prompt_template()))
+    pipeline.add_component("generator", CannedGenerator(sample_reply()))
+    pipeline.connect("prompt_builder.prompt", "generator.prompt")
+    data = {
+        "prompt_builder": {
+            "input": {
+                "user_input": USER_INPUT,
+                "current_time": datetime.now(ZoneInfo("America/New_York")).isoformat(),
+            }
+        }
+    }
+
+    if not traced:
+        return lambda: pipeline.run(data)
+
+    def run():
+        with recorder.record("Calendar Alarm Service", USER_INPUT):
+            pipeline.run(data)
+
+    return run
+
+
+@benchmark(iterations=2_000)
+def bench_pipeline_run_untraced():
+    return pipeline_run(sample_rate=0.0, traced=False)
+
+
+@benchmark(iterations=2_000)
+def bench_pipeline_run_traced():
+    return pipeline_run(sample_rate=1.0)
+
+
+@benchmark(iterations=2_000)
+def bench_pipeline_run_sampled_out():
+    # Still recorded, as errors are traced whether sampled or not
+    return pipeline_run(sample_rate=0.0)
@@ -0,0 +1,199 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+DEFAULT_REPEAT = 5
+
+REGRESSION_THRESHOLD = 0.2
+# A benchmark whose median is more than 20% slower than the baseline counts as a regression.
+
+
+@dataclass
+class Benchmark:
+    """
+    One timed operation.
+
+    #### Attributes:
+    ```
+    name (str):
+    ```The key the results are stored under.
+    ```
+    setup (Callable[[], Callable[[], Any]]):
+    ```Prepares the inputs outside the timed region and returns the zero-argument callable to time.
+    ```
+    iterations (int):
+    ```Calls per repeat. Sized so one repeat takes tens to hundreds of milliseconds.
+    """
+
+    name: str
+    setup: Callable[[], Callable[[], Any]]
+    iterations: int
+
+
+registry: list[Benchmark] = []
+
+
+def benchmark(iterations: int):
+    """
+    Registers the decorated setup function as a benchmark named after it, minus a `bench_` prefix.
+
+    Args:
+        iterations (int): Calls per repeat.
+    """
+
+    def register(setup: Callable[[], Callable[[], Any]]):
+        name = setup.__name__.removeprefix("bench_")
+        registry.append(Benchmark(name, setup, iterations))
+        return setup
+
+    return register
+
+
+def run_benchmarks(
+    benchmarks: list[Benchmark],
+    repeat: int = DEFAULT_REPEAT,
+    scale: float = 1.0,
+    log: Callable[[str], None] = print,
+) -> dict[str, Any]:
+    """
+    Times every benchmark and returns the results in the format written to disk.
+
+    Args:
+        benchmarks (list[Benchmark]): The benchmarks to run.
+        repeat (int, optional): Timed repeats per benchmark. The best and median are reported.
+        scale (float, optional): Multiplier applied to every iteration count, e.g. 0.1 for a quick run.
+        log (Callable[[str], None], optional): Receives one line per finished benchmark.
+
+    Returns:
+        dict[str, Any]: Run metadata and, per benchmark, the time per call in microseconds and the
+        peak memory one call allocates, in bytes.
+    """
+    results: dict[str, Any] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmarks": {},
+    }
+
+    for bench in benchmarks:
+        func = bench.setup()
+        iterations = max(1, int(bench.iterations * scale))
+        func()  # Warm up caches and lazy imports outside the timed repeats
+
+        timings = timeit.Timer(func).repeat(repeat=repeat, number=iterations)
+        per_call_us = [timing / iterations * 1_000_000 for timing in timings]
+        median_us = statistics.median(per_call_us)
+
+        # Traced apart from the timed repeats, as tracing slows every allocation down
+        tracemalloc.start()
+        try:
+            func()
+            peak_alloc_bytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        results["benchmarks"][bench.name] = {
+            "iterations": iterations,
+            "repeat": repeat,
+            "best_us": min(per_call_us),
+            "median_us": median_us,
+            "ops_per_sec": 1_000_000 / median_us if median_us else float("inf"),
+            "peak_alloc_bytes": peak_alloc_bytes,
+        }
+        log(
+            f"{bench.name:<44} {median_us:>10.2f} us/call {peak_alloc_bytes:>9} B peak  "
+            f"({iterations} x {repeat})"
+        )
+
+    return results
+
+
+def compare_results(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    threshold: float = REGRESSION_THRESHOLD,
+) -> list[str]:
+    """
+    Lists the benchmarks whose median got slower than the baseline by more than `threshold`.
+
+    Args:
+        current (dict[str, Any]): Results of this run.
+        baseline (dict[str, Any]): Results of an earlier run, as written by `run_benchmarks`.
+        threshold (float, optional): Allowed relative slowdown. Defaults to 0.2.
+
+    Returns:
+        list[str]: One line per regression. Empty when nothing regressed.
+    """
+    regressions = []
+
+    for name, result in current["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if previous is None or not previous["median_us"]:
+            continue
+
+        change = result["median_us"] / previous["median_us"] - 1
+        if change > threshold:
+            regressions.append(
+                f"{name}: {previous['median_us']:.2f} -> {result['median_us']:.2f} us/call (+{change:.0%})"
+            )
+
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Command line entry point. Runs the hot path benchmarks and writes the results as JSON.
+
+    Args:
+        argv (list[str], optional): Command line arguments. Defaults to `sys.argv[1:]`.
+
+    Returns:
+        int: 1 if `--compare` found a regression, 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmarks for the CPU-side work done per request."
+    )
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Results file.")
+    parser.add_argument(
+        "--compare", help="Earlier results file to check for regressions against."
+    )
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="Multiplier for iteration counts."
+    )
+    parser.add_argument(
+        "--filter", default="", help="Only run benchmarks whose name contains this."
+    )
+    args = parser.parse_args(argv)
+
+    # Registers the benchmarks
+    import calarmhelp.benchmarks.hot_paths  # noqa: F401
+
+    selected = [bench for bench in registry if args.filter in bench.name]
+    results = run_benchmarks(selected, repeat=args.repeat, scale=args.scale)
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare_results(results, json.load(file), args.threshold)
+
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+
+        if regressions:
+            return 1
+
+    return 0
@@ -0,0 +1,170 @@
+import json
+import re
+import uuid
+from email.parser import BytesParser
+from http import HTTPStatus
+from typing import Any, Optional
+from urllib.parse import unquote, urlsplit
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+from calarmhelp.fakes.server import FakeBehaviour
+
+EVENTS_PATH_RE = re.compile(r"^/calendar/v3/calendars/([^/]+)/events$")
+
+
+def error_body(status: int, message: str) -> dict[str, Any]:
+    """Builds an error in the shape googleapiclient turns into an `HttpError`."""
+    return {
+        "error": {
+            "code": status,
+            "message": message,
+            "errors": [{"domain": "global", "reason": message, "message": message}],
+        }
+    }
+
+
+def create_calendar_app(
+    behaviour: Optional[FakeBehaviour] = None,
+    calendars: Optional[set[str]] = None,
+    event_reply: Optional[dict[str, Any]] = None,
+) -> FastAPI:
+    """
+    Builds a stand-in for the parts of the Google Calendar v3 API the app uses.
+
+    Point the app at it with `GOOGLE_CALENDAR_ROOT_URL=<url>/`. Calendar lookups, single
+    inserts and batch inserts are served. In a batch, each insert gets its own latency and
+    error roll, like the real API. An insert whose client-supplied id already exists in the
+    calendar gets 409, as from Google, so resent inserts are not stored twice.
+
+    Args:
+        behaviour (FakeBehaviour, optional): Latency and error injection. Defaults to `FAKE_CALENDAR_*` variables.
+        calendars (set[str], optional): Calendar ids that exist. Defaults to every id.
+        event_reply (dict[str, Any], optional): Fields added to every created event, after the request body.
+
+    Returns:
+        FastAPI: The fake server. `app.state.events` holds the created events.
+    """
+    behaviour = behaviour or FakeBehaviour.from_env("FAKE_CALENDAR")
+
+    app = FastAPI(title="Fake Google Calendar")
+    app.state.events = []
+    event_ids: set[tuple[str, str]] = set()
+
+    def calendar_exists(calendar_id: str) -> bool:
+        return calendars is None or calendar_id in calendars
+
+    def injected_failure() -> Optional[tuple[int, dict[str, Any]]]:
+        if behaviour.should_fail():
+            return behaviour.error_status, error_body(
+                behaviour.error_status, "Injected failure"
+            )
+        return None
+
+    def insert_event(
+        calendar_id: str, event: dict[str, Any]
+    ) -> tuple[int, dict[str, Any]]:
+        failure = injected_failure()
+        if failure is not None:
+            return failure
+
+        if not calendar_exists(calendar_id):
+            return 404, error_body(404, "Not Found")
+
+        if (calendar_id, event.get("id")) in event_ids:
+            return 409, error_body(409, "The requested identifier already exists.")
+
+        created = {
+            "kind": "calendar#event",
+            "id": uuid.uuid4().hex,
+            "status": "confirmed",
+            "htmlLink": f"https://calendar.example/event?eid={calendar_id}",
+            **event,
+            **(event_reply or {}),
+        }
+        event_ids.add((calendar_id, created["id"]))
+        app.state.events.append(created)
+        return 200, created
+
+    @app.get("/calendar/v3/calendars/{calendar_id}")
+    async def get_calendar(calendar_id: str) -> JSONResponse:
+        await behaviour.wait()
+
+        failure = injected_failure()
+        if failure is not None:
+            return JSONResponse(status_code=failure[0], content=failure[1])
+
+        if not calendar_exists(calendar_id):
+            return JSONResponse(status_code=404, content=error_body(404, "Not Found"))
+
+        return JSONResponse(
+            {
+                "kind": "calendar#calendar",
+                "id": calendar_id,
+                "summary": "Fake calendar",
+                "timeZone": "America/New_York",
+            }
+        )
+
+    @app.get("/calendar/v3/users/me/calendarList")
+    async def list_calendars() -> JSONResponse:
+        await behaviour.wait()
+        return JSONResponse(
+            {
+                "kind": "calendar#calendarList",
+                "items": [
+                    {"id": calendar_id, "summary": "Fake calendar"}
+                    for calendar_id in sorted(calendars or {"primary"})
+                ],
+            }
+        )
+
+    @app.post("/calendar/v3/calendars/{calendar_id}/events")
+    async def create_event(calendar_id: str, request: Request) -> JSONResponse:
+        await behaviour.wait()
+        status, body = insert_event(calendar_id, await request.json())
+        return JSONResponse(status_code=status, content=body)
+
+    @app.post("/batch/calendar/v3")
+    async def batch(request: Request) -> Response:
+        # See https://developers.google.com/calendar/api/guides/batch for the wire format
+        content_type = request.headers["content-type"]
+        message = BytesParser().parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + await request.body()
+        )
+
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+
+        for part in message.get_payload():
+            await behaviour.wait()
+
+            raw_request = part.get_payload()
+            head, _, body = re.split(r"(\r?\n\r?\n)", raw_request, maxsplit=1)
+            method, target, _ = head.splitlines()[0].split(" ", 2)
+            match = EVENTS_PATH_RE.match(urlsplit(target).path)
+
+            if method == "POST" and match:
+                status, response = insert_event(
+                    unquote(match.group(1)), json.loads(body or "{}")
+                )
+            else:
+                status, response = 404, error_body(404, "Not Found")
+
+            content_id = part["Content-ID"].strip("<>")
+            parts.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(response)}\r\n"
+            )
+
+        return Response(
+            content="".join(parts) + f"--{boundary}--\r\n",
+            media_type=f"multipart/mixed; boundary={boundary}",
+        )
+
+    return app
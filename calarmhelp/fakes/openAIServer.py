@@ -0,0 +1,178 @@
+import itertools
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from string import Template
+from typing import Any, Optional
+from zoneinfo import ZoneInfo
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from calarmhelp.fakes.server import FakeBehaviour
+
+EVENT_TIMEZONE = ZoneInfo("America/New_York")
+
+DEFAULT_REPLY = json.dumps(
+    {
+        "name": "Respond to Tom",
+        "category": "always",
+        "lead_time": 5,
+        "event_time": "$event_time",
+        "event_time_end": "$event_time_end",
+        "location": None,
+        "error": False,
+        "current_time": "$current_time",
+    },
+    indent=4,
+)
+# Placeholders are filled per request so the event is always tomorrow at 5PM and passes validation.
+
+CHARS_PER_TOKEN = 4
+
+PROMPT_CACHE_BLOCK = 128 * CHARS_PER_TOKEN
+PROMPT_CACHE_MINIMUM = 1024 * CHARS_PER_TOKEN
+# OpenAI caches prompts of at least 1024 tokens, in 128 token increments.
+
+
+def render_reply(template: str, now: Optional[datetime] = None) -> str:
+    """
+    Fills `$event_time`, `$event_time_end` and `$current_time` in a canned reply.
+
+    Args:
+        template (str): The canned reply.
+        now (datetime, optional): The current time. Defaults to now in `America/New_York`.
+
+    Returns:
+        str: The reply with the event set to tomorrow at 5PM, ending 30 minutes later.
+    """
+    now = now or datetime.now(EVENT_TIMEZONE)
+    event_time = (now + timedelta(days=1)).replace(
+        hour=17, minute=0, second=0, microsecond=0
+    )
+    return Template(template).safe_substitute(
+        event_time=event_time.isoformat(),
+        event_time_end=(event_time + timedelta(minutes=30)).isoformat(),
+        current_time=now.isoformat(),
+    )
+
+
+class PromptCacheSimulator:
+    """
+    Approximates OpenAI prompt caching so `cached_tokens` reacts to prompt layout changes.
+
+    A prompt counts as cached up to the longest prefix, in 128 token blocks, that an earlier
+    prompt also started with, once that prefix reaches 1024 tokens.
+    """
+
+    def __init__(self):
+        self._seen: set[int] = set()
+
+    def cached_tokens(self, prompt: str) -> int:
+        cached_chars = 0
+        still_cached = True
+
+        for end in range(PROMPT_CACHE_BLOCK, len(prompt) + 1, PROMPT_CACHE_BLOCK):
+            key = hash(prompt[:end])
+            if still_cached and key in self._seen:
+                cached_chars = end
+            else:
+                still_cached = False
+            self._seen.add(key)
+
+        if cached_chars < PROMPT_CACHE_MINIMUM:
+            return 0
+        return cached_chars // CHARS_PER_TOKEN
+
+
+def load_replies_from_env() -> Optional[list[str]]:
+    """Reads canned replies from the JSON list in the file named by `FAKE_OPENAI_REPLIES`."""
+    path = os.getenv("FAKE_OPENAI_REPLIES")
+    if not path:
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def create_openai_app(
+    behaviour: Optional[FakeBehaviour] = None,
+    replies: Optional[list[str]] = None,
+) -> FastAPI:
+    """
+    Builds a stand-in for the OpenAI chat completions API.
+
+    Point the app at it with `OPENAI_BASE_URL=<url>/v1`. Replies are served in order and
+    repeat once exhausted, so a sequence like `["not json", DEFAULT_REPLY]` exercises one
+    validation loop per alarm.
+
+    Args:
+        behaviour (FakeBehaviour, optional): Latency and error injection. Defaults to `FAKE_OPENAI_*` variables.
+        replies (list[str], optional): Canned replies. Defaults to `FAKE_OPENAI_REPLIES`, then `DEFAULT_REPLY`.
+
+    Returns:
+        FastAPI: The fake server.
+    """
+    behaviour = behaviour or FakeBehaviour.from_env("FAKE_OPENAI")
+    reply_cycle = itertools.cycle(replies or load_replies_from_env() or [DEFAULT_REPLY])
+    prompt_cache = PromptCacheSimulator()
+
+    app = FastAPI(title="Fake OpenAI")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> JSONResponse:
+        body: dict[str, Any] = await request.json()
+        app.state.requests += 1
+        await behaviour.wait()
+
+        if behaviour.should_fail():
+            return JSONResponse(
+                status_code=behaviour.error_status,
+                content={
+                    "error": {
+                        "message": "Injected failure",
+                        "type": "server_error",
+                        "param": None,
+                        "code": None,
+                    }
+                },
+            )
+
+        prompt = "".join(
+            message.get("content") or "" for message in body.get("messages", [])
+        )
+        content = render_reply(next(reply_cycle))
+        if "response_format" not in body:
+            content = f"```json\n{content}\n```"
+
+        prompt_tokens = len(prompt) // CHARS_PER_TOKEN
+        completion_tokens = len(content) // CHARS_PER_TOKEN
+
+        return JSONResponse(
+            {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                        "logprobs": None,
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                    "prompt_tokens_details": {
+                        "cached_tokens": prompt_cache.cached_tokens(prompt)
+                    },
+                },
+            }
+        )
+
+    return app
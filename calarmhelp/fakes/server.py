@@ -0,0 +1,138 @@
+import asyncio
+import os
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI
+
+
+@dataclass
+class FakeBehaviour:
+    """
+    How a fake backend misbehaves.
+
+    #### Attributes:
+    ```
+    latency (float):
+    ```Seconds every response is delayed by.
+    ```
+    jitter (float):
+    ```Extra delay, uniformly drawn from 0 to `jitter` seconds per response.
+    ```
+    error_rate (float):
+    ```Probability, from 0 to 1, that a request fails with `error_status`.
+    ```
+    error_status (int):
+    ```The HTTP status of injected failures. 500 and 503 are retried by the real clients, 429 is rate limiting.
+    ```
+    seed (int | None):
+    ```Seeds jitter and error injection so a run can be reproduced.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    seed: Optional[int] = None
+    _random: random.Random = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "FakeBehaviour":
+        """
+        Reads `<prefix>_LATENCY`, `_JITTER`, `_ERROR_RATE`, `_ERROR_STATUS` and `_SEED`.
+
+        Args:
+            prefix (str): The environment variable prefix, e.g. `FAKE_OPENAI`.
+
+        Returns:
+            FakeBehaviour: The configured behaviour. Unset variables keep their defaults.
+        """
+        seed = os.getenv(f"{prefix}_SEED")
+        return cls(
+            latency=float(os.getenv(f"{prefix}_LATENCY", 0.0)),
+            jitter=float(os.getenv(f"{prefix}_JITTER", 0.0)),
+            error_rate=float(os.getenv(f"{prefix}_ERROR_RATE", 0.0)),
+            error_status=int(os.getenv(f"{prefix}_ERROR_STATUS", 500)),
+            seed=int(seed) if seed is not None else None,
+        )
+
+    def delay(self) -> float:
+        """Returns the delay for one response."""
+        return self.latency + (
+            self._random.uniform(0, self.jitter) if self.jitter else 0
+        )
+
+    def should_fail(self) -> bool:
+        """Decides whether one request fails."""
+        return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    async def wait(self):
+        """Sleeps for one response's delay without blocking the fake's event loop."""
+        delay = self.delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def free_port(host: str = "127.0.0.1") -> int:
+    """Returns a TCP port that is free on `host` right now."""
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """
+    Serves a FastAPI app with uvicorn on a background thread, for tests and load tests.
+
+    Example:
+    ```
+    with BackgroundServer(create_openai_app()) as server:
+        os.environ["OPENAI_BASE_URL"] = f"{server.url}/v1"
+    ```
+
+    #### Attributes:
+    ```
+    url (str):
+    ```The base URL the app is served on, without a trailing slash.
+    """
+
+    def __init__(self, app: FastAPI, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port or free_port(host)
+        self.url = f"http://{host}:{self.port}"
+        self._server = uvicorn.Server(
+            uvicorn.Config(
+                app, host=host, port=self.port, log_level="warning", lifespan="off"
+            )
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def start(self, timeout: float = 10.0):
+        """Starts serving and waits until the server accepts connections."""
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+
+        while not self._server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"Fake server on {self.url} did not start")
+            time.sleep(0.01)
+
+    def stop(self):
+        """Stops serving and waits for the thread to finish."""
+        self._server.should_exit = True
+        self._thread.join()
+
+    def __enter__(self) -> "BackgroundServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
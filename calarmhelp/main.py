@@ -1,21 +1,74 @@
+import asyncio
+import json
 import logging
+import math
 import os
-from typing import Any
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Union
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, status
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
-from calarmhelp.services.calendarAlarmService import CalendarAlarmServicePipeline
-from calarmhelp.services.googleCalendarService import GoogleCalendarServiceScript
+from calarmhelp.services.concurrency import ALARM_CONCURRENCY, run_blocking
+from calarmhelp.services.extractionCache import ExtractionCache, is_relative_to_now
+from calarmhelp.services.fastPathParser import fast_path_parser
+from calarmhelp.services.jobQueue import JobQueue, JobWorkerPool
+from calarmhelp.services.lazy import LazyImports
+from calarmhelp.services.idempotencyStore import (
+    IdempotencyKeyReused,
+    IdempotencyStore,
+    fingerprint,
+)
+from calarmhelp.services.metrics import CACHE_REQUESTS, ERRORS, registry
+from calarmhelp.services.rateLimiter import RateLimiter, RateLimitExceeded
+from calarmhelp.services.resilience import (
+    CircuitOpenError,
+    breaker_stats,
+    google_calendar_breaker,
+    openai_breaker,
+)
+from calarmhelp.services.googleCalendarService import (
+    GoogleCalendarBatchServiceScript,
+    GoogleCalendarServiceScript,
+    google_calendar_client,
+    warmEventInsert,
+    warmGoogleCalendar,
+)
 from calarmhelp.services.util.util import (
+    AlarmBatchResult,
+    AlarmResult,
     CreateAlarmRequest,
+    CreateAlarmsRequest,
     GoogleCalendarInfoInput,
     GoogleCalendarResponse,
+    create_alarm_readout,
 )
 
 load_dotenv()
 
+# Importing the extraction pipeline loads Haystack and the OpenAI SDK, which dominate cold
+# start, so it is deferred to the warmup
+lazy_imports = LazyImports(
+    globals(),
+    {
+        **{
+            name: f"calarmhelp.services.calendarAlarmService:{name}"
+            for name in (
+                "CalendarAlarmPipelinePool",
+                "CalendarAlarmServicePipeline",
+                "llm_call_stats",
+                "model_tier_stats",
+            )
+        },
+        # The OpenAI SDK, which calendarAlarmService defers in turn
+        "pipeline_lazy_imports": "calarmhelp.services.calendarAlarmService:lazy_imports",
+    },
+)
+__getattr__ = lazy_imports.attribute
+
 if os.getenv("ENVIRONMENT") in ["production", "docker"]:
     logging.basicConfig(
         format="%(levelname)s - %(name)s: %(message)s", level=logging.INFO
@@ -23,7 +76,215 @@ if os.getenv("ENVIRONMENT") in ["production", "docker"]:
 
 loggerGoogleCalendarService = logging.getLogger("Google Calendar Service")
 
-app = FastAPI(docs_url="/")
+PIPELINE_POOL_SIZE = int(os.getenv("PIPELINE_POOL_SIZE", ALARM_CONCURRENCY))
+# Defaults to ALARM_CONCURRENCY if PIPELINE_POOL_SIZE is not set.
+
+PIPELINE_POOL_WARM = int(os.getenv("PIPELINE_POOL_WARM", 2))
+# Defaults to 2 if PIPELINE_POOL_WARM is not set.
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+# Defaults to true if FAST_PATH_ENABLED is not set.
+
+extraction_cache = ExtractionCache(
+    maxsize=int(os.getenv("EXTRACTION_CACHE_SIZE", 1024)),
+    ttl=int(os.getenv("EXTRACTION_CACHE_TTL", 3600)),
+)
+# Set EXTRACTION_CACHE_SIZE=0 to disable the cache.
+
+StoredResult = Union[AlarmResult, AlarmBatchResult, dict[str, Any]]
+# A `/create_alarm` or `/create_alarms` response: typed results, or the queued job in async job mode.
+
+idempotency_store: IdempotencyStore[StoredResult] = IdempotencyStore(
+    maxsize=int(os.getenv("IDEMPOTENCY_STORE_SIZE", 1024)),
+    ttl=int(os.getenv("IDEMPOTENCY_TTL", 86400)),
+)
+# Set IDEMPOTENCY_STORE_SIZE=0 to ignore Idempotency-Key headers.
+
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "loop")
+# Defaults to loop if EXTRACTION_MODE is not set. Set it to structured for one call per alarm.
+
+llm_rate_limiter = RateLimiter(
+    "llm",
+    per_minute=float(os.getenv("RATE_LIMIT_LLM_PER_MINUTE", 0)),
+    burst=int(os.getenv("RATE_LIMIT_LLM_BURST", 10)),
+)
+calendar_rate_limiter = RateLimiter(
+    "calendar",
+    per_minute=float(os.getenv("RATE_LIMIT_CALENDAR_PER_MINUTE", 0)),
+    burst=int(os.getenv("RATE_LIMIT_CALENDAR_BURST", 20)),
+)
+# Both limits default to 0 per minute, which turns them off, with bursts of 10 and 20.
+
+RATE_LIMIT_CLIENT_HEADER = os.getenv("RATE_LIMIT_CLIENT_HEADER", "X-Client-Id")
+# Defaults to X-Client-Id if RATE_LIMIT_CLIENT_HEADER is not set. Clients without it are keyed by address.
+
+STARTUP_WARMUP_MODES = ("blocking", "background")
+
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "blocking")
+# Defaults to blocking if STARTUP_WARMUP is not set. Set it to background to accept requests before the warmup finishes.
+
+JOB_MODES = ("sync", "async")
+
+JOB_MODE = os.getenv("JOB_MODE", "sync")
+# Defaults to sync if JOB_MODE is not set. Set it to async to answer with 202 and a job id.
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "jobs.sqlite3")
+# Defaults to jobs.sqlite3 in the working directory if JOB_QUEUE_PATH is not set.
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+# Defaults to 4 if JOB_WORKERS is not set.
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+# Defaults to 3 if JOB_MAX_ATTEMPTS is not set.
+
+JOB_RETRY_BASE_DELAY = float(os.getenv("JOB_RETRY_BASE_DELAY", 2))
+# Defaults to 2 seconds if JOB_RETRY_BASE_DELAY is not set. The backoff before a job's first retry, doubling on each retry.
+
+JOB_RETRY_MAX_DELAY = float(os.getenv("JOB_RETRY_MAX_DELAY", 300))
+# Defaults to 300 seconds if JOB_RETRY_MAX_DELAY is not set.
+
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 30))
+# Defaults to 30 seconds if JOB_LEASE_SECONDS is not set. A job whose worker stops renewing it is run again after this long.
+
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", 30))
+# Defaults to 30 seconds if SHUTDOWN_DRAIN_TIMEOUT is not set. Alarms still running after it are cut off.
+
+WARMUP_INPUT = "Warm up at 5PM tomorrow with a 5 minute reminder."
+# Rendered into the prompt by the warmup request.
+
+
+def build_calendar_alarm_pipeline() -> "CalendarAlarmServicePipeline":
+    """Factory used by the pipeline pool to build one connected pipeline."""
+    return lazy_imports.get("CalendarAlarmServicePipeline")(
+        max_loops_allowed=10, mode=EXTRACTION_MODE
+    )
+
+
+async def warm_up_request():
+    """
+    Sends a canned alarm through a pooled pipeline and the Google Calendar client, stopping
+    short of the OpenAI call and the event insert, so the first request does not pay for the
+    first run of each stage.
+    """
+    async with app.state.pipeline_pool.acquire() as CalendarService:
+        alarm = await run_blocking(CalendarService.warm_up, WARMUP_INPUT)
+
+    await run_blocking(warmEventInsert, alarm, loggerGoogleCalendarService)
+
+
+async def warm_up(app: FastAPI):
+    """
+    Imports the extraction pipeline, builds the shared pipeline pool, warms the Google Calendar
+    client and calendar metadata, and sends a warmup request through both.
+
+    How long each step took is kept in `app.state.startup_timings`, in seconds.
+
+    Args:
+        app (FastAPI): The application being started.
+    """
+    timings = app.state.startup_timings
+
+    start = time.perf_counter()
+    await run_blocking(lazy_imports.load)
+    await run_blocking(lazy_imports.get("pipeline_lazy_imports").load)
+    timings["pipeline_imports"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    app.state.pipeline_pool = lazy_imports.get("CalendarAlarmPipelinePool")(
+        factory=build_calendar_alarm_pipeline,
+        size=PIPELINE_POOL_SIZE,
+        warm=PIPELINE_POOL_WARM,
+    )
+    await app.state.pipeline_pool.start()
+    timings["pipeline_pool"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        await run_blocking(warmGoogleCalendar, loggerGoogleCalendarService)
+    except Exception as e:
+        loggerGoogleCalendarService.warning(f"Google Calendar client not ready: {e}")
+    timings["google_calendar"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        await warm_up_request()
+    except Exception as e:
+        loggerGoogleCalendarService.warning(f"Warmup request failed: {e}")
+    timings["warmup_request"] = time.perf_counter() - start
+
+    loggerGoogleCalendarService.info(
+        "Warmup done: "
+        + ", ".join(f"{step} {seconds:.3f}s" for step, seconds in timings.items())
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Runs the warmup, then starts refreshing Google credentials in the background.
+
+    With `STARTUP_WARMUP=blocking` no request is served until the warmup is done. With
+    `STARTUP_WARMUP=background` the server accepts requests straight away, which shortens cold
+    starts: requests answered by the fast path or a cache are served at once, and the rest wait
+    for the warmup.
+
+    In async job mode the job workers are started too. On shutdown, which uvicorn begins once
+    the open requests are answered, alarms still being created for disconnected stream clients
+    and running jobs get `SHUTDOWN_DRAIN_TIMEOUT` seconds to finish.
+
+    Args:
+        app (FastAPI): The application being started.
+    """
+    if JOB_MODE not in JOB_MODES:
+        raise ValueError(f"JOB_MODE must be one of {JOB_MODES}, got {JOB_MODE!r}")
+    if STARTUP_WARMUP not in STARTUP_WARMUP_MODES:
+        raise ValueError(
+            f"STARTUP_WARMUP must be one of {STARTUP_WARMUP_MODES}, got {STARTUP_WARMUP!r}"
+        )
+
+    app.state.stopping = False
+    app.state.startup_timings = {}
+    app.state.warmup = asyncio.create_task(warm_up(app))
+    if STARTUP_WARMUP == "blocking":
+        await app.state.warmup
+
+    credential_refresher = asyncio.create_task(google_calendar_client.refresh_forever())
+
+    app.state.job_workers = None
+    if JOB_MODE == "async":
+        app.state.job_workers = JobWorkerPool(
+            JobQueue(JOB_QUEUE_PATH, lease_seconds=JOB_LEASE_SECONDS),
+            run_job,
+            workers=JOB_WORKERS,
+            max_attempts=JOB_MAX_ATTEMPTS,
+            retry_base_delay=JOB_RETRY_BASE_DELAY,
+            retry_max_delay=JOB_RETRY_MAX_DELAY,
+            is_failure=lambda result: not created_anything(result),
+        )
+        app.state.job_workers.start()
+
+    yield
+
+    app.state.stopping = True
+
+    drains = []
+    # Idempotent runs keep going after their client disconnects, like streamed alarms
+    running = _background_tasks | idempotency_store.tasks
+    if running:
+        loggerGoogleCalendarService.info(f"Waiting for {len(running)} alarms to finish")
+        drains.append(asyncio.wait(running, timeout=SHUTDOWN_DRAIN_TIMEOUT))
+    if app.state.job_workers is not None:
+        drains.append(app.state.job_workers.stop(timeout=SHUTDOWN_DRAIN_TIMEOUT))
+    await asyncio.gather(*drains)
+
+    if app.state.job_workers is not None:
+        app.state.job_workers.queue.close()
+
+    app.state.warmup.cancel()
+    credential_refresher.cancel()
+
+
+app = FastAPI(docs_url="/", lifespan=lifespan)
 
 origins = [os.environ["ORIGINS"]]
 app.add_middleware(
@@ -35,34 +296,661 @@ app.add_middleware(
 )
 
 
-@app.post("/create_alarm", status_code=status.HTTP_201_CREATED)
-async def create_alarm(request: CreateAlarmRequest) -> dict[str, Any]:
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(
+    request: Request, error: CircuitOpenError
+) -> JSONResponse:
+    """Answers 503 with Retry-After when a dependency's circuit breaker is open, instead of a 500."""
+    ERRORS.inc(type=type(error).__name__)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=GoogleCalendarResponse(error=str(error)).to_dict(),
+        headers={"Retry-After": str(math.ceil(error.retry_after))},
+    )
+
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_handler(
+    request: Request, error: RateLimitExceeded
+) -> JSONResponse:
+    """Answers 429 with Retry-After when a client has used up a rate limit."""
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content=GoogleCalendarResponse(error=str(error)).to_dict(),
+        headers={"Retry-After": str(math.ceil(error.retry_after))},
+    )
+
+
+def client_identity(request: Request) -> str:
     """
-    Endpoint to create an alarm.
+    Identifies the client for rate limiting: the `RATE_LIMIT_CLIENT_HEADER` header when sent,
+    otherwise the client address. Run uvicorn with `--proxy-headers` behind a load balancer so
+    the address is the caller's rather than the balancer's.
 
     Args:
-        user_input (CreateAlarmRequest): The input provided by the user.
+        request (Request): The incoming request.
+
+    Returns:
+        str: The key of the client's rate limit buckets.
+    """
+    client_id = request.headers.get(RATE_LIMIT_CLIENT_HEADER)
+    if client_id:
+        return f"id:{client_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+_background_tasks: set[asyncio.Task] = set()
+
+AlarmEventListener = Callable[[str, dict[str, Any]], None]
+# Receives stage events such as ("parsed", {...}). May be called from worker threads.
+
+
+def _ignore_event(event: str, data: dict[str, Any]):
+    pass
+
+
+async def extract_alarm(
+    user_input: str,
+    on_event: AlarmEventListener = _ignore_event,
+    client: Optional[str] = None,
+) -> AlarmResult:
+    """
+    Turns user input into the details of a calendar event.
+
+    Inputs the fast path parser recognises are handled locally, and inputs extracted earlier
+    today come from the extraction cache. Everything else goes through a pooled
+    `CalendarAlarmServicePipeline`, after taking a token from the client's LLM bucket.
+
+    Args:
+        user_input (str): The input provided by the user.
+        on_event (AlarmEventListener, optional): Receives a `validation_loop` event per LLM reply.
+        client (str, optional): The client identity. Without it the LLM rate limit is not applied.
 
     Returns:
-        StreamingResponse: A streaming response with the alarm information in JSON format.
+        GoogleCalendarInfoInput | GoogleCalendarResponse: The event details, or an error response.
+
+    Raises:
+        RateLimitExceeded: If the client has used up its LLM bucket.
     """
+    if FAST_PATH_ENABLED:
+        alarm = fast_path_parser.parse(user_input)
+        CACHE_REQUESTS.inc(cache="fast_path", result="miss" if alarm is None else "hit")
+
+        if alarm is not None:
+            loggerGoogleCalendarService.info(
+                f"Parsed by fast path (hit rate {fast_path_parser.hit_rate:.0%})"
+            )
+            return GoogleCalendarInfoInput(
+                response=create_alarm_readout(alarm), theJson=alarm
+            )
+
+    cached = extraction_cache.get(user_input)
+
+    if extraction_cache.enabled and not is_relative_to_now(user_input):
+        CACHE_REQUESTS.inc(
+            cache="extraction", result="miss" if cached is None else "hit"
+        )
+
+    if cached is not None:
+        loggerGoogleCalendarService.info("Extraction served from cache")
+        return cached
+
+    if client is not None:
+        llm_rate_limiter.acquire(client)
+
     loggerGoogleCalendarService.info("Calling Calendar Alarm Service")
 
-    CalendarService = CalendarAlarmServicePipeline(max_loops_allowed=10)
-    calendar_service_response = CalendarService.run(input=request.input)
+    def on_validation(loop: int, done: bool):
+        on_event("validation_loop", {"loop": loop, "done": done})
+
+    # Only waits during a background warmup
+    await asyncio.shield(app.state.warmup)
+
+    async with app.state.pipeline_pool.acquire() as CalendarService:
+        CalendarService.set_validation_listener(on_validation)
+        try:
+            calendar_service_response = await run_blocking(
+                CalendarService.run, input=user_input
+            )
+        finally:
+            CalendarService.set_validation_listener(None)
+
+    if isinstance(calendar_service_response, GoogleCalendarInfoInput):
+        extraction_cache.put(user_input, calendar_service_response)
+
+    return calendar_service_response
+
+
+async def run_create_alarm(
+    user_input: str,
+    on_event: AlarmEventListener = _ignore_event,
+    client: Optional[str] = None,
+) -> AlarmResult:
+    """
+    Extracts an alarm from user input and writes it to Google Calendar.
+
+    Args:
+        user_input (str): The input provided by the user.
+        on_event (AlarmEventListener, optional): Receives an event as each stage starts or finishes.
+        client (str, optional): The client identity, for the LLM rate limit.
+
+    Returns:
+        AlarmResult: The alarm information, or the error that stopped it.
+    """
+    on_event("extraction_started", {"input": user_input})
+    calendar_service_response = await extract_alarm(user_input, on_event, client)
 
     if isinstance(calendar_service_response, GoogleCalendarResponse):
         loggerGoogleCalendarService.info("Error in Calendar Alarm Service response")
-        return calendar_service_response.to_dict()
+        return calendar_service_response
+
+    on_event("parsed", calendar_service_response.to_dict())
 
     loggerGoogleCalendarService.info("Passing to Google Calendar Service")
-    google_calender_service_response = GoogleCalendarServiceScript(
-        calendar_service_response, loggerGoogleCalendarService
+    google_calender_service_response = await run_blocking(
+        GoogleCalendarServiceScript,
+        calendar_service_response,
+        loggerGoogleCalendarService,
     )
 
-    if google_calender_service_response["error"]:
+    on_event("calendar_written", google_calender_service_response.to_dict())
+
+    if google_calender_service_response.error:
         loggerGoogleCalendarService.info("Error in Google Calendar Service response")
-        return google_calender_service_response.to_dict()
+        return google_calender_service_response
 
     loggerGoogleCalendarService.info("Pipeline Complete")
-    return calendar_service_response.to_dict()
+    return calendar_service_response
+
+
+def created_anything(result: StoredResult) -> bool:
+    """
+    Whether a `/create_alarm` or `/create_alarms` response wrote at least one event, so a retry must not run again.
+
+    Takes the typed results, or their dicts as stored for jobs. Queued job tickets count as created.
+    """
+    if isinstance(result, AlarmBatchResult):
+        return any(created_anything(item) for item in result.results)
+    if isinstance(result, GoogleCalendarResponse):
+        return not result.error
+    if isinstance(result, dict):
+        if "results" in result:
+            return any(not item.get("error") for item in result["results"])
+        return not result.get("error")
+    return True
+
+
+def alarm_response(
+    result: Union[AlarmResult, AlarmBatchResult], response: Response
+) -> Response:
+    """
+    Sends a typed result as JSON bytes rendered by the result itself, instead of through
+    FastAPI's generic encoder.
+
+    Args:
+        result (AlarmResult | AlarmBatchResult): The response body.
+        response (Response): The endpoint's response, whose headers are kept.
+
+    Returns:
+        Response: A 201 `application/json` response.
+    """
+    return Response(
+        content=result.to_json_bytes(),
+        status_code=status.HTTP_201_CREATED,
+        headers=response.headers,
+        media_type="application/json",
+    )
+
+
+async def run_idempotent(
+    path: str,
+    idempotency_key: Optional[str],
+    body: str,
+    response: Response,
+    work: Callable[[], Awaitable[StoredResult]],
+) -> StoredResult:
+    """
+    Runs `work` at most once per `Idempotency-Key`, so client retries do not create duplicate events.
+
+    Duplicates of a request still running wait for it, and later duplicates get the stored
+    response with an `Idempotent-Replayed: true` header. Responses that created no event are
+    not stored, so retrying them runs the request again.
+
+    Args:
+        path (str): The endpoint, which scopes the key.
+        idempotency_key (str | None): The `Idempotency-Key` header. Without it `work` always runs.
+        body (str): The serialized request body, which must match for every use of the key.
+        response (Response): The response whose headers are set on a replay.
+        work (Callable[[], Awaitable[StoredResult]]): Handles the request.
+
+    Returns:
+        StoredResult: The response body.
+
+    Raises:
+        HTTPException: 422 if the key was already used with a different body.
+    """
+    if idempotency_key is None:
+        return await work()
+
+    try:
+        result, replayed = await idempotency_store.run(
+            f"{path}:{idempotency_key}",
+            fingerprint(body),
+            work,
+            should_store=created_anything,
+        )
+    except IdempotencyKeyReused:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used with a different request body",
+        )
+
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+
+    return result
+
+
+async def charge_calendar(
+    client: str, work: Callable[[], Awaitable[StoredResult]], cost: int = 1
+) -> StoredResult:
+    """
+    Takes `cost` tokens from the client's calendar rate limit, then runs `work`.
+
+    Pass it to `run_idempotent` inside the work, so replays and duplicates waiting on a run in
+    flight are not charged: only requests that can write events are.
+
+    Args:
+        client (str): The client identity.
+        work (Callable[[], Awaitable[StoredResult]]): Handles the request.
+        cost (int, optional): Tokens to take, one per alarm.
+
+    Returns:
+        StoredResult: The response body.
+
+    Raises:
+        RateLimitExceeded: If the bucket holds fewer than `cost` tokens.
+    """
+    calendar_rate_limiter.acquire(client, cost)
+    return await work()
+
+
+async def run_job(kind: str, payload: dict[str, Any]) -> dict[str, Any]:
+    """
+    Runs one queued job in async job mode.
+
+    The LLM rate limit of the client that queued the job applies as for the synchronous
+    endpoints. A single alarm over it raises, so the job is retried once the bucket refills.
+
+    Args:
+        kind (str): `create_alarm` or `create_alarms`.
+        payload (dict[str, Any]): The request body the job was queued with, and its `client`.
+
+    Returns:
+        dict[str, Any]: The response the synchronous endpoint would have returned.
+    """
+    body = {key: value for key, value in payload.items() if key != "client"}
+    client = payload.get("client")
+
+    if kind == "create_alarms":
+        return (
+            await run_create_alarms(CreateAlarmsRequest(**body), client=client)
+        ).to_dict()
+    return (
+        await run_create_alarm(CreateAlarmRequest(**body).input, client=client)
+    ).to_dict()
+
+
+async def enqueue_job(
+    kind: str, payload: dict[str, Any], client: str
+) -> dict[str, Any]:
+    """
+    Queues a job for the job workers.
+
+    Args:
+        kind (str): `create_alarm` or `create_alarms`.
+        payload (dict[str, Any]): The request body.
+        client (str): The client identity, for the LLM rate limit when the job runs.
+
+    Returns:
+        dict[str, Any]: The `job_id` and the `status_url` to poll for the result.
+    """
+    job_id = await app.state.job_workers.enqueue(kind, {**payload, "client": client})
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+
+def format_sse(event: str, data: dict[str, Any]) -> str:
+    """
+    Formats one server-sent event.
+
+    Args:
+        event (str): The event name.
+        data (dict[str, Any]): The event payload, sent as JSON.
+
+    Returns:
+        str: The event in `text/event-stream` format.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.get("/stats")
+async def stats() -> dict[str, Any]:
+    """
+    Endpoint reporting how often requests avoided the LLM, and how many calls it took when they did not.
+
+    Returns:
+        dict[str, Any]: Hit and miss counters of the fast path parser, the extraction cache and the idempotency store, LLM calls per alarm for each extraction mode, success rate and latency of each model of the ladder, circuit breaker states, and job counts by status in async job mode.
+    """
+    return {
+        "fast_path": fast_path_parser.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "llm_calls": lazy_imports.get("llm_call_stats").stats(),
+        "model_tiers": lazy_imports.get("model_tier_stats").stats(),
+        "idempotency": idempotency_store.stats(),
+        "circuit_breakers": breaker_stats(openai_breaker, google_calendar_breaker),
+        "jobs": (
+            await run_blocking(app.state.job_workers.queue.stats)
+            if getattr(app.state, "job_workers", None)
+            else None
+        ),
+    }
+
+
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    """
+    Readiness probe. Ready once the warmup, including the warmup request, has finished, and
+    until shutdown begins.
+
+    Returns:
+        JSONResponse: 200 with how long each warmup step took, or 503 while the warmup runs, if it failed, or once shutting down.
+    """
+    warmup: Optional[asyncio.Task] = getattr(app.state, "warmup", None)
+
+    if (
+        warmup is None
+        or getattr(app.state, "stopping", True)
+        or not warmup.done()
+        or warmup.cancelled()
+        or warmup.exception()
+    ):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"ready": False}
+        )
+
+    return JSONResponse(
+        content={"ready": True, "startup_timings": app.state.startup_timings}
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """
+    Endpoint exposing latency histograms and counters in the Prometheus text format.
+
+    Returns:
+        PlainTextResponse: Stage durations, validation loops, errors by type and cache lookups.
+    """
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> dict[str, Any]:
+    """
+    Endpoint reporting the status of a job queued in async job mode.
+
+    Args:
+        job_id (str): The id returned when the job was queued.
+
+    Returns:
+        dict[str, Any]: The job `status` (`queued`, `running`, `succeeded` or `failed`), `attempts`, and once finished the `result` the synchronous endpoint would have returned.
+    """
+    job = None
+    if getattr(app.state, "job_workers", None):
+        job = await run_blocking(app.state.job_workers.queue.get, job_id)
+
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown job")
+
+    return job
+
+
+@app.post("/create_alarm", status_code=status.HTTP_201_CREATED, response_model=None)
+async def create_alarm(
+    request: CreateAlarmRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, max_length=255),
+    client: str = Depends(client_identity),
+) -> Union[dict[str, Any], Response]:
+    """
+    Endpoint to create an alarm.
+
+    Send an `Idempotency-Key` header to make retries safe: the alarm is created once and
+    repeated requests with the same key get the first response.
+
+    With `JOB_MODE=async` the request is queued instead and answered with 202 and a job id.
+    Poll `/jobs/{job_id}` for the result.
+
+    Clients over their calendar or LLM rate limit get 429 with Retry-After. The calendar limit
+    is checked first, and the LLM limit only when the input needs the LLM. In async job mode the
+    calendar limit is checked when the job is queued and the LLM limit when it runs, where a job
+    over it is retried once the bucket refills. Replays of an `Idempotency-Key` are not charged.
+
+    Args:
+        user_input (CreateAlarmRequest): The input provided by the user.
+        idempotency_key (str, optional): Identifies retries of the same request.
+        client (str): The client identity, from `client_identity`.
+
+    Returns:
+        dict[str, Any] | Response: The alarm information in JSON format, or the queued job. See `/create_alarm/stream` for a streaming variant.
+    """
+    if JOB_MODE == "async":
+        response.status_code = status.HTTP_202_ACCEPTED
+        return await run_idempotent(
+            "/create_alarm",
+            idempotency_key,
+            request.model_dump_json(),
+            response,
+            lambda: charge_calendar(
+                client,
+                lambda: enqueue_job("create_alarm", request.model_dump(), client),
+            ),
+        )
+
+    async def create() -> AlarmResult:
+        try:
+            return await run_create_alarm(request.input, client=client)
+        except RateLimitExceeded:
+            # No event is written, so give the calendar token back
+            calendar_rate_limiter.refund(client)
+            raise
+
+    result = await run_idempotent(
+        "/create_alarm",
+        idempotency_key,
+        request.model_dump_json(),
+        response,
+        lambda: charge_calendar(client, create),
+    )
+
+    return alarm_response(result, response)
+
+
+@app.post("/create_alarm/stream")
+async def create_alarm_stream(
+    request: CreateAlarmRequest, client: str = Depends(client_identity)
+) -> StreamingResponse:
+    """
+    Endpoint to create an alarm while streaming progress as server-sent events.
+
+    Does the same work as `/create_alarm`, but the client sees `extraction_started`, one
+    `validation_loop` per LLM reply, `parsed` as soon as the alarm is known and
+    `calendar_written` once Google responds, followed by `done` with the usual response body
+    (or `error` if the request failed). Rate limits apply as for `/create_alarm`, but once the
+    stream has started an LLM limit is reported as an `error` event.
+
+    Args:
+        user_input (CreateAlarmRequest): The input provided by the user.
+        client (str): The client identity, from `client_identity`.
+
+    Returns:
+        StreamingResponse: A `text/event-stream` response.
+    """
+    calendar_rate_limiter.acquire(client)
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue[Optional[tuple[str, dict[str, Any]]]] = asyncio.Queue()
+
+    def on_event(event: str, data: dict[str, Any]):
+        # Validation events come from worker threads, so always hop back onto the loop
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    async def work():
+        try:
+            result = await run_create_alarm(request.input, on_event, client=client)
+            on_event("done", result.to_dict())
+        except RateLimitExceeded as e:
+            calendar_rate_limiter.refund(client)
+            on_event(
+                "error", {"error": str(e), "retry_after": math.ceil(e.retry_after)}
+            )
+        except Exception as e:
+            loggerGoogleCalendarService.exception(e)
+            ERRORS.inc(type=type(e).__name__)
+            on_event("error", {"error": f"Error in Calendar Alarm Service: {e}"})
+        finally:
+            loop.call_soon_threadsafe(events.put_nowait, None)
+
+    async def stream() -> AsyncIterator[str]:
+        # The task keeps running if the client disconnects, so the alarm is still created
+        task = asyncio.create_task(work())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+        while (item := await events.get()) is not None:
+            yield format_sse(*item)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/create_alarms", status_code=status.HTTP_201_CREATED, response_model=None)
+async def create_alarms(
+    request: CreateAlarmsRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, max_length=255),
+    client: str = Depends(client_identity),
+) -> Union[dict[str, Any], Response]:
+    """
+    Endpoint to create several alarms at once.
+
+    Extraction runs concurrently for every input and the resulting events are written with a
+    single Google Calendar batch request. One failing input does not fail the others.
+    Accepts an `Idempotency-Key` header and `JOB_MODE=async` like `/create_alarm`.
+
+    The calendar rate limit is charged one token per input up front, and the whole batch gets
+    429 if the bucket cannot cover it. Inputs over the LLM rate limit fail on their own. Replays
+    of an `Idempotency-Key` are not charged.
+
+    Args:
+        request (CreateAlarmsRequest): The inputs provided by the user.
+        idempotency_key (str, optional): Identifies retries of the same request.
+        client (str): The client identity, from `client_identity`.
+
+    Returns:
+        dict[str, Any] | Response: `results`, one entry per input in input order, shaped like the `/create_alarm` response, or the queued job.
+    """
+    if JOB_MODE == "async":
+        response.status_code = status.HTTP_202_ACCEPTED
+        return await run_idempotent(
+            "/create_alarms",
+            idempotency_key,
+            request.model_dump_json(),
+            response,
+            lambda: charge_calendar(
+                client,
+                lambda: enqueue_job("create_alarms", request.model_dump(), client),
+                len(request.inputs),
+            ),
+        )
+
+    result = await run_idempotent(
+        "/create_alarms",
+        idempotency_key,
+        request.model_dump_json(),
+        response,
+        lambda: charge_calendar(
+            client,
+            lambda: run_create_alarms(request, client=client),
+            len(request.inputs),
+        ),
+    )
+
+    return alarm_response(result, response)
+
+
+async def run_create_alarms(
+    request: CreateAlarmsRequest, client: Optional[str] = None
+) -> AlarmBatchResult:
+    """
+    Extracts every alarm in a batch and writes them to Google Calendar.
+
+    Args:
+        request (CreateAlarmsRequest): The inputs provided by the user.
+        client (str, optional): The client identity, for the LLM rate limit.
+
+    Returns:
+        AlarmBatchResult: One result per input in input order.
+    """
+    loggerGoogleCalendarService.info(f"Extracting {len(request.inputs)} alarms")
+
+    extractions = await asyncio.gather(
+        *(extract_alarm(user_input, client=client) for user_input in request.inputs),
+        return_exceptions=True,
+    )
+
+    results: list[AlarmResult] = [GoogleCalendarResponse() for _ in request.inputs]
+    to_write: list[tuple[int, GoogleCalendarInfoInput]] = []
+
+    for index, extraction in enumerate(extractions):
+        if isinstance(extraction, RateLimitExceeded) and client is not None:
+            calendar_rate_limiter.refund(client)
+            results[index] = GoogleCalendarResponse(error=str(extraction))
+        elif isinstance(extraction, BaseException):
+            loggerGoogleCalendarService.error(
+                f"Extraction {index} failed: {extraction}"
+            )
+            ERRORS.inc(type=type(extraction).__name__)
+            results[index] = GoogleCalendarResponse(
+                error=f"Error in Calendar Alarm Service: {extraction}"
+            )
+        elif isinstance(extraction, GoogleCalendarResponse):
+            results[index] = extraction
+        else:
+            to_write.append((index, extraction))
+
+    if to_write:
+        loggerGoogleCalendarService.info(
+            f"Passing {len(to_write)} alarms to Google Calendar Service"
+        )
+        google_calendar_service_responses = await run_blocking(
+            GoogleCalendarBatchServiceScript,
+            [extraction for _, extraction in to_write],
+            loggerGoogleCalendarService,
+        )
+
+        for (index, extraction), google_calendar_service_response in zip(
+            to_write, google_calendar_service_responses
+        ):
+            if google_calendar_service_response.error:
+                results[index] = google_calendar_service_response
+            else:
+                results[index] = extraction
+
+    loggerGoogleCalendarService.info("Batch Complete")
+    return AlarmBatchResult(results)
@@ -0,0 +1,39 @@
+import asyncio
+import os
+
+import uvicorn
+
+from calarmhelp.fakes.googleCalendarServer import create_calendar_app
+from calarmhelp.fakes.openAIServer import create_openai_app
+
+HOST = os.getenv("FAKE_BACKENDS_HOST", "127.0.0.1")
+# Defaults to 127.0.0.1 if FAKE_BACKENDS_HOST is not set.
+
+FAKE_OPENAI_PORT = int(os.getenv("FAKE_OPENAI_PORT", 8101))
+# Defaults to 8101 if FAKE_OPENAI_PORT is not set.
+
+FAKE_CALENDAR_PORT = int(os.getenv("FAKE_CALENDAR_PORT", 8102))
+# Defaults to 8102 if FAKE_CALENDAR_PORT is not set.
+
+
+async def serve():
+    servers = [
+        uvicorn.Server(
+            uvicorn.Config(create_openai_app(), host=HOST, port=FAKE_OPENAI_PORT)
+        ),
+        uvicorn.Server(
+            uvicorn.Config(create_calendar_app(), host=HOST, port=FAKE_CALENDAR_PORT)
+        ),
+    ]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def run():
+    print("Start the app against the fakes with:")
+    print(f"  OPENAI_BASE_URL=http://{HOST}:{FAKE_OPENAI_PORT}/v1")
+    print(f"  GOOGLE_CALENDAR_ROOT_URL=http://{HOST}:{FAKE_CALENDAR_PORT}/")
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    run()
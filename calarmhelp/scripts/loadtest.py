@@ -0,0 +1,425 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import httpx
+
+from calarmhelp.fakes.googleCalendarServer import create_calendar_app
+from calarmhelp.fakes.openAIServer import create_openai_app
+from calarmhelp.fakes.server import BackgroundServer, free_port
+
+CORPUS = (
+    "Respond to Tom at 5PM tomorrow with a 5 minute reminder.",
+    "Dentist appointment tomorrow at 9:30am",
+    "Pick up the kids from school at 3pm",
+    "Call mom tonight at 8",
+    "Team standup at 10am tomorrow at work",
+    "Take out the trash tomorrow morning at 7",
+    "Pay rent on Friday at noon",
+    "Gym at 6pm, remind me 15 minutes before",
+    "Lunch with Sarah at the cafe tomorrow at 12:30pm",
+    "Water the plants at home at 6pm",
+    "Submit the expense report by 4pm tomorrow #work",
+    "Book flights for the conference on Monday at 11am",
+    "Walk the dog at 7am tomorrow",
+    "Doctor's appointment next Tuesday at 2pm, remind me an hour before",
+    "Pick up groceries on the way home at 5:30pm",
+    "Parent teacher conference Thursday at 4pm at school",
+    "Renew car registration tomorrow at 10",
+    "Meditate for 20 minutes at 9pm",
+    "Send the invoice to the client at 9am tomorrow",
+    "Haircut on Saturday at 11:15am",
+    "Review pull requests after lunch at 1pm",
+    "Start the laundry at home at 8pm",
+    "Video call with the design team tomorrow at 3:30pm for an hour",
+    "Take medication at 10pm, 5 minute reminder",
+)
+# A mix of phrasings the fast path parses and ones that need the LLM.
+
+DEFAULT_CONCURRENCY = "1,4,16,64"
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """
+    Returns the nearest-rank percentile of already sorted values.
+
+    Args:
+        sorted_values (list[float]): The values, in ascending order.
+        fraction (float): The percentile as a fraction, e.g. 0.95.
+
+    Returns:
+        float: The percentile, or 0.0 when there are no values.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(
+    latencies: list[float], errors: Counter, items: int, duration: float
+) -> dict[str, Any]:
+    """
+    Summarises one step of the sweep.
+
+    Args:
+        latencies (list[float]): Seconds per request, successful or not.
+        errors (Counter): Failed alarms by kind, e.g. `http_500` or `app`.
+        items (int): Alarms requested. Equals the request count unless batches are used.
+        duration (float): Wall clock seconds the step ran for.
+
+    Returns:
+        dict[str, Any]: Throughput, latency percentiles in milliseconds and error rates.
+    """
+    ordered = sorted(latencies)
+    failed = sum(errors.values())
+
+    return {
+        "requests": len(latencies),
+        "alarms": items,
+        "duration_s": duration,
+        "throughput_rps": len(latencies) / duration if duration else 0.0,
+        "alarms_per_s": items / duration if duration else 0.0,
+        "latency_ms": {
+            "p50": percentile(ordered, 0.50) * 1000,
+            "p95": percentile(ordered, 0.95) * 1000,
+            "p99": percentile(ordered, 0.99) * 1000,
+            "mean": statistics.fmean(ordered) * 1000 if ordered else 0.0,
+            "max": ordered[-1] * 1000 if ordered else 0.0,
+        },
+        "error_rate": failed / items if items else 0.0,
+        "errors": dict(errors),
+    }
+
+
+class LoadGenerator:
+    """
+    Closed-loop load: `concurrency` workers each send their next request as soon as the last one returns.
+
+    #### Attributes:
+    ```
+    target (str):
+    ```Base URL of the server under test.
+    ```
+    batch_size (int):
+    ```0 to call `/create_alarm`, otherwise the number of inputs per `/create_alarms` request.
+    ```
+    unique (bool):
+    ```Makes every input distinct so the extraction cache never answers.
+    """
+
+    def __init__(
+        self,
+        target: str,
+        corpus: tuple[str, ...] = CORPUS,
+        batch_size: int = 0,
+        unique: bool = False,
+        timeout: float = 60.0,
+        seed: Optional[int] = None,
+    ):
+        self.target = target.rstrip("/")
+        self.corpus = corpus
+        self.batch_size = batch_size
+        self.unique = unique
+        self.timeout = timeout
+        self._random = random.Random(seed)
+        self._sent = 0
+
+    def _next_input(self) -> str:
+        self._sent += 1
+        utterance = self._random.choice(self.corpus)
+        # Digits keep the fast path out too, so unique inputs always reach the LLM
+        return f"{utterance} (ref {self._sent})" if self.unique else utterance
+
+    async def _send(self, client: httpx.AsyncClient) -> tuple[float, int, Counter]:
+        if self.batch_size:
+            path = "/create_alarms"
+            body: dict[str, Any] = {
+                "inputs": [self._next_input() for _ in range(self.batch_size)]
+            }
+            items = self.batch_size
+        else:
+            path = "/create_alarm"
+            body = {"input": self._next_input()}
+            items = 1
+
+        errors: Counter = Counter()
+        start = time.perf_counter()
+
+        try:
+            response = await client.post(path, json=body)
+        except httpx.HTTPError as e:
+            errors[type(e).__name__] += items
+            return time.perf_counter() - start, items, errors
+
+        latency = time.perf_counter() - start
+
+        if response.status_code >= 400:
+            errors[f"http_{response.status_code}"] += items
+        elif self.batch_size:
+            for result in response.json()["results"]:
+                if result.get("error"):
+                    errors["app"] += 1
+        elif response.json().get("error"):
+            errors["app"] += 1
+
+        return latency, items, errors
+
+    async def run_step(self, concurrency: int, duration: float) -> dict[str, Any]:
+        """
+        Runs `concurrency` workers for `duration` seconds.
+
+        Args:
+            concurrency (int): Requests in flight at once.
+            duration (float): Seconds to keep starting new requests.
+
+        Returns:
+            dict[str, Any]: The step summary from `summarize`, plus the concurrency.
+        """
+        latencies: list[float] = []
+        errors: Counter = Counter()
+        items = 0
+        limits = httpx.Limits(
+            max_connections=concurrency, max_keepalive_connections=concurrency
+        )
+
+        async with httpx.AsyncClient(
+            base_url=self.target, timeout=self.timeout, limits=limits
+        ) as client:
+            deadline = time.perf_counter() + duration
+
+            async def worker():
+                nonlocal items
+                while time.perf_counter() < deadline:
+                    latency, sent, failed = await self._send(client)
+                    latencies.append(latency)
+                    items += sent
+                    errors.update(failed)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+        return {
+            "concurrency": concurrency,
+            **summarize(latencies, errors, items, elapsed),
+        }
+
+    async def sweep(
+        self,
+        concurrency_levels: list[int],
+        duration: float,
+        warmup: float = 0.0,
+        max_error_rate: float = 1.0,
+        log=print,
+    ) -> list[dict[str, Any]]:
+        """
+        Runs one step per concurrency level, stopping early once errors pass `max_error_rate`.
+
+        Args:
+            concurrency_levels (list[int]): Concurrency of each step, in order.
+            duration (float): Seconds per step.
+            warmup (float, optional): Seconds of unrecorded load before the first step.
+            max_error_rate (float, optional): Stop the sweep after a step with a higher error rate.
+            log (Callable[[str], None], optional): Receives one line per finished step.
+
+        Returns:
+            list[dict[str, Any]]: One summary per step that ran.
+        """
+        if warmup > 0:
+            await self.run_step(concurrency_levels[0], warmup)
+
+        steps = []
+        for concurrency in concurrency_levels:
+            step = await self.run_step(concurrency, duration)
+            steps.append(step)
+
+            latency = step["latency_ms"]
+            log(
+                f"c={concurrency:<4} {step['throughput_rps']:8.1f} req/s  "
+                f"p50={latency['p50']:.0f}ms p95={latency['p95']:.0f}ms p99={latency['p99']:.0f}ms  "
+                f"errors={step['error_rate']:.1%}"
+            )
+
+            if step["error_rate"] > max_error_rate:
+                log(f"Stopping: error rate above {max_error_rate:.0%}")
+                break
+
+        return steps
+
+
+def wait_until_ready(url: str, timeout: float = 60.0):
+    """Polls `url` until it answers 200, so the sweep measures neither startup nor warmup."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{url} did not become ready")
+        time.sleep(0.2)
+
+
+def start_app_against_fakes(
+    stack: ExitStack, workers: int, app_port: Optional[int] = None
+) -> str:
+    """
+    Starts the fake OpenAI and Calendar servers and a uvicorn server wired to them.
+
+    Args:
+        stack (ExitStack): Owns the servers, which stop when it closes.
+        workers (int): uvicorn worker processes for the app.
+        app_port (int, optional): Port for the app. Defaults to a free port.
+
+    Returns:
+        str: The base URL of the app.
+    """
+    openai_server = stack.enter_context(BackgroundServer(create_openai_app()))
+    calendar_server = stack.enter_context(BackgroundServer(create_calendar_app()))
+    app_port = app_port or free_port()
+
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": f"{openai_server.url}/v1",
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "fake",
+        "GOOGLE_CALENDAR_ROOT_URL": f"{calendar_server.url}/",
+        "CALENDAR_ID": os.getenv("CALENDAR_ID") or "primary",
+        "ORIGINS": os.getenv("ORIGINS") or "http://localhost",
+        "LANGFUSE_PUBLIC_KEY": "",
+        "LANGFUSE_SECRET_KEY": "",
+    }
+    app = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "calarmhelp.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(app_port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+
+    def stop_app():
+        app.terminate()
+        app.wait(timeout=30)
+
+    stack.callback(stop_app)
+
+    url = f"http://127.0.0.1:{app_port}"
+    wait_until_ready(f"{url}/ready")
+    return url
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Command line entry point. Sweeps concurrency levels and writes the results as JSON.
+
+    Args:
+        argv (list[str], optional): Command line arguments. Defaults to `sys.argv[1:]`.
+
+    Returns:
+        int: Always 0. Read the error rates in the report.
+    """
+    parser = argparse.ArgumentParser(
+        description="Drive /create_alarm or /create_alarms with a concurrency sweep."
+    )
+    parser.add_argument(
+        "--target",
+        default=os.getenv("LOADTEST_TARGET", "http://127.0.0.1:8000"),
+        help="Base URL of a running server. Ignored with --fakes.",
+    )
+    parser.add_argument(
+        "--fakes",
+        action="store_true",
+        help="Start the app against the local OpenAI and Calendar stand-ins and target it.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="uvicorn workers with --fakes."
+    )
+    parser.add_argument(
+        "--concurrency",
+        default=DEFAULT_CONCURRENCY,
+        help="Comma separated concurrency levels to sweep.",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="Seconds per step."
+    )
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=0,
+        help="Send /create_alarms requests of this many inputs instead of /create_alarm.",
+    )
+    parser.add_argument(
+        "--unique",
+        action="store_true",
+        help="Make every input distinct so caches and the fast path never answer.",
+    )
+    parser.add_argument("--max-error-rate", type=float, default=0.5)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", default="loadtest_results.json")
+    args = parser.parse_args(argv)
+
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+
+    with ExitStack() as stack:
+        target = (
+            start_app_against_fakes(stack, args.workers) if args.fakes else args.target
+        )
+        generator = LoadGenerator(
+            target, batch_size=args.batch_size, unique=args.unique, seed=args.seed
+        )
+        steps = asyncio.run(
+            generator.sweep(
+                concurrency_levels,
+                duration=args.duration,
+                warmup=args.warmup,
+                max_error_rate=args.max_error_rate,
+            )
+        )
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "target": "fakes" if args.fakes else args.target,
+        "endpoint": "/create_alarms" if args.batch_size else "/create_alarm",
+        "batch_size": args.batch_size,
+        "unique_inputs": args.unique,
+        "workers": args.workers if args.fakes else None,
+        "steps": steps,
+    }
+
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    return 0
+
+
+def run():
+    """Run the load test sweep and write the report to loadtest_results.json."""
+    sys.exit(main())
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,14 @@
+"""Script to run the micro-benchmarks for calarmhelp."""
+
+import sys
+
+from calarmhelp.benchmarks.runner import main
+
+
+def run():
+    """Run the hot path benchmarks and write the results to benchmark_results.json."""
+    sys.exit(main())
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,363 @@
+import argparse
+import asyncio
+import logging
+import math
+import os
+import select
+import signal
+import socket
+import sys
+import time
+from contextlib import suppress
+from types import FrameType, ModuleType
+from typing import Callable, Optional
+
+import uvicorn
+from fastapi import FastAPI
+
+loggerServe = logging.getLogger("Serve")
+
+HOST = os.getenv("HOST", "0.0.0.0")
+# Defaults to 0.0.0.0 if HOST is not set.
+
+PORT = int(os.getenv("PORT", 8000))
+# Defaults to 8000 if PORT is not set.
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 0))
+# Defaults to one worker per available CPU if WEB_CONCURRENCY is not set. Set it to 1 to keep in-process state in one worker.
+
+STARTUP_FAILURE = 3
+# Uvicorn's exit status when the application fails to start.
+
+ReadyCallback = Callable[[], None]
+# Called by a worker once its warmup has finished.
+
+
+def cgroup_cpu_quota(root: str = "/sys/fs/cgroup") -> Optional[float]:
+    """
+    Reads the container's CPU limit from its cgroup.
+
+    Args:
+        root (str, optional): Where the cgroup filesystem is mounted.
+
+    Returns:
+        float | None: The CPUs the quota allows, e.g. 1.5, or None without a quota.
+    """
+    # cgroup v2: "<quota> <period>", or "max <period>" without a quota
+    with suppress(OSError, ValueError):
+        with open(os.path.join(root, "cpu.max")) as file:
+            quota, period = file.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+
+    # cgroup v1: a quota of -1 means none
+    with suppress(OSError, ValueError):
+        with open(os.path.join(root, "cpu", "cpu.cfs_quota_us")) as file:
+            quota = int(file.read())
+        with open(os.path.join(root, "cpu", "cpu.cfs_period_us")) as file:
+            period = int(file.read())
+        return quota / period if quota > 0 else None
+
+    return None
+
+
+def available_cpus(cgroup_root: str = "/sys/fs/cgroup") -> int:
+    """
+    Counts the CPUs this process may run on: its CPU affinity, capped by the container's quota.
+
+    `os.cpu_count()` alone reports every CPU of the host, even in a container limited to one.
+
+    Args:
+        cgroup_root (str, optional): Where the cgroup filesystem is mounted.
+
+    Returns:
+        int: At least 1.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = cgroup_cpu_quota(cgroup_root)
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+
+    return max(1, cpus)
+
+
+def preload() -> ModuleType:
+    """
+    Imports the app, and everything its warmup imports, before the workers are forked.
+
+    Forked workers share these modules with the runner instead of importing them again, which
+    saves the import time in every worker and most of the memory. Nothing imported here may
+    start a thread, as only the forking thread survives a fork.
+
+    Returns:
+        ModuleType: `calarmhelp.main`.
+    """
+    import calarmhelp.main as main
+    from calarmhelp.services import googleCalendarService
+
+    main.lazy_imports.load()
+    main.lazy_imports.get("pipeline_lazy_imports").load()
+    googleCalendarService.lazy_imports.load()
+
+    return main
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Opens the listening socket shared by every worker. Connections queue until one is ready."""
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+class WorkerServer(uvicorn.Server):
+    """
+    Uvicorn server that calls `on_ready` once the application's warmup has finished.
+
+    With `STARTUP_WARMUP=background` the server accepts requests while the warmup still runs,
+    so readiness is reported separately from startup.
+    """
+
+    def __init__(self, config: uvicorn.Config, app: FastAPI, on_ready: ReadyCallback):
+        super().__init__(config)
+        self._app = app
+        self._on_ready = on_ready
+        self._ready_task: Optional[asyncio.Task] = None
+
+    async def startup(self, sockets: Optional[list[socket.socket]] = None):
+        await super().startup(sockets=sockets)
+        self._ready_task = asyncio.create_task(self._report_ready())
+
+    async def _report_ready(self):
+        try:
+            await asyncio.shield(self._app.state.warmup)
+        except Exception as e:
+            loggerServe.error(f"Worker {os.getpid()} warmup failed: {e}")
+            return
+        self._on_ready()
+
+
+def serve_app(
+    app: FastAPI, sock: socket.socket, on_ready: ReadyCallback, drain_timeout: float
+) -> int:
+    """
+    Serves the app on an already listening socket until SIGTERM or SIGINT.
+
+    On either signal, uvicorn stops accepting connections and gives open requests
+    `drain_timeout` seconds to finish before the application shuts down.
+
+    Returns:
+        int: 0 after a clean shutdown, `STARTUP_FAILURE` if the app did not start.
+    """
+    config = uvicorn.Config(app, lifespan="on", timeout_graceful_shutdown=drain_timeout)
+    server = WorkerServer(config, app, on_ready)
+
+    try:
+        server.run(sockets=[sock])
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else STARTUP_FAILURE
+
+    return 0 if server.started else STARTUP_FAILURE
+
+
+def _ignore_signal(signum: int, frame: Optional[FrameType]):
+    pass
+
+
+class WorkerSupervisor:
+    """
+    Runs the preloaded app in forked worker processes sharing one listening socket.
+
+    A worker that dies is replaced, unless it failed to start, in which case every worker is
+    stopped. SIGTERM and SIGINT are passed on to the workers once, so each finishes the
+    requests it has, and workers still running after `stop_timeout` seconds are killed.
+
+    #### Attributes:
+    ```
+    workers (int):
+    ```The number of worker processes.
+    """
+
+    def __init__(
+        self,
+        run_worker: Callable[[ReadyCallback], int],
+        workers: int,
+        stop_timeout: float,
+    ):
+        self.workers = workers
+        self._run_worker = run_worker
+        self._stop_timeout = stop_timeout
+        self._pids: set[int] = set()
+        self._stopping = False
+        self._ready_read = -1
+        self._ready_write = -1
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid:
+            self._pids.add(pid)
+            return
+
+        code = 1
+        try:
+            # Keeps Ctrl+C in a terminal from reaching the workers twice, directly and passed on
+            os.setpgid(0, 0)
+            os.close(self._ready_read)
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, _ignore_signal)
+            code = self._run_worker(lambda: os.write(self._ready_write, b"."))
+        except BaseException:
+            loggerServe.exception(f"Worker {os.getpid()} crashed")
+        finally:
+            os._exit(code)
+
+    def _reap(self) -> list[tuple[int, int]]:
+        exited = []
+        while self._pids:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            self._pids.discard(pid)
+            exited.append((pid, os.waitstatus_to_exitcode(status)))
+        return exited
+
+    def _stop(self, signum: int, frame: Optional[FrameType]):
+        self._stopping = True
+
+    def run(self) -> int:
+        """
+        Starts the workers and supervises them until a signal asks them to stop.
+
+        Returns:
+            int: 0 after a clean shutdown, `STARTUP_FAILURE` if a worker failed to start.
+        """
+        self._ready_read, self._ready_write = os.pipe()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._stop)
+
+        started = time.monotonic()
+        ready = 0
+        exit_code = 0
+
+        for _ in range(self.workers):
+            self._spawn()
+
+        while not self._stopping:
+            readable, _, _ = select.select([self._ready_read], [], [], 0.2)
+            if readable:
+                was_ready = ready >= self.workers
+                ready += len(os.read(self._ready_read, 1024))
+                if not was_ready and ready >= self.workers:
+                    loggerServe.info(
+                        f"{self.workers} workers ready in {time.monotonic() - started:.2f}s"
+                    )
+
+            for pid, code in self._reap():
+                if code == STARTUP_FAILURE:
+                    loggerServe.error(f"Worker {pid} failed to start, stopping")
+                    exit_code = STARTUP_FAILURE
+                    self._stopping = True
+                elif not self._stopping:
+                    loggerServe.warning(
+                        f"Worker {pid} exited with {code}, replacing it"
+                    )
+                    self._spawn()
+
+        self._shutdown()
+        return exit_code
+
+    def _shutdown(self):
+        loggerServe.info(f"Stopping {len(self._pids)} workers")
+        for pid in self._pids:
+            with suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + self._stop_timeout
+        while self._pids and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+
+        for pid in self._pids:
+            loggerServe.error(f"Worker {pid} did not stop in time, killing it")
+            with suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGKILL)
+        for pid in list(self._pids):
+            os.waitpid(pid, 0)
+        self._pids.clear()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Command line entry point. Serves the app until SIGTERM or SIGINT.
+
+    Args:
+        argv (list[str], optional): Command line arguments. Defaults to `sys.argv[1:]`.
+
+    Returns:
+        int: 0 after a clean shutdown, `STARTUP_FAILURE` if the app failed to start.
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve calarmhelp in production: preloaded, warmed up before ready, drained on shutdown."
+    )
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WEB_CONCURRENCY,
+        help="Worker processes. Defaults to WEB_CONCURRENCY, or one per available CPU.",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        help="Seconds in-flight alarms get to finish on shutdown. Defaults to SHUTDOWN_DRAIN_TIMEOUT.",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        format="%(levelname)s - %(name)s: %(message)s", level=logging.INFO
+    )
+
+    workers = args.workers or available_cpus()
+    if workers > 1:
+        # Each worker has its own copy, so replays, limits and cache hits only hold per worker
+        loggerServe.warning(
+            f"The {workers} workers do not share the idempotency store, rate limiters or caches"
+        )
+    start = time.perf_counter()
+    sock = bind_socket(args.host, args.port)
+    app_module = preload()
+    drain_timeout = (
+        app_module.SHUTDOWN_DRAIN_TIMEOUT
+        if args.drain_timeout is None
+        else args.drain_timeout
+    )
+    loggerServe.info(
+        f"Preloaded in {time.perf_counter() - start:.2f}s, "
+        f"serving on {args.host}:{args.port} with {workers} workers"
+    )
+
+    def run_worker(on_ready: ReadyCallback) -> int:
+        return serve_app(app_module.app, sock, on_ready, drain_timeout)
+
+    if workers == 1 or not hasattr(os, "fork"):
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, _ignore_signal)
+        return run_worker(lambda: loggerServe.info("Worker ready"))
+
+    # Uvicorn drains open requests, then the app drains background alarms and jobs, each for
+    # up to drain_timeout
+    return WorkerSupervisor(run_worker, workers, 2 * drain_timeout + 5).run()
+
+
+def run():
+    """Serve the app with preloaded, warmed up workers and a graceful shutdown."""
+    sys.exit(main())
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from calarmhelp.fakes.googleCalendarServer import create_calendar_app
+from calarmhelp.fakes.server import BackgroundServer
+
+# Runs in a fresh interpreter under `-X importtime`, so nothing is imported yet
+CHILD_SCRIPT = """
+import asyncio, json, time
+
+start = time.perf_counter()
+import calarmhelp.main as main
+imported = time.perf_counter() - start
+
+
+async def start_up():
+    start = time.perf_counter()
+    async with main.lifespan(main.app):
+        ready = time.perf_counter() - start
+        await main.app.state.warmup
+        warm = time.perf_counter() - start
+    return ready, warm
+
+
+ready, warm = asyncio.run(start_up())
+print(json.dumps({
+    "import_seconds": imported,
+    "ready_seconds": ready,
+    "warm_seconds": warm,
+    "warmup_steps": main.app.state.startup_timings,
+}))
+"""
+
+
+def parse_importtime(output: str) -> list[dict[str, Any]]:
+    """
+    Parses the report `python -X importtime` writes to stderr.
+
+    Args:
+        output (str): The stderr of the interpreter.
+
+    Returns:
+        list[dict[str, Any]]: One entry per imported module, in import order, with its `module`
+        name, nesting `depth`, and `self_seconds` and `cumulative_seconds`.
+    """
+    imports = []
+
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # The header line
+
+        module = name.lstrip()
+        imports.append(
+            {
+                "module": module,
+                "depth": (len(name) - len(module) - 1) // 2,
+                "self_seconds": int(self_us) / 1e6,
+                "cumulative_seconds": int(cumulative_us) / 1e6,
+            }
+        )
+
+    return imports
+
+
+def package_breakdown(imports: list[dict[str, Any]]) -> dict[str, float]:
+    """
+    Sums the import time of every module by top level package, slowest first.
+
+    Self times are summed rather than cumulative ones, so a module imported by two packages is
+    only counted once, against its own package.
+
+    Args:
+        imports (list[dict[str, Any]]): The output of `parse_importtime`.
+
+    Returns:
+        dict[str, float]: Seconds per top level package.
+    """
+    packages: dict[str, float] = {}
+    for entry in imports:
+        package = entry["module"].split(".")[0]
+        packages[package] = packages.get(package, 0.0) + entry["self_seconds"]
+
+    return dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
+
+
+def measure_startup(env: dict[str, str]) -> dict[str, Any]:
+    """
+    Imports `calarmhelp.main` and runs its startup in a fresh interpreter.
+
+    Args:
+        env (dict[str, str]): The environment of the interpreter.
+
+    Returns:
+        dict[str, Any]: `import_seconds`, `ready_seconds` (until the server would accept
+        requests), `warm_seconds`, `warmup_steps`, `cold_start_seconds` (import plus ready),
+        and the import time of each top level `packages` and `calarmhelp` module.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Startup failed:\n{completed.stderr[-4000:]}")
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(completed.stderr)
+
+    return {
+        **result,
+        "cold_start_seconds": result["import_seconds"] + result["ready_seconds"],
+        "packages": package_breakdown(imports),
+        "modules": {
+            entry["module"]: entry["cumulative_seconds"]
+            for entry in imports
+            if entry["module"].startswith("calarmhelp")
+        },
+    }
+
+
+def print_report(run: dict[str, Any], top: int):
+    """Prints the startup phases, the slowest packages and the calarmhelp modules."""
+    print(f"Import calarmhelp.main  {run['import_seconds']:8.3f}s")
+    print(f"Startup until ready     {run['ready_seconds']:8.3f}s")
+    print(f"Startup until warm      {run['warm_seconds']:8.3f}s")
+    for step, seconds in run["warmup_steps"].items():
+        print(f"  {step:<22}{seconds:8.3f}s")
+    print(f"Cold start              {run['cold_start_seconds']:8.3f}s")
+
+    print(f"\nSlowest packages to import, warmup included (of {len(run['packages'])}):")
+    for package, seconds in list(run["packages"].items())[:top]:
+        print(f"  {package:<40}{seconds:8.3f}s")
+
+    print("\ncalarmhelp modules, including what they import:")
+    for module, seconds in sorted(
+        run["modules"].items(), key=lambda item: item[1], reverse=True
+    ):
+        print(f"  {module:<60}{seconds:8.3f}s")
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Command line entry point. Measures cold start and checks it against the budget.
+
+    Args:
+        argv (list[str], optional): Command line arguments. Defaults to `sys.argv[1:]`.
+
+    Returns:
+        int: 0 if the median cold start is within the budget, 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(
+        description="Break down the import and startup time of calarmhelp.main."
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=float(os.getenv("STARTUP_BUDGET", 1.0)),
+        help="Seconds allowed from interpreter start to accepting requests.",
+    )
+    parser.add_argument(
+        "--warmup",
+        choices=("blocking", "background"),
+        default=os.getenv("STARTUP_WARMUP", "background"),
+        help="STARTUP_WARMUP of the measured app. Defaults to background, to time the import and warmup separately.",
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=3,
+        help="Fresh interpreters to measure. The median run is reported.",
+    )
+    parser.add_argument(
+        "--real-google",
+        action="store_true",
+        help="Warm up against Google Calendar instead of the local stand-in.",
+    )
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", default="startup_timing.json")
+    args = parser.parse_args(argv)
+
+    env = {
+        **os.environ,
+        "ORIGINS": os.getenv("ORIGINS") or "http://localhost",
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "fake",
+        "STARTUP_WARMUP": args.warmup,
+    }
+
+    with ExitStack() as stack:
+        if not args.real_google:
+            calendar_server = stack.enter_context(
+                BackgroundServer(create_calendar_app())
+            )
+            env["GOOGLE_CALENDAR_ROOT_URL"] = f"{calendar_server.url}/"
+            env["CALENDAR_ID"] = os.getenv("CALENDAR_ID") or "primary"
+
+        runs = [measure_startup(env) for _ in range(args.runs)]
+
+    median = statistics.median(run["cold_start_seconds"] for run in runs)
+    run = min(runs, key=lambda run: abs(run["cold_start_seconds"] - median))
+    within_budget = run["cold_start_seconds"] <= args.budget
+
+    print_report(run, args.top)
+    print(
+        f"\nCold start {run['cold_start_seconds']:.3f}s (median of {args.runs}), "
+        f"budget {args.budget:.3f}s: {'OK' if within_budget else 'OVER BUDGET'}"
+    )
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "startup_warmup": args.warmup,
+        "budget_seconds": args.budget,
+        "within_budget": within_budget,
+        "cold_start_seconds": [run["cold_start_seconds"] for run in runs],
+        "median_run": run,
+    }
+
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    return 0 if within_budget else 1
+
+
+def run():
+    """Measure cold start, write startup_timing.json, and fail if it is over budget."""
+    sys.exit(main())
+
+
+if __name__ == "__main__":
+    run()
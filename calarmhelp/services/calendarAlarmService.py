@@ -1,31 +1,428 @@
+import asyncio
+import functools
+import logging
 import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Iterator, Optional
 from dotenv import load_dotenv
+from pydantic import BaseModel, ValidationError
 
-from haystack import Pipeline
+from jinja2 import Template
+from haystack import Pipeline, tracing
 from haystack.utils import Secret
 from haystack.components.builders import PromptBuilder
-from haystack.components.generators import OpenAIGenerator
 from haystack.core.component import component
-from haystack_integrations.components.connectors.langfuse import LangfuseConnector
+from haystack.tracing import Span, Tracer
+from zoneinfo import ZoneInfo
 
+from calarmhelp.services.concurrency import run_blocking
+from calarmhelp.services.lazy import LazyImports
+from calarmhelp.services.metrics import (
+    ERRORS,
+    MODEL_TIER_CALLS,
+    MODEL_TIER_DURATION,
+    STAGE_DURATION,
+    VALIDATION_LOOPS,
+)
+from calarmhelp.services.resilience import (
+    RetryPolicy,
+    call_hedged,
+    call_with_retries,
+    openai_breaker,
+)
+from calarmhelp.services.traceExporter import trace_recorder
 from calarmhelp.services.util.util import (
     CalendarAlarmResponse,
+    Category,
+    create_alarm_readout,
     GoogleCalendarInfoInput,
     GoogleCalendarResponse,
 )
 
+if TYPE_CHECKING:
+    from haystack.components.generators import OpenAIGenerator
+
 load_dotenv()
 
-# Load the template file
-template_file_path = os.path.join(
+# The OpenAI SDK takes longer to import than the rest of the module, and is only needed once a
+# pipeline is built
+lazy_imports = LazyImports(
+    globals(),
+    {
+        "openai": "openai",
+        "OpenAIGenerator": "haystack.components.generators:OpenAIGenerator",
+    },
+)
+__getattr__ = lazy_imports.attribute
+
+loggerCalendarAlarmService = logging.getLogger("Calendar Alarm Service")
+
+templates_path = os.path.join(
     os.path.dirname(os.path.abspath(__file__)),
-    "../templates/googleCalendarFeeder.jinja",
+    "../templates",
 )
 
-with open(template_file_path, "r") as file:
-    template_content = file.read()
+
+@functools.lru_cache(maxsize=None)
+def load_prompt_template() -> str:
+    """
+    Builds the extraction prompt template as a static prefix followed by a dynamic suffix.
+
+    `googleCalendarFeederPrefix.jinja` holds the instructions, schema and examples, and is
+    rendered once per process. `googleCalendarFeeder.jinja` holds the user input, current time
+    and validation feedback. Keeping every variable at the end gives each request the same
+    leading tokens, which OpenAI caches across requests.
+
+    Returns:
+        str: A `PromptBuilder` template whose prefix is already rendered.
+    """
+    with open(os.path.join(templates_path, "googleCalendarFeederPrefix.jinja")) as file:
+        static_prefix = Template(file.read()).render()
+
+    with open(os.path.join(templates_path, "googleCalendarFeeder.jinja")) as file:
+        dynamic_suffix = file.read()
+
+    return "{% raw %}" + static_prefix + "{% endraw %}" + dynamic_suffix
+
+
+EVENT_TIMEZONE = ZoneInfo("America/New_York")
+
+# How far in the past an event may start and still be accepted, for "remind me now" style input
+PAST_EVENT_TOLERANCE = timedelta(minutes=1)
+
+EXTRACTION_MODES = ("loop", "structured")
+# `loop` re-prompts until a reply validates locally, `structured` makes one schema-constrained call.
+
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 30))
+# Defaults to 30 seconds per LLM call if OPENAI_TIMEOUT is not set.
+
+LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", 3))
+# Defaults to 3 calls per LLM reply, including the first, if LLM_RETRY_ATTEMPTS is not set.
+
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", 0))
+# Defaults to 0, no hedging, if LLM_HEDGE_AFTER is not set. Otherwise the seconds before a backup call.
+
+MODEL_LADDER = [
+    model.strip()
+    for model in os.getenv("MODEL_LADDER", "gpt-4.1-mini,gpt-4.1").split(",")
+    if model.strip()
+]
+# Defaults to gpt-4.1-mini, escalating to gpt-4.1, if MODEL_LADDER is not set. Cheapest model first.
+
+# Keywords OpenAI rejects in a strict schema. Pydantic emits them for titles and defaults.
+_UNSUPPORTED_SCHEMA_KEYWORDS = {"default", "title"}
+
+
+def strict_json_schema(model: type[BaseModel]) -> dict[str, Any]:
+    """
+    Converts a pydantic model into a JSON schema accepted by OpenAI strict structured outputs.
+
+    Strict mode requires every property to be listed in `required` and objects to forbid
+    additional properties, so optional fields are expressed through their `null` branch
+    instead. `$ref`s are inlined because strict mode does not allow keywords next to them.
+
+    Args:
+        model (type[BaseModel]): The model describing the expected reply.
+
+    Returns:
+        dict[str, Any]: The strict JSON schema.
+    """
+    schema = model.model_json_schema()
+    definitions = schema.pop("$defs", {})
+
+    def convert(node: Any) -> Any:
+        if isinstance(node, list):
+            return [convert(item) for item in node]
+        if not isinstance(node, dict):
+            return node
+
+        if "$ref" in node:
+            referenced = definitions[node["$ref"].split("/")[-1]]
+            node = {**referenced, **{k: v for k, v in node.items() if k != "$ref"}}
+
+        converted = {
+            key: convert(value)
+            for key, value in node.items()
+            if key not in _UNSUPPORTED_SCHEMA_KEYWORDS
+        }
+
+        if converted.get("type") == "object":
+            converted["required"] = list(converted.get("properties", {}))
+            converted["additionalProperties"] = False
+
+        return converted
+
+    return convert(schema)
+
+
+def create_response_format(model: type[BaseModel]) -> dict[str, Any]:
+    """
+    Builds the OpenAI `response_format` that constrains replies to the given model.
+
+    Args:
+        model (type[BaseModel]): The model describing the expected reply.
+
+    Returns:
+        dict[str, Any]: A `json_schema` response format with `strict` enabled.
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "strict": True,
+            "schema": strict_json_schema(model),
+        },
+    }
+
+
+def langfuse_configured() -> bool:
+    """Returns True when the Langfuse keys needed to send traces are set."""
+    return bool(os.getenv("LANGFUSE_PUBLIC_KEY") and os.getenv("LANGFUSE_SECRET_KEY"))
+
+
+PIPELINE_STAGES = {
+    "prompt_builder": "prompt_build",
+    "generator": "generator_call",
+    "validator": "validation",
+}
+# Pipeline component name -> `stage` label of the stage duration histogram.
+
+
+class StageTimingTracer(Tracer):
+    """
+    Haystack tracer that times pipeline components into the stage duration histogram.
+
+    It wraps the `trace_recorder` and delegates every span to it, so tracing keeps working.
+    Timing starts inside the wrapped span, so recording a span is not counted against the
+    component.
+    """
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+
+    @contextmanager
+    def trace(
+        self, operation_name: str, tags: Optional[dict[str, Any]] = None
+    ) -> Iterator[Span]:
+        with self.tracer.trace(operation_name, tags=tags) as span:
+            stage = None
+            if operation_name == "haystack.component.run" and tags:
+                stage = PIPELINE_STAGES.get(tags.get("haystack.component.name"))
+
+            if stage is None:
+                yield span
+            else:
+                with STAGE_DURATION.time(stage=stage):
+                    yield span
+
+    def current_span(self) -> Optional[Span]:
+        return self.tracer.current_span()
+
+
+_stage_timing_lock = threading.Lock()
+
+
+def enable_stage_timing():
+    """
+    Installs `StageTimingTracer` around the `trace_recorder` as the Haystack tracer, unless it
+    is installed already.
+
+    Spans of runs that are not being recorded still go to the tracer that was active before.
+    """
+    with _stage_timing_lock:
+        if not isinstance(tracing.tracer.actual_tracer, StageTimingTracer):
+            trace_recorder.tracer = tracing.tracer.actual_tracer
+            tracing.enable_tracing(StageTimingTracer(trace_recorder))
+
+
+def prompt_token_usage(meta: list[dict[str, Any]]) -> tuple[int, int]:
+    """
+    Reads the prompt token counts from `OpenAIGenerator` reply metadata.
+
+    Args:
+        meta (list[dict[str, Any]]): The `meta` output of the generator.
+
+    Returns:
+        tuple[int, int]: The prompt tokens, and how many of them were served from OpenAI's prompt cache.
+    """
+    prompt_tokens = 0
+    cached_tokens = 0
+
+    for reply_meta in meta:
+        usage = reply_meta.get("usage") or {}
+        prompt_tokens += usage.get("prompt_tokens") or 0
+        details = usage.get("prompt_tokens_details")
+        if isinstance(details, dict):
+            cached_tokens += details.get("cached_tokens") or 0
+        elif details is not None:
+            cached_tokens += getattr(details, "cached_tokens", 0) or 0
+
+    return prompt_tokens, cached_tokens
+
+
+class LLMCallStats:
+    """
+    Counts LLM calls and prompt tokens per extracted alarm for each extraction mode.
+
+    #### Attributes:
+    ```
+    alarms (dict[str, int]):
+    ```Pipeline runs per mode.
+    ```
+    calls (dict[str, int]):
+    ```LLM calls made by those runs, per mode.
+    ```
+    prompt_tokens (dict[str, int]):
+    ```Prompt tokens sent by those calls, per mode.
+    ```
+    cached_prompt_tokens (dict[str, int]):
+    ```Prompt tokens OpenAI served from its prompt cache, per mode.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.alarms = {mode: 0 for mode in EXTRACTION_MODES}
+        self.calls = {mode: 0 for mode in EXTRACTION_MODES}
+        self.prompt_tokens = {mode: 0 for mode in EXTRACTION_MODES}
+        self.cached_prompt_tokens = {mode: 0 for mode in EXTRACTION_MODES}
+
+    def record(
+        self,
+        mode: str,
+        calls: int,
+        prompt_tokens: int = 0,
+        cached_prompt_tokens: int = 0,
+    ):
+        """
+        Records one pipeline run.
+
+        Args:
+            mode (str): The extraction mode of the pipeline.
+            calls (int): How many LLM calls the run made.
+            prompt_tokens (int, optional): Prompt tokens sent by those calls.
+            cached_prompt_tokens (int, optional): How many of the prompt tokens were cached.
+        """
+        with self._lock:
+            self.alarms[mode] += 1
+            self.calls[mode] += calls
+            self.prompt_tokens[mode] += prompt_tokens
+            self.cached_prompt_tokens[mode] += cached_prompt_tokens
+
+    def reset(self):
+        """Resets every counter."""
+        with self._lock:
+            for mode in EXTRACTION_MODES:
+                self.alarms[mode] = 0
+                self.calls[mode] = 0
+                self.prompt_tokens[mode] = 0
+                self.cached_prompt_tokens[mode] = 0
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Returns the counters, averages per alarm and the prompt cache hit rate for each mode."""
+
+        def ratio(numerator: int, denominator: int) -> float:
+            return numerator / denominator if denominator else 0.0
+
+        with self._lock:
+            return {
+                mode: {
+                    "alarms": self.alarms[mode],
+                    "llm_calls": self.calls[mode],
+                    "llm_calls_per_alarm": ratio(self.calls[mode], self.alarms[mode]),
+                    "prompt_tokens": self.prompt_tokens[mode],
+                    "prompt_tokens_per_alarm": ratio(
+                        self.prompt_tokens[mode], self.alarms[mode]
+                    ),
+                    "cached_prompt_tokens": self.cached_prompt_tokens[mode],
+                    "prompt_cache_hit_rate": ratio(
+                        self.cached_prompt_tokens[mode], self.prompt_tokens[mode]
+                    ),
+                }
+                for mode in EXTRACTION_MODES
+            }
+
+
+llm_call_stats = LLMCallStats()
+
+
+class ModelTierStats:
+    """
+    Counts the outcome and latency of LLM calls for each model of the ladder.
+
+    A call is `accepted` when its reply passed the local checks, `escalated` when it did not
+    and a larger model was tried next, and `rejected` when the largest model's reply did not
+    pass either and went back through the validation loop. Latencies are kept for the most
+    recent `window` calls per model, so percentiles follow the current traffic.
+    """
+
+    OUTCOMES = ("accepted", "escalated", "rejected", "error")
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self._outcomes: dict[str, dict[str, int]] = {}
+        self._latencies: dict[str, deque[float]] = {}
+
+    def record(self, model: str, outcome: str, seconds: float):
+        """
+        Records one LLM call.
+
+        Args:
+            model (str): The model called.
+            outcome (str): One of `OUTCOMES`.
+            seconds (float): How long the call took, including retries.
+        """
+        MODEL_TIER_CALLS.inc(model=model, outcome=outcome)
+        MODEL_TIER_DURATION.observe(seconds, model=model)
+
+        with self._lock:
+            outcomes = self._outcomes.setdefault(
+                model, {outcome: 0 for outcome in self.OUTCOMES}
+            )
+            outcomes[outcome] += 1
+            self._latencies.setdefault(model, deque(maxlen=self._window)).append(
+                seconds
+            )
+
+    def reset(self):
+        """Resets every counter."""
+        with self._lock:
+            self._outcomes.clear()
+            self._latencies.clear()
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Returns the calls, success rate and p50/p95 latency in seconds for each model."""
+
+        def percentile(values: list[float], fraction: float) -> float:
+            if not values:
+                return 0.0
+            return values[min(len(values) - 1, int(fraction * len(values)))]
+
+        with self._lock:
+            snapshot = {
+                model: (dict(outcomes), sorted(self._latencies[model]))
+                for model, outcomes in self._outcomes.items()
+            }
+
+        stats = {}
+        for model, (outcomes, latencies) in snapshot.items():
+            calls = sum(outcomes.values())
+            stats[model] = {
+                "calls": calls,
+                **outcomes,
+                "success_rate": outcomes["accepted"] / calls if calls else 0.0,
+                "p50_seconds": percentile(latencies, 0.5),
+                "p95_seconds": percentile(latencies, 0.95),
+            }
+        return stats
+
+
+model_tier_stats = ModelTierStats()
 
 
 def create_pipeline_chart(pipeline: Pipeline, file_name: str = "pipeline.png"):
@@ -57,26 +454,259 @@ def create_pipeline_yml(pipeline: Pipeline, file_name: str = "pipeline.yml"):
         pipeline.dump(file)
 
 
-def create_alarm_readout(input: CalendarAlarmResponse) -> str:
-    """Provides the 'description' field for google calendar
+def check_alarm_reply(
+    reply: str, now: Optional[datetime] = None
+) -> tuple[Optional[CalendarAlarmResponse], list[str]]:
+    """
+    Validates one LLM reply locally, without another round trip.
+
+    The reply must parse as a `CalendarAlarmResponse`, the event must not start in the past,
+    it must end after it starts, and a weekly recurrence must include the day it starts on.
+    Times without an offset are read as `America/New_York`.
+
+    Args:
+        reply (str): The raw reply, optionally wrapped in a markdown code block or marked DONE.
+        now (datetime, optional): The current time. Defaults to now in `America/New_York`.
+
+    Returns:
+        tuple[CalendarAlarmResponse | None, list[str]]: The parsed alarm and the problems found. The reply is
+        valid when the list is empty.
+    """
+    jsonOutput = reply.replace("DONE", "").replace("```json", "").replace("```", "")
+
+    try:
+        alarm = CalendarAlarmResponse.model_validate_json(jsonOutput)
+    except ValidationError as e:
+        return None, [
+            f"{'.'.join(str(part) for part in error['loc']) or 'reply'}: {error['msg']}"
+            for error in e.errors()
+        ]
+
+    def aware(value: datetime) -> datetime:
+        return value if value.tzinfo else value.replace(tzinfo=EVENT_TIMEZONE)
+
+    now = aware(now or datetime.now(EVENT_TIMEZONE))
+    event_time = aware(alarm.event_time)
+    event_time_end = aware(alarm.event_time_end)
+    errors = []
+
+    if event_time < now - PAST_EVENT_TOLERANCE:
+        errors.append(
+            f"event_time {alarm.event_time.isoformat()} is in the past, the current time is {now.isoformat()}"
+        )
+
+    if event_time_end <= event_time:
+        errors.append(
+            f"event_time_end {alarm.event_time_end.isoformat()} must be after event_time {alarm.event_time.isoformat()}"
+        )
+
+    # Google counts the start as an occurrence even when the rule skips that day
+    byday = recurrence_weekdays(alarm.recurrence)
+    if byday and event_time.strftime("%a")[:2].upper() not in byday:
+        errors.append(
+            f"event_time {alarm.event_time.isoformat()} is a {event_time.strftime('%A')}, "
+            f"but recurrence {alarm.recurrence} does not include it. Use the first occurrence"
+        )
+
+    return alarm, errors
+
+
+def recurrence_weekdays(recurrence: Optional[str]) -> Optional[set[str]]:
+    """
+    Reads the days a weekly RRULE falls on.
+
+    Args:
+        recurrence (str | None): The RRULE, as normalized by `CalendarAlarmResponse`.
+
+    Returns:
+        set[str] | None: Two letter day codes, e.g. `{"MO", "TH"}`, or None when the rule is not
+        weekly with plain BYDAY days.
+    """
+    if not recurrence:
+        return None
+
+    parts = dict(part.split("=", 1) for part in recurrence.split(";"))
+    if parts.get("FREQ") != "WEEKLY" or "BYDAY" not in parts:
+        return None
+
+    days = set(parts["BYDAY"].split(","))
+    return days if all(len(day) == 2 for day in days) else None
+
+
+def is_retryable_openai_error(error: BaseException) -> bool:
+    """Whether an OpenAI failure is transient: a connection error, timeout, 408, 409, 429 or 5xx."""
+    openai = lazy_imports.get("openai")
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def openai_retry_after(error: BaseException) -> Optional[float]:
+    """Reads the Retry-After header of an OpenAI error response, in seconds."""
+    response = getattr(error, "response", None)
+    header = response.headers.get("retry-after") if response is not None else None
+
+    try:
+        return float(header) if header else None
+    except ValueError:
+        return None
+
+
+@component
+class ResilientGenerator:
+    """
+    Wraps the `OpenAIGenerator` so every LLM call goes through the OpenAI circuit breaker, is
+    retried with jittered backoff on transient failures, and is optionally hedged.
+
+    #### Attributes:
+    ```
+    generator (OpenAIGenerator):
+    ```The wrapped generator. Its own client retries are turned off so the breaker sees every failure.
+    ```
+    policy (RetryPolicy):
+    ```How often and how long to back off.
+    ```
+    hedge_after (float):
+    ```Seconds before a backup call is started for a slow call. 0 disables hedging.
+    """
+
+    def __init__(
+        self,
+        generator: "OpenAIGenerator",
+        policy: RetryPolicy,
+        hedge_after: float = 0.0,
+    ):
+        self.generator = generator
+        self.policy = policy
+        self.hedge_after = hedge_after
+
+    @component.output_types(replies=list[str], meta=list[dict[str, Any]])
+    def run(self, prompt: str):
+        return call_with_retries(
+            lambda: call_hedged(
+                lambda: self.generator.run(prompt=prompt), self.hedge_after, "openai"
+            ),
+            breaker=openai_breaker,
+            policy=self.policy,
+            is_retryable=is_retryable_openai_error,
+            retry_after=openai_retry_after,
+        )
+
+
+def escalation_reason(replies: list[str], meta: list[dict[str, Any]]) -> Optional[str]:
+    """
+    Decides whether a reply is good enough to keep, or a larger model should try the prompt.
 
     Args:
-        input (CalendarAlarmResponse): The input object containing alarm information.
+        replies (list[str]): The replies of one LLM call.
+        meta (list[dict[str, Any]]): Their metadata, from `OpenAIGenerator`.
 
     Returns:
-        str: A string that describes the alarm in a format that Google Calendar can understand.
+        str | None: `invalid` if the reply fails `check_alarm_reply`, `truncated` if the model
+        stopped for any reason but the end of its reply, `flagged` if it set `error` itself,
+        or None to keep the reply.
+    """
+    if not replies:
+        return "invalid"
+
+    if any(
+        reply_meta.get("finish_reason") not in (None, "stop") for reply_meta in meta
+    ):
+        return "truncated"
+
+    alarm, errors = check_alarm_reply(replies[0])
+    if errors:
+        return "invalid"
+    if alarm.error:
+        return "flagged"
+    return None
+
+
+@component
+class ModelLadderGenerator:
+    """
+    Routes each prompt to the cheapest model of the ladder that produces a usable reply.
+
+    A prompt goes to the first model. When its reply fails the local checks of
+    `escalation_reason`, the same prompt goes to the next model, and so on up the ladder. A run
+    stays on the model it escalated to, so validation loops do not go back to a model that
+    already failed. The largest model's reply is returned even when it fails the checks, so
+    the validation loop can re-prompt it with the problems found, and `rejected` says why. A run
+    whose last reply is still rejected ends in an error response rather than an alarm.
+
+    Pooled pipelines are used by one request at a time, so call `reset` before each run.
+
+    #### Attributes:
+    ```
+    tiers (list[tuple[str, ResilientGenerator]]):
+    ```The models of the ladder with their generators, cheapest first.
+    ```
+    tier (int):
+    ```The index of the model the current run uses.
+    ```
+    escalations (int):
+    ```Calls of the current run whose reply was passed over for a larger model.
+    ```
+    rejected (str | None):
+    ```Why the largest model's last reply failed the checks, or None if the last reply passed.
     """
 
-    month = input.event_time.strftime("%B")
-    day_number = input.event_time.strftime("%d")
-    day_of_week = input.event_time.strftime("%A")
-    hour = input.event_time.strftime("%I").lstrip("0")
-    minutes_am_pm = input.event_time.strftime(":%M %p")
-    time_of_day = hour + minutes_am_pm
-    locationCondition = f"{(' at ' + input.location) if input.location else ''}"
+    def __init__(
+        self,
+        tiers: list[tuple[str, ResilientGenerator]],
+        stats: Optional[ModelTierStats] = None,
+    ):
+        if not tiers:
+            raise ValueError("The model ladder needs at least one model")
+
+        self.tiers = tiers
+        self._stats = stats
+        self.reset()
+
+    def reset(self):
+        """Starts the next run on the cheapest model."""
+        self.tier = 0
+        self.escalations = 0
+        self.rejected: Optional[str] = None
+
+    @component.output_types(replies=list[str], meta=list[dict[str, Any]])
+    def run(self, prompt: str):
+        stats = self._stats or model_tier_stats
+        meta: list[dict[str, Any]] = []
 
-    # Take care with format. Everything, even spacing - is intentional.
-    return f"{input.name.capitalize()} @ {time_of_day}{locationCondition} on {day_of_week} {month} {day_number.casefold()} #{input.category.name.lower()} [{input.lead_time}m]"
+        while True:
+            model, generator = self.tiers[self.tier]
+            last_tier = self.tier == len(self.tiers) - 1
+            start = time.perf_counter()
+
+            try:
+                result = generator.run(prompt=prompt)
+            except Exception:
+                stats.record(model, "error", time.perf_counter() - start)
+                raise
+
+            replies = result["replies"]
+            meta.extend(result.get("meta", []))
+            reason = escalation_reason(replies, result.get("meta", []))
+
+            self.rejected = reason if last_tier else None
+
+            if reason is None:
+                stats.record(model, "accepted", time.perf_counter() - start)
+                return {"replies": replies, "meta": meta}
+
+            if last_tier:
+                stats.record(model, "rejected", time.perf_counter() - start)
+                return {"replies": replies, "meta": meta}
+
+            stats.record(model, "escalated", time.perf_counter() - start)
+            loggerCalendarAlarmService.info(
+                f"Escalating from {model} to {self.tiers[self.tier + 1][0]}: {reason} reply"
+            )
+            self.tier += 1
+            self.escalations += 1
 
 
 @component
@@ -88,29 +718,56 @@ class JSONValidator:
     - run(properties: list[str]) -> dict: Validates the given properties and returns a dictionary with the validation results.
 
     Attributes:
-    - None
+    - loops (int): How many replies this validator has seen since `loops` was last reset.
+    - prompt_tokens (int), cached_prompt_tokens (int): Prompt tokens of those replies, read from the generator `meta`.
+    - listener (Callable[[int, bool], None] | None): Called with the loop number and whether the reply was final, after every reply.
         Validates the given properties and returns a dictionary with the validation results.
 
         Parameters:
         - properties (list[str]): A list of properties to be validated.
 
         Returns:
-        - dict: A dictionary containing the validation results. If the first property contains the string "DONE", the dictionary will have the key "json" with the modified property value. Otherwise, the dictionary will have the key "properties_to_validate" with the original property value.
+        - dict: A dictionary containing the validation results. If the first property passes `check_alarm_reply`, the dictionary will have the key "json" with the validated JSON. Otherwise, the dictionary will have the key "properties_to_validate" with the original property value and "validation_errors" listing what to fix, so the next prompt can be specific.
 
         Example:
         ```
         validator = JSONValidator()
-        result = validator.run(["DONE: property1"])
-        print(result)  # Output: {"json": ": property1"}
+        result = validator.run(['{"name": "Test Event"}'])
+        print(result["validation_errors"])  # Output: "- lead_time: Field required\n- ..."
         ```
     """
 
-    @component.output_types(properties_to_validate=list[str], json=str)
-    def run(self, properties: list[str]):
-        if "DONE" in properties[0]:
-            return {"json": properties[0].replace("Done", "")}
+    def __init__(self):
+        self.listener: Optional[Callable[[int, bool], None]] = None
+        self.reset()
+
+    def reset(self):
+        """Resets the per-run loop and token counters."""
+        self.loops = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+
+    @component.output_types(
+        properties_to_validate=list[str], validation_errors=str, json=str
+    )
+    def run(self, properties: list[str], meta: Optional[list[dict[str, Any]]] = None):
+        self.loops += 1
+        prompt_tokens, cached_prompt_tokens = prompt_token_usage(meta or [])
+        self.prompt_tokens += prompt_tokens
+        self.cached_prompt_tokens += cached_prompt_tokens
+        alarm, errors = check_alarm_reply(properties[0])
+        done = not errors
+
+        if self.listener is not None:
+            self.listener(self.loops, done)
+
+        if done:
+            return {"json": alarm.model_dump_json()}
         else:
-            return {"properties_to_validate": properties[0]}
+            return {
+                "properties_to_validate": properties[0],
+                "validation_errors": "\n".join(f"- {error}" for error in errors),
+            }
 
 
 @component
@@ -120,11 +777,21 @@ class CalendarAlarmServicePipeline:
 
     #### Attributes:
     ```
-    _generator (OpenAIGenerator):
-    ```The OpenAIGenerator instance.
+    _generators (list[OpenAIGenerator]):
+    ```One OpenAIGenerator per model of the ladder, cheapest first.
+    ```
+    _router (ModelLadderGenerator):
+    ```Sends each prompt up the model ladder until a reply passes the local checks.
     ```
     _pipeline (Pipeline):
     ```The Pipeline instance.
+    ```
+    _traced (bool):
+    ```Whether runs are recorded for Langfuse, i.e. whether Langfuse keys were set at construction.
+    ```
+    mode (str):
+    ````loop` to re-prompt the LLM with the problems found until its reply validates, or `structured` for a single
+    call constrained to the `CalendarAlarmResponse` JSON schema.
     #### Methods:
         ```
         run(input: str) -> GoogleCalendarInfoInput:
@@ -141,16 +808,81 @@ class CalendarAlarmServicePipeline:
 
     _max_loops_allowed: int
 
-    def __init__(self, max_loops_allowed: int = 20):
-        self._generator = OpenAIGenerator(
-            model="gpt-4.1",
-            generation_kwargs={"temperature": 0},
-            api_key=Secret.from_env_var("OPENAI_API_KEY"),
-        )
+    def __init__(
+        self,
+        max_loops_allowed: int = 20,
+        mode: str = "loop",
+        models: Optional[list[str]] = None,
+    ):
+        if mode not in EXTRACTION_MODES:
+            raise ValueError(
+                f"Unknown extraction mode {mode!r}, expected one of {EXTRACTION_MODES}"
+            )
+
+        self.mode = mode
+
+        generation_kwargs: dict[str, Any] = {"temperature": 0}
+        if self.mode == "structured":
+            generation_kwargs["response_format"] = create_response_format(
+                CalendarAlarmResponse
+            )
+
+        self._models = list(models or MODEL_LADDER)
+        OpenAIGenerator = lazy_imports.get("OpenAIGenerator")
+        self._generators = [
+            OpenAIGenerator(
+                model=model,
+                generation_kwargs=generation_kwargs,
+                api_key=Secret.from_env_var("OPENAI_API_KEY"),
+                timeout=OPENAI_TIMEOUT,
+                max_retries=0,
+            )
+            for model in self._models
+        ]
 
         self._max_loops_allowed = max_loops_allowed
 
         self._pipeline = Pipeline(max_loops_allowed=self._max_loops_allowed)
+        self._connect_pipeline()
+
+    def _connect_pipeline(self):
+        """
+        Adds and connects the pipeline components.
+
+        Called once per instance so that `run` only executes the already wired pipeline. In
+        `structured` mode the reply already matches the schema, so the validator loop is left out.
+        Runs are only traced when Langfuse keys are set: without them every export would fail.
+        """
+        self._traced = langfuse_configured()
+        enable_stage_timing()
+        self._pipeline.add_component(
+            "prompt_builder", PromptBuilder(template=load_prompt_template())
+        )
+        policy = RetryPolicy(attempts=LLM_RETRY_ATTEMPTS)
+        self._router = ModelLadderGenerator(
+            [
+                (model, ResilientGenerator(generator, policy, LLM_HEDGE_AFTER))
+                for model, generator in zip(self._models, self._generators)
+            ]
+        )
+        self._pipeline.add_component("generator", self._router)
+        self._pipeline.connect("prompt_builder.prompt", "generator.prompt")
+
+        # Also holds the listener and loop count in `structured` mode, where it is not wired in
+        self._validator = JSONValidator()
+
+        if self.mode == "structured":
+            return
+
+        self._pipeline.add_component("validator", self._validator)
+        self._pipeline.connect("generator.replies", "validator.properties")
+        self._pipeline.connect("generator.meta", "validator.meta")
+        self._pipeline.connect(
+            "validator.properties_to_validate", "prompt_builder.properties_to_validate"
+        )
+        self._pipeline.connect(
+            "validator.validation_errors", "prompt_builder.validation_errors"
+        )
 
     def cleanJsonOutput(self, jsonOutput: str) -> str:
         """
@@ -167,29 +899,94 @@ class CalendarAlarmServicePipeline:
         jsonOutput = jsonOutput.replace("```", "")
         return jsonOutput
 
+    def set_validation_listener(self, listener: Optional[Callable[[int, bool], None]]):
+        """
+        Registers a callback invoked after every validation loop of the next runs.
+
+        In `structured` mode it is called once per run, as the single reply is final.
+
+        Pooled instances are used by one request at a time, so the caller sets the listener
+        before `run` and clears it with `None` afterwards.
+
+        Args:
+            listener (Callable[[int, bool], None] | None): Receives the loop number and whether the reply was final.
+        """
+        self._validator.listener = listener
+
+    def warm_up(self, input: str) -> GoogleCalendarInfoInput:
+        """
+        Sends `input` through every stage of a run except the LLM call, whose reply is canned.
+
+        The first run of each stage is slower than the rest, so a warmup request runs this at
+        startup. Nothing is traced, counted or cached, and the loop counters are left untouched.
+
+        Args:
+            input (str): The user input to render the prompt with.
+
+        Returns:
+            GoogleCalendarInfoInput: The canned alarm, as a run would return it.
+        """
+        now = datetime.now(EVENT_TIMEZONE)
+        event_time = now.replace(hour=17, minute=0, second=0, microsecond=0)
+        event_time += timedelta(days=1)
+        reply = CalendarAlarmResponse(
+            name="Warm up",
+            category=Category.ALWAYS,
+            lead_time=5,
+            event_time=event_time,
+            event_time_end=event_time + timedelta(minutes=30),
+            location=None,
+            error=False,
+            current_time=now,
+        ).model_dump_json()
+
+        self._pipeline.get_component("prompt_builder").run(
+            input={"user_input": input, "current_time": now.isoformat()}
+        )
+        validated = JSONValidator().run([f"```json\n{reply}\n```"])
+        alarm = CalendarAlarmResponse.model_validate_json(
+            self.cleanJsonOutput(validated["json"])
+        )
+
+        return GoogleCalendarInfoInput(
+            response=create_alarm_readout(alarm), theJson=alarm
+        )
+
     @component.output_types(output=GoogleCalendarInfoInput)
     def run(self, input: str) -> GoogleCalendarInfoInput | GoogleCalendarResponse:
+        """
+        Extracts the alarm from the input, tracing the run when Langfuse is configured.
+
+        Traces are sampled by `TRACE_SAMPLE_RATE`, failed runs are always traced unless
+        `TRACE_ERRORS` is false, and traces are exported from a background thread.
+        """
+        if not self._traced:
+            return self._run(input)
+
+        content = tracing.tracer.is_content_tracing_enabled
+        with trace_recorder.record(
+            "Calendar Alarm Service", input if content else None
+        ) as trace:
+            result = self._run(input)
+
+            if trace is not None:
+                if isinstance(result, GoogleCalendarResponse):
+                    trace.error = result.error
+                elif content:
+                    trace.output = result.response
+
+        return result
+
+    def _run(self, input: str) -> GoogleCalendarInfoInput | GoogleCalendarResponse:
+        # The prompt and the checks share one aware time, whatever the server's timezone
+        now = datetime.now(EVENT_TIMEZONE)
         modified_input = {
             "user_input": input,
-            "current_time": datetime.now().isoformat(),
+            "current_time": now.isoformat(),
         }
 
-        prompt_builder = PromptBuilder(template=template_content)
-        generator = self._generator
-        json_validator = JSONValidator()
-
-        self._pipeline.add_component(
-            "tracer", LangfuseConnector("Calendar Alarm Service")
-        )
-        self._pipeline.add_component("prompt_builder", prompt_builder)
-        self._pipeline.add_component("generator", generator)
-        self._pipeline.add_component("validator", json_validator)
-
-        self._pipeline.connect("prompt_builder.prompt", "generator.prompt")
-        self._pipeline.connect("generator.replies", "validator.properties")
-        self._pipeline.connect(
-            "validator.properties_to_validate", "prompt_builder.properties_to_validate"
-        )
+        self._validator.reset()
+        self._router.reset()
 
         results = self._pipeline.run(
             data={
@@ -197,20 +994,135 @@ class CalendarAlarmServicePipeline:
             }
         )
 
-        jsonOutput: str = results["validator"]["json"].replace("DONE", "")
+        if self.mode == "structured":
+            self._validator.loops = 1
+            (
+                self._validator.prompt_tokens,
+                self._validator.cached_prompt_tokens,
+            ) = prompt_token_usage(results["generator"].get("meta", []))
+            if self._validator.listener is not None:
+                self._validator.listener(1, True)
+            jsonOutput: str = results["generator"]["replies"][0]
+        else:
+            jsonOutput = results["validator"]["json"].replace("DONE", "")
+
+        # Every reply the validator saw, plus the replies passed over for a larger model
+        calls = self._validator.loops + self._router.escalations
+
+        loggerCalendarAlarmService.info(
+            f"{calls} LLM calls up to {self._models[self._router.tier]}, "
+            f"{self._validator.prompt_tokens} prompt tokens "
+            f"({self._validator.cached_prompt_tokens} cached)"
+        )
+        VALIDATION_LOOPS.inc(self._validator.loops, mode=self.mode)
+        llm_call_stats.record(
+            self.mode,
+            calls,
+            self._validator.prompt_tokens,
+            self._validator.cached_prompt_tokens,
+        )
+
+        if self._router.rejected is not None:
+            ERRORS.inc(type="rejected_alarm_reply")
+            return GoogleCalendarResponse(
+                error=f"Error in Google Calendar Service: every model gave a {self._router.rejected} reply"
+            )
+
+        if self.mode == "structured":
+            # The schema guarantees the shape, not that the times make sense
+            _, errors = check_alarm_reply(jsonOutput, now)
+            if errors:
+                ERRORS.inc(type="invalid_alarm_reply")
+                return GoogleCalendarResponse(
+                    error=f"Error in Google Calendar Service: {'; '.join(errors)}"
+                )
 
         jsonOutput = self.cleanJsonOutput(jsonOutput)
 
         try:
             parsedJsonObject = CalendarAlarmResponse.model_validate_json(jsonOutput)
 
-            print(f"LangFuse: {results['tracer']['trace_url']}\n")
-
             return GoogleCalendarInfoInput(
                 response=create_alarm_readout(parsedJsonObject),
                 theJson=parsedJsonObject,
             )
         except Exception as e:
+            ERRORS.inc(type=type(e).__name__)
             return GoogleCalendarResponse(
                 error=f"Error in Google Calendar Service: {e}"
             )
+
+
+class CalendarAlarmPipelinePool:
+    """
+    Bounded pool of ready-to-run `CalendarAlarmServicePipeline` instances.
+
+    A connected Haystack pipeline is not safe to run from two threads at once, so each
+    in-flight request borrows its own instance and returns it when done. `warm` instances are
+    built by `start` (call it from the application lifespan); further instances are built on
+    demand, off the event loop, until `size` exist. After that, requests wait for a free one.
+    A borrower holds one of `size` slots from before it builds until it returns the instance,
+    so when a build fails its slot goes to the next waiting borrower, which builds in turn.
+
+    #### Attributes:
+    ```
+    size (int):
+    ```The maximum number of pipeline instances.
+    ```
+    created (int):
+    ```The number of pipeline instances built so far.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], CalendarAlarmServicePipeline],
+        size: int,
+        warm: int = 1,
+    ):
+        if size < 1:
+            raise ValueError("Pipeline pool size must be at least 1")
+
+        self._factory = factory
+        self._size = size
+        self._warm = max(0, min(warm, size))
+        self._idle: list[CalendarAlarmServicePipeline] = []
+        self._slots = asyncio.Semaphore(size)
+        self._created = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def created(self) -> int:
+        return self._created
+
+    async def start(self):
+        """Builds the `warm` pipeline instances ahead of the first request."""
+        while self._created < self._warm:
+            self._idle.append(await self._build())
+
+    async def _build(self) -> CalendarAlarmServicePipeline:
+        self._created += 1
+        try:
+            return await run_blocking(self._factory)
+        except BaseException:
+            self._created -= 1
+            raise
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[CalendarAlarmServicePipeline]:
+        """
+        Borrows a pipeline instance for the duration of the `async with` block.
+
+        Yields:
+            CalendarAlarmServicePipeline: A connected pipeline reserved for the caller.
+        """
+        async with self._slots:
+            # Every other instance is borrowed, so fewer than `size` exist and one can be built
+            pipeline = self._idle.pop() if self._idle else await self._build()
+
+            try:
+                yield pipeline
+            finally:
+                self._idle.append(pipeline)
@@ -0,0 +1,41 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+T = TypeVar("T")
+
+ALARM_CONCURRENCY = int(os.getenv("ALARM_CONCURRENCY", 32))
+# Defaults to 32 if ALARM_CONCURRENCY is not set.
+
+_executor = ThreadPoolExecutor(
+    max_workers=ALARM_CONCURRENCY, thread_name_prefix="calarmhelp-worker"
+)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Runs a blocking callable on the alarm worker pool without blocking the event loop.
+
+    The OpenAI round trips made by the Haystack pipeline and the `execute()` calls made by
+    googleapiclient are synchronous. Offloading them here lets a single uvicorn worker keep
+    `ALARM_CONCURRENCY` alarms in flight at once, while any extra requests wait on the loop
+    instead of tying up a thread.
+
+    Args:
+        func (Callable): The blocking callable to run.
+        *args: Positional arguments passed to `func`.
+        **kwargs: Keyword arguments passed to `func`.
+
+    Returns:
+        The return value of `func`.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executor, functools.partial(func, *args, **kwargs)
+    )
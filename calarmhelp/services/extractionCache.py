@@ -0,0 +1,194 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from calarmhelp.services.util.util import GoogleCalendarInfoInput
+
+EVENT_TIMEZONE = ZoneInfo("America/New_York")
+
+RELATIVE_TIME_RE = re.compile(
+    r"\b(?:in|within|after)\s+(?:\S+\s+){0,3}?"
+    r"(?:secs?|seconds?|mins?|minutes?|hrs?|hours?|bit|moment|while)\b"
+    r"|\b(?:from now|later|soon|shortly|now|asap|right away|tonight|tonite"
+    r"|this (?:morning|afternoon|evening))\b"
+)
+# Times counted from the current time of day, like "in 20 minutes", or named for the rest of it,
+# like "tonight". Their extraction changes by the minute, so they are never cached.
+
+
+def normalize_input(user_input: str) -> str:
+    """
+    Normalizes user input so trivially different utterances share a cache entry.
+
+    Args:
+        user_input (str): The input provided by the user.
+
+    Returns:
+        str: The input casefolded, with whitespace collapsed and trailing punctuation removed.
+    """
+    text = unicodedata.normalize("NFKC", user_input).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" .!?,;")
+
+
+def is_relative_to_now(user_input: str) -> bool:
+    """
+    Whether the input gives its time relative to the current time of day, e.g. "in 20 minutes".
+
+    Args:
+        user_input (str): The input provided by the user.
+
+    Returns:
+        bool: True if `RELATIVE_TIME_RE` finds such a time in the normalized input.
+    """
+    return RELATIVE_TIME_RE.search(normalize_input(user_input)) is not None
+
+
+class ExtractionCache:
+    """
+    Bounded LRU cache of LLM extraction results with a TTL.
+
+    An extraction depends on the input and on `current_time`: "at 5PM" means today before 5PM
+    and tomorrow after it. Entries are therefore keyed on the normalized input plus the current
+    date, and an entry is only served while the current time is still before the cached event
+    time. Past that point the same words would resolve to a different day. Inputs timed
+    relative to now, like "in 20 minutes" or "later", resolve differently every minute and are
+    neither looked up nor stored.
+
+    #### Attributes:
+    ```
+    hits (int):
+    ```Lookups answered from the cache.
+    ```
+    misses (int):
+    ```Lookups that had to run the LLM.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: int = 3600):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[
+            tuple[str, str], tuple[float, GoogleCalendarInfoInput]
+        ] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._maxsize > 0
+
+    @staticmethod
+    def _now(now: Optional[datetime]) -> datetime:
+        now = now or datetime.now(EVENT_TIMEZONE)
+        return now if now.tzinfo else now.replace(tzinfo=EVENT_TIMEZONE)
+
+    @staticmethod
+    def _key(user_input: str, now: datetime) -> tuple[str, str]:
+        return (
+            normalize_input(user_input),
+            now.astimezone(EVENT_TIMEZONE).date().isoformat(),
+        )
+
+    @staticmethod
+    def _still_upcoming(entry: GoogleCalendarInfoInput, now: datetime) -> bool:
+        event_time = entry.jsonResponse.event_time
+        if event_time.tzinfo is None:
+            event_time = event_time.replace(tzinfo=EVENT_TIMEZONE)
+        return now < event_time
+
+    def get(
+        self, user_input: str, now: Optional[datetime] = None
+    ) -> Optional[GoogleCalendarInfoInput]:
+        """
+        Returns the cached extraction for `user_input`, with `current_time` set to now.
+
+        Args:
+            user_input (str): The input provided by the user.
+            now (datetime, optional): The current time. Defaults to now in `America/New_York`.
+
+        Returns:
+            GoogleCalendarInfoInput | None: The cached extraction, or None on a miss or an input relative to now.
+        """
+        if not self.enabled or is_relative_to_now(user_input):
+            return None
+
+        now = self._now(now)
+        key = self._key(user_input, now)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and (
+                time.monotonic() >= entry[0] or not self._still_upcoming(entry[1], now)
+            ):
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        cached = entry[1]
+        return cached.model_copy(
+            update={
+                "jsonResponse": cached.jsonResponse.model_copy(
+                    update={"current_time": now}
+                )
+            }
+        )
+
+    def put(
+        self,
+        user_input: str,
+        extraction: GoogleCalendarInfoInput,
+        now: Optional[datetime] = None,
+    ):
+        """
+        Stores a successful extraction, evicting the least recently used entry when full.
+
+        Args:
+            user_input (str): The input provided by the user.
+            extraction (GoogleCalendarInfoInput): The extraction to cache.
+            now (datetime, optional): The time the extraction was made for. Defaults to now.
+        """
+        if (
+            not self.enabled
+            or extraction.jsonResponse.error
+            or is_relative_to_now(user_input)
+        ):
+            return
+
+        key = self._key(user_input, self._now(now))
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, extraction)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drops every entry and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Returns the hit and miss counters and the current number of entries."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
@@ -0,0 +1,495 @@
+import logging
+import re
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from calarmhelp.services.util.util import CalendarAlarmResponse, Category
+
+loggerFastPathParser = logging.getLogger("Fast Path Parser")
+
+EVENT_TIMEZONE = "America/New_York"
+DEFAULT_LEAD_TIME = 30
+DEFAULT_DURATION = timedelta(minutes=30)
+
+WEEKDAYS = [
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+]
+
+_UNIT = r"(?P<unit>minutes?|mins?|hours?|hrs?)"
+_AMOUNT = r"(?P<amount>\d+|an?|half an)"
+
+# Clock times. Only times with an explicit meridiem or in 24h "HH:MM" form are unambiguous.
+# "7:00" may be morning or evening, so a 24h time needs a two digit hour.
+TIME_RE = re.compile(
+    r"(?:\b(?:at|@|by)\s+)?\b(?P<hour>\d{1,2})(?::(?P<minute>[0-5]\d))?\s*"
+    r"(?P<meridiem>a\.?m\.?|p\.?m\.?)(?![a-z])",
+    re.IGNORECASE,
+)
+TIME_24H_RE = re.compile(
+    r"(?:\b(?:at|@|by)\s+)?\b(?P<hour>[01]\d|2[0-3]):(?P<minute>[0-5]\d)\b",
+    re.IGNORECASE,
+)
+TIME_WORD_RE = re.compile(
+    r"(?:\b(?:at|by)\s+)?\b(?P<word>noon|midnight)\b", re.IGNORECASE
+)
+
+DAY_RE = re.compile(
+    r"\b(?:(?P<after>(?:the\s+)?day\s+after\s+tomorrow)|(?P<relative>today|tonight|tomorrow)"
+    r"|(?:(?P<qualifier>on|this|next)\s+)?(?P<weekday>" + "|".join(WEEKDAYS) + r"))\b",
+    re.IGNORECASE,
+)
+_WEEKDAY = r"(?:" + "|".join(WEEKDAYS) + r")"
+_DAY_LIST = r"(?:\s*,\s*(?:and\s+)?|\s+(?:and|&)\s+)"
+
+# Recurring schedules we can turn into an RRULE. "on Mondays" recurs, "on Monday" does not.
+RECURRENCE_RE = re.compile(
+    r"\b(?:(?P<daily>(?:every|each)\s+day|daily)"
+    r"|(?P<weekdays>(?:every|each)\s+weekday|(?:on\s+)?weekdays)"
+    r"|(?P<weekends>(?:every|each)\s+weekend|(?:on\s+)?weekends)"
+    r"|(?:every|each)\s+(?P<days>"
+    + _WEEKDAY
+    + r"s?(?:"
+    + _DAY_LIST
+    + _WEEKDAY
+    + r"s?)*)"
+    r"|on\s+(?P<plural_days>" + _WEEKDAY + r"s(?:" + _DAY_LIST + _WEEKDAY + r"s)*))\b",
+    re.IGNORECASE,
+)
+RRULE_DAYS = [weekday[:2].upper() for weekday in WEEKDAYS]
+
+PART_OF_DAY_RE = re.compile(
+    r"\b(?:in\s+the\s+|this\s+)?(?P<part>morning|afternoon|evening|night)\b",
+    re.IGNORECASE,
+)
+
+LEAD_TIME_RES = [
+    re.compile(
+        r"\b(?:with\s+)?(?:an?\s+)?(?P<amount>\d+)[\s-]*"
+        + _UNIT
+        + r"\s+(?:reminder|warning|heads[\s-]?up|notice)\b",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        r"\b(?:and\s+)?(?:remind|alert|notify)\s+me\s+"
+        + _AMOUNT
+        + r"\s*"
+        + _UNIT
+        + r"\s+(?:before(?:hand)?|early|earlier|ahead(?:\s+of\s+time)?|prior|in\s+advance)\b",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        r"\b"
+        + _AMOUNT
+        + r"\s*"
+        + _UNIT
+        + r"\s+(?:before(?:hand)?|early|earlier|ahead(?:\s+of\s+time)?|prior|in\s+advance)\b",
+        re.IGNORECASE,
+    ),
+]
+DURATION_RE = re.compile(r"\bfor\s+" + _AMOUNT + r"\s*" + _UNIT + r"\b", re.IGNORECASE)
+
+LOCATIONS = {
+    "home": Category.HOME,
+    "work": Category.WORK,
+    "the office": Category.WORK,
+    "office": Category.WORK,
+    "the gym": None,
+    "gym": None,
+    "school": None,
+    "church": None,
+    "the store": None,
+}
+LOCATION_RE = re.compile(
+    r"\b(?:at|in)\s+(?P<location>"
+    + "|".join(sorted(LOCATIONS, key=len, reverse=True))
+    + r")\b",
+    re.IGNORECASE,
+)
+CATEGORY_RE = re.compile(r"(?:#|\bfor\s+)(?P<category>home|work)\b", re.IGNORECASE)
+
+PREFIX_RE = re.compile(
+    r"^\s*(?:please\s+)?(?:remind\s+me\s+(?:to\s+)?|don'?t\s+let\s+me\s+forget\s+to\s+"
+    r"|i\s+(?:need|have)\s+to\s+)",
+    re.IGNORECASE,
+)
+DANGLING_RE = re.compile(
+    r"^(?:and|with|at|on|by|then)\b\s*|\s*\b(?:and|with|at|on|by|then|to)$",
+    re.IGNORECASE,
+)
+
+# A word left in the name is only safe when it is a plain word, capitalised at most: digits,
+# "5pm", "EST" or "iPhone" send the input to the LLM. Plain words that carry timing are listed
+# below, so they do too.
+SAFE_WORD_RE = re.compile(r"[A-Za-z][a-z]*(?:['’-][a-z]+)*")
+
+_TIME_UNITS = ["second", "minute", "min", "hour", "hr", "day", "week", "fortnight"]
+_TIME_UNITS += ["month", "quarter", "year", "decade", "weekday", "weekend", "night"]
+
+TIMEZONE_WORDS = {
+    "time", "timezone", "zone", "local", "daylight", "standard", "utc", "gmt", "z",
+    "zulu", "et", "ct", "mt", "pt", "est", "edt", "cst", "cdt", "mst", "mdt", "pst",
+    "pdt", "akst", "akdt", "hst", "ast", "adt", "nst", "ndt", "bst", "ist", "cet",
+    "cest", "eet", "eest", "wet", "west", "jst", "kst", "aest", "aedt", "acst",
+    "awst", "nzst", "nzdt", "eastern", "central", "mountain", "pacific", "atlantic",
+    "alaska", "alaskan", "hawaii", "hawaiian", "arizona", "newfoundland",
+    "greenwich", "america", "europe", "asia", "africa", "australia", "canada",
+    "mexico", "london", "dublin", "lisbon", "paris", "berlin", "madrid", "rome",
+    "amsterdam", "brussels", "zurich", "vienna", "stockholm", "oslo", "helsinki",
+    "athens", "istanbul", "moscow", "dubai", "mumbai", "delhi", "kolkata",
+    "singapore", "shanghai", "beijing", "tokyo", "seoul", "sydney", "melbourne",
+    "auckland", "johannesburg", "cairo", "lagos", "chicago", "denver", "phoenix",
+    "houston", "dallas", "detroit", "boston", "seattle", "toronto", "vancouver",
+    "honolulu", "anchorage",
+}  # fmt: skip
+# Timezones, and the regions and cities they are named after. "At 5pm Central" or "5pm London
+# time" is not 5pm in New York, so any of these words sends the input to the LLM.
+TIMEZONE_RE = re.compile(
+    r"\b(?:" + "|".join(sorted(TIMEZONE_WORDS, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+
+NUMBER_WORDS = {
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine",
+    "ten", "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen",
+    "seventeen", "eighteen", "nineteen", "twenty", "thirty", "forty", "fifty",
+    "sixty", "seventy", "eighty", "ninety", "hundred", "thousand", "dozen",
+    "couple", "few", "several", "half", "once", "twice", "first", "second",
+    "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth",
+    "eleventh", "twelfth", "twentieth", "thirtieth",
+}  # fmt: skip
+
+TEMPORAL_WORDS = (
+    {unit for unit in _TIME_UNITS}
+    | {unit + "s" for unit in _TIME_UNITS}
+    | {
+        "hourly", "daily", "nightly", "weekly", "biweekly", "fortnightly", "monthly",
+        "quarterly", "yearly", "annual", "annually", "every", "each", "until", "till",
+        "from", "before", "after", "ago", "since", "later", "soon", "now", "early",
+        "earlier", "asap", "next", "last", "today", "tonight", "tomorrow", "tmrw",
+        "yesterday", "morning", "afternoon", "evening", "noon", "midnight", "dawn",
+        "dusk", "sunrise", "sunset", "o'clock", "oclock", "am", "pm", "remind",
+        "reminder", "reminders", "january", "february", "march", "april", "may",
+        "june", "july", "august", "september", "october", "november", "december",
+        "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov",
+        "dec", "mon", "tue", "tues", "wed", "thu", "thur", "thurs", "fri", "sat",
+        "sun", "christmas", "xmas", "thanksgiving", "easter", "halloween", "hanukkah",
+        "passover", "ramadan", "eid", "diwali", "valentine", "valentines", "eve",
+        "holiday", "holidays", "birthday", "anniversary", "at", "by", "while", "moment",
+    }  # fmt: skip
+    | {weekday for weekday in WEEKDAYS}
+    | {weekday + "s" for weekday in WEEKDAYS}
+    | NUMBER_WORDS
+    | TIMEZONE_WORDS
+)
+# Plain words that mean the input carries timing we did not parse.
+
+
+def is_safe_word(word: str) -> bool:
+    """Whether a word left over in the name carries no number, date, time or timezone."""
+    if not SAFE_WORD_RE.fullmatch(word):
+        return False
+    word = word.lower().replace("’", "'").removesuffix("'s")
+    return word not in TEMPORAL_WORDS and word.removesuffix("s") not in TEMPORAL_WORDS
+
+
+def _minutes(amount: str, unit: str) -> int:
+    amount = amount.lower()
+    if amount in ("a", "an"):
+        value = 1.0
+    elif amount == "half an":
+        value = 0.5
+    else:
+        value = float(amount)
+
+    return int(value * 60) if unit.lower().startswith(("h",)) else int(value)
+
+
+class FastPathParser:
+    """
+    Rule-based extractor for the phrasings most of our traffic uses.
+
+    Fills `CalendarAlarmResponse` directly when every part of the input is understood, for
+    example "Respond to Tom at 5PM tomorrow with a 5 minute reminder", and simple recurring
+    schedules such as "Gym every weekday at 6am". Anything ambiguous, such as a time without
+    AM/PM, a schedule like "every other day" or leftover words that look like timing, returns
+    None so the caller can fall back to the LLM pipeline.
+
+    #### Attributes:
+    ```
+    hits (int):
+    ```Inputs parsed without the LLM.
+    ```
+    misses (int):
+    ```Inputs handed back to the LLM.
+    """
+
+    def __init__(self, timezone: str = EVENT_TIMEZONE):
+        try:
+            self._timezone: Optional[ZoneInfo] = ZoneInfo(timezone)
+        except ZoneInfoNotFoundError:
+            loggerFastPathParser.warning(
+                f"Timezone {timezone} unavailable, fast path disabled"
+            )
+            self._timezone = None
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        """Returns the hit and miss counters, for reporting LLM calls saved."""
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate}
+
+    def parse(
+        self, text: str, now: Optional[datetime] = None
+    ) -> Optional[CalendarAlarmResponse]:
+        """
+        Extracts an alarm from `text` when it is recognised with high confidence.
+
+        Args:
+            text (str): The user input.
+            now (datetime, optional): The current time. Defaults to now in `America/New_York`.
+
+        Returns:
+            CalendarAlarmResponse | None: The alarm, or None when the LLM should handle the input.
+        """
+        alarm = None
+        if self._timezone is not None:
+            try:
+                alarm = self._parse(text, now or datetime.now(self._timezone))
+            except ValueError as e:
+                loggerFastPathParser.debug(f"Fast path rejected input: {e}")
+
+        with self._lock:
+            if alarm is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return alarm
+
+    def _parse(self, text: str, now: datetime) -> Optional[CalendarAlarmResponse]:
+        if now.tzinfo is None:
+            now = now.replace(tzinfo=self._timezone)
+
+        if TIMEZONE_RE.search(text):
+            return None
+
+        spans: list[tuple[int, int]] = []
+
+        def take(regex: re.Pattern, source: str) -> list[re.Match]:
+            # Remember what each rule consumed so the rest of the text becomes the name
+            matches = list(regex.finditer(source))
+            spans.extend(match.span() for match in matches)
+            return matches
+
+        clock = self._clock_time(text, take)
+        if clock is None:
+            return None
+        event_clock, meridiem = clock
+
+        recurrences = take(RECURRENCE_RE, text)
+        if len(recurrences) > 1:
+            return None
+        recurrence, byday = (
+            self._recurrence(recurrences[0]) if recurrences else (None, None)
+        )
+
+        # Weekdays in a schedule are not the day of the event
+        days = take(DAY_RE, self._mask(text, RECURRENCE_RE))
+        if len(days) > 1 or (days and recurrence):
+            return None
+
+        parts = take(PART_OF_DAY_RE, text)
+        if not self._parts_match(parts, meridiem):
+            return None
+
+        lead_time = DEFAULT_LEAD_TIME
+        for regex in LEAD_TIME_RES:
+            leads = take(regex, text)
+            if len(leads) > 1:
+                return None
+            if leads:
+                lead_time = _minutes(leads[0]["amount"], leads[0]["unit"])
+                break
+
+        duration = DEFAULT_DURATION
+        durations = take(DURATION_RE, text)
+        if len(durations) > 1:
+            return None
+        if durations:
+            duration = timedelta(
+                minutes=_minutes(durations[0]["amount"], durations[0]["unit"])
+            )
+
+        location = None
+        category = Category.ALWAYS
+        locations = take(LOCATION_RE, text)
+        if len(locations) > 1:
+            return None
+        if locations:
+            location = locations[0]["location"].lower()
+            category = LOCATIONS[location] or Category.ALWAYS
+
+        categories = take(CATEGORY_RE, text)
+        if len({match["category"].lower() for match in categories}) > 1:
+            return None
+        if categories:
+            category = Category(categories[0]["category"].lower())
+
+        name = self._name(text, spans)
+        if not name:
+            return None
+
+        event_date = self._event_date(days[0] if days else None, event_clock, now)
+        if event_date is None:
+            return None
+        while byday is not None and event_date.weekday() not in byday:
+            # The event starts at the first occurrence
+            event_date += timedelta(days=1)
+
+        event_time = datetime.combine(event_date, event_clock, tzinfo=self._timezone)
+        if event_time <= now:
+            return None
+
+        return CalendarAlarmResponse(
+            name=name,
+            category=category,
+            lead_time=lead_time,
+            event_time=event_time,
+            event_time_end=event_time + duration,
+            location=location,
+            recurrence=recurrence,
+            error=False,
+            current_time=now,
+        )
+
+    @staticmethod
+    def _recurrence(match: re.Match) -> tuple[str, Optional[set[int]]]:
+        """Returns the RRULE for a recurring schedule, and the weekdays it falls on, if not every day."""
+        if match["daily"]:
+            return "FREQ=DAILY", None
+        if match["weekdays"]:
+            byday = {0, 1, 2, 3, 4}
+        elif match["weekends"]:
+            byday = {5, 6}
+        else:
+            names = re.findall(_WEEKDAY, match["days"] or match["plural_days"], re.I)
+            byday = {WEEKDAYS.index(name.lower()) for name in names}
+
+        return (
+            "FREQ=WEEKLY;BYDAY=" + ",".join(RRULE_DAYS[day] for day in sorted(byday)),
+            byday,
+        )
+
+    def _clock_time(self, text: str, take) -> Optional[tuple[time, Optional[str]]]:
+        found: list[tuple[time, Optional[str]]] = []
+
+        for match in take(TIME_RE, text):
+            hour = int(match["hour"])
+            if not 1 <= hour <= 12:
+                raise ValueError(f"Invalid 12h hour {hour}")
+            meridiem = match["meridiem"].lower().replace(".", "")
+            hour = hour % 12 + (12 if meridiem == "pm" else 0)
+            found.append((time(hour, int(match["minute"] or 0)), meridiem))
+
+        # 12h times are masked out so "5:30pm" is not also read as the 24h time "5:30"
+        masked = self._mask(text, TIME_RE)
+        for match in take(TIME_24H_RE, masked):
+            found.append((time(int(match["hour"]), int(match["minute"])), None))
+
+        for match in take(TIME_WORD_RE, text):
+            if match["word"].lower() == "noon":
+                found.append((time(12, 0), "pm"))
+            else:
+                found.append((time(0, 0), "am"))
+
+        return found[0] if len(found) == 1 else None
+
+    @staticmethod
+    def _mask(text: str, regex: re.Pattern) -> str:
+        return regex.sub(lambda match: " " * len(match.group(0)), text)
+
+    @staticmethod
+    def _parts_match(parts: list[re.Match], meridiem: Optional[str]) -> bool:
+        for match in parts:
+            expected = "am" if match["part"].lower() == "morning" else "pm"
+            if meridiem != expected:
+                return False
+        return True
+
+    def _event_date(
+        self, day: Optional[re.Match], event_clock: time, now: datetime
+    ) -> Optional[date]:
+        today = now.date()
+        upcoming = event_clock > now.timetz().replace(tzinfo=None)
+
+        if day is None:
+            return today if upcoming else today + timedelta(days=1)
+
+        if day["after"]:
+            return today + timedelta(days=2)
+
+        relative = (day["relative"] or "").lower()
+        if relative == "tomorrow":
+            return today + timedelta(days=1)
+        if relative == "tonight" and event_clock.hour < 12:
+            return None
+        if relative in ("today", "tonight"):
+            return today
+
+        if (day["qualifier"] or "").lower() == "next":
+            # "next Friday" means different days to different people
+            return None
+
+        days_ahead = (WEEKDAYS.index(day["weekday"].lower()) - today.weekday()) % 7
+        if days_ahead == 0 and not upcoming:
+            days_ahead = 7
+        return today + timedelta(days=days_ahead)
+
+    @staticmethod
+    def _name(text: str, spans: list[tuple[int, int]]) -> Optional[str]:
+        keep = [True] * len(text)
+        for start, end in spans:
+            for index in range(start, end):
+                keep[index] = False
+
+        remainder = "".join(
+            char if keep[index] else " " for index, char in enumerate(text)
+        )
+
+        sentences = []
+        for sentence in re.split(r"[.!?;\n]+", remainder):
+            sentence = PREFIX_RE.sub("", sentence)
+            sentence = re.sub(r"\s+", " ", sentence).strip(" ,:-")
+            previous = None
+            while previous != sentence:
+                previous = sentence
+                sentence = DANGLING_RE.sub("", sentence).strip(" ,:-")
+            if sentence and sentence.lower() not in ("remind me", "please"):
+                sentences.append(sentence)
+
+        if len(sentences) != 1:
+            return None
+
+        name = sentences[0]
+        if not all(is_safe_word(word.strip(',:()"')) for word in name.split()):
+            return None
+
+        return name[0].upper() + name[1:]
+
+
+fast_path_parser = FastPathParser()
@@ -1,14 +1,31 @@
+import asyncio
+import json
 import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
 from logging import Logger
 import logging
 
 from google.auth import default
-from google.auth.exceptions import MutualTLSChannelError
-from googleapiclient.discovery import build
+from google.auth.exceptions import MutualTLSChannelError, RefreshError
 from googleapiclient.errors import HttpError
-from google.auth.transport.requests import Request
-from google.oauth2 import service_account
 
+from calarmhelp.services.concurrency import run_blocking
+from calarmhelp.services.lazy import LazyImports
+from calarmhelp.services.metrics import (
+    CACHE_REQUESTS,
+    ERRORS,
+    RETRIES,
+    STAGE_DURATION,
+)
+from calarmhelp.services.resilience import (
+    CircuitOpenError,
+    RetryPolicy,
+    call_with_retries,
+    google_calendar_breaker,
+)
 from calarmhelp.services.util.util import (
     GoogleCalendarInfoInput,
     GoogleCalendarResponse,
@@ -18,58 +35,221 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Only needed to build the service and refresh credentials, so they are imported by the warmup
+# rather than with the module
+lazy_imports = LazyImports(
+    globals(),
+    {
+        "httplib2": "httplib2",
+        "AnonymousCredentials": "google.auth.credentials:AnonymousCredentials",
+        "AuthorizedHttp": "google_auth_httplib2:AuthorizedHttp",
+        "build": "googleapiclient.discovery:build",
+        "build_from_document": "googleapiclient.discovery:build_from_document",
+        "get_static_doc": "googleapiclient.discovery_cache:get_static_doc",
+        "HttpRequest": "googleapiclient.http:HttpRequest",
+        "Request": "google.auth.transport.requests:Request",
+        "service_account": "google.oauth2:service_account",
+    },
+)
+__getattr__ = lazy_imports.attribute
+
 loggerIsCalendarFoundFunc = logging.getLogger("isCalendarFoundFunc")
+loggerGoogleCalendarClient = logging.getLogger("Google Calendar Client")
 calendar_id = os.getenv("CALENDAR_ID")
 
+CREDENTIAL_REFRESH_MARGIN = int(os.getenv("GOOGLE_CREDENTIAL_REFRESH_MARGIN", 300))
+# Seconds before expiry at which credentials are refreshed. Defaults to 300.
+
+CREDENTIAL_REFRESH_INTERVAL = int(os.getenv("GOOGLE_CREDENTIAL_REFRESH_INTERVAL", 600))
+# Upper bound, in seconds, between two background credential checks. Defaults to 600.
+
+CALENDAR_METADATA_TTL = int(os.getenv("CALENDAR_METADATA_TTL", 3600))
+# Seconds a successful calendar lookup is trusted for. Defaults to 3600.
+
+CALENDAR_ROOT_URL = os.getenv("GOOGLE_CALENDAR_ROOT_URL")
+# Serves the Calendar API from another host, such as the calarmhelp.fakes stand-in, without credentials.
+
+GOOGLE_TIMEOUT = float(os.getenv("GOOGLE_TIMEOUT", 10))
+# Defaults to 10 seconds per Calendar API call if GOOGLE_TIMEOUT is not set.
+
+GOOGLE_RETRY_POLICY = RetryPolicy(attempts=int(os.getenv("GOOGLE_RETRY_ATTEMPTS", 3)))
+# Defaults to 3 calls per request, including the first, if GOOGLE_RETRY_ATTEMPTS is not set.
+
+RETRYABLE_GOOGLE_STATUSES = {429, 500, 502, 503, 504}
+RETRYABLE_GOOGLE_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+# Google reports some rate limiting as 403 with one of these reasons.
+
 SCOPES = [
     "https://www.googleapis.com/auth/calendar",
 ]
 
 
+def isRetryableGoogleError(error: BaseException) -> bool:
+    """Whether a Calendar API failure is transient: rate limiting, a 5xx or a connection error."""
+    if isinstance(error, HttpError):
+        if error.status_code in RETRYABLE_GOOGLE_STATUSES:
+            return True
+        return error.status_code == 403 and any(
+            detail.get("reason") in RETRYABLE_GOOGLE_REASONS
+            for detail in error.error_details or []
+            if isinstance(detail, dict)
+        )
+    return isinstance(error, (lazy_imports.get("httplib2").HttpLib2Error, OSError))
+
+
+def googleRetryAfter(error: BaseException) -> float | None:
+    """Reads the Retry-After header of a Calendar API error response, in seconds."""
+    if not isinstance(error, HttpError):
+        return None
+
+    try:
+        return float(error.resp.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def executeWithRetries(request):
+    """
+    Executes a Calendar API request through the Google Calendar circuit breaker, retrying
+    transient failures with jittered backoff.
+
+    Args:
+        request (HttpRequest | BatchHttpRequest): The request to execute.
+
+    Returns:
+        The response of `request.execute()`.
+    """
+    return call_with_retries(
+        request.execute,
+        breaker=google_calendar_breaker,
+        policy=GOOGLE_RETRY_POLICY,
+        is_retryable=isRetryableGoogleError,
+        retry_after=googleRetryAfter,
+    )
+
+
 def isCalendarFound(calendar_id: str | None, service):
     try:
-        calendar = service.calendars().get(calendarId=calendar_id).execute()
+        calendar = executeWithRetries(service.calendars().get(calendarId=calendar_id))
         loggerIsCalendarFoundFunc.debug(f"Calendar found: {calendar['summary']}")
         return {"calendar": calendar, "found": True}
+    except CircuitOpenError:
+        # Google being down says nothing about the calendar
+        raise
     except Exception as e:
         loggerIsCalendarFoundFunc.debug(f"Error accessing calendar: {e}")
         return {"calendar": None, "found": False}
 
 
-def getService(logger: Logger):
+def getCredentials(logger: Logger):
+    """
+    Loads the credentials used to call the Google Calendar API.
+
+    Args:
+        logger (Logger): The logger instance for logging information and errors.
+
+    Returns:
+        Credentials | None: Service account credentials locally, default credentials in production or docker,
+        and anonymous credentials when `GOOGLE_CALENDAR_ROOT_URL` points at a stand-in server.
+    """
+    if CALENDAR_ROOT_URL:
+        # Never send real tokens to a stand-in
+        logger.debug(f"Using Anonymous Credentials for {CALENDAR_ROOT_URL}")
+        return lazy_imports.get("AnonymousCredentials")()
+
     if os.getenv("ENVIRONMENT") not in ["production", "docker"]:
         logger.debug("Using Service Account")
         cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 
-        userServiceCredentials = service_account.Credentials.from_service_account_file(
+        service_account = lazy_imports.get("service_account")
+        return service_account.Credentials.from_service_account_file(
             filename=cred_path, scopes=SCOPES
         )
 
-        if not userServiceCredentials or not userServiceCredentials.valid:
-            logger.debug("UserServiceCredentials Expired: Refreshing Credentials")
-            request = Request()
+    logger.debug("Using Default Credentials")
+    defaultCreds, _ = default()
+
+    return defaultCreds
+
+
+def refreshCredentials(credentials, logger: Logger):
+    """
+    Refreshes the given credentials when they are missing a token or have expired.
+
+    Args:
+        credentials (Credentials): The credentials to refresh in place.
+        logger (Logger): The logger instance for logging information and errors.
+    """
+    if not credentials.valid:
+        logger.debug("UserServiceCredentials Expired: Refreshing Credentials")
+        request = lazy_imports.get("Request")()
+
+        credentials.refresh(request)
+
+        if credentials.valid:
+            logger.debug("Credentials now valid and refreshed")
+
+
+def buildService(credentials):
+    """
+    Builds a Google Calendar service that is safe to share between threads.
+
+    httplib2 connections are not thread-safe, so rather than binding one `Http` to the service,
+    every request gets its own authorized `Http` over the shared credentials. See
+    https://googleapis.github.io/google-api-python-client/docs/thread_safety.html
+
+    Args:
+        credentials (Credentials): The credentials used to authorize requests.
+
+    Returns:
+        Resource: The Google Calendar v3 service.
+    """
 
-            userServiceCredentials.refresh(request)
+    httplib2 = lazy_imports.get("httplib2")
+    AuthorizedHttp = lazy_imports.get("AuthorizedHttp")
+    HttpRequest = lazy_imports.get("HttpRequest")
 
-            if userServiceCredentials.valid:
-                logger.debug("Credentials now valid and refreshed")
+    def build_request(http, *args, **kwargs):
+        return HttpRequest(
+            AuthorizedHttp(credentials, http=httplib2.Http(timeout=GOOGLE_TIMEOUT)),
+            *args,
+            **kwargs,
+        )
 
-        # Service created via Google Discovery API for Google Calendar
-        service = build(
-            "calendar",
-            "v3",
-            credentials=userServiceCredentials,
-            cache_discovery=False,
+    if CALENDAR_ROOT_URL:
+        # Batch requests go to the discovery document's rootUrl, so replace it rather than
+        # only overriding the API endpoint
+        document = json.loads(lazy_imports.get("get_static_doc")("calendar", "v3"))
+        document["rootUrl"] = CALENDAR_ROOT_URL.rstrip("/") + "/"
+
+        return lazy_imports.get("build_from_document")(
+            document,
+            http=AuthorizedHttp(
+                credentials, http=httplib2.Http(timeout=GOOGLE_TIMEOUT)
+            ),
+            requestBuilder=build_request,
         )
 
-    else:
-        logger.debug("Using Default Credentials")
-        defaultCreds, _ = default()
+    # Service created via Google Discovery API for Google Calendar
+    return lazy_imports.get("build")(
+        "calendar",
+        "v3",
+        http=AuthorizedHttp(credentials, http=httplib2.Http(timeout=GOOGLE_TIMEOUT)),
+        requestBuilder=build_request,
+        cache_discovery=False,
+    )
+
+
+def getService(logger: Logger):
+    userServiceCredentials = getCredentials(logger)
+
+    if not userServiceCredentials:
+        return GoogleCalendarResponse(error="defaultCreds not found")
 
-        if not defaultCreds:
-            return GoogleCalendarResponse(error="defaultCreds not found")
+    if os.getenv("ENVIRONMENT") not in ["production", "docker"]:
+        refreshCredentials(userServiceCredentials, logger)
 
-        service = build("calendar", "v3", credentials=defaultCreds)
+    service = buildService(userServiceCredentials)
 
     if not service:
         return GoogleCalendarResponse(
@@ -79,12 +259,313 @@ def getService(logger: Logger):
     return service
 
 
+class GoogleCalendarClient:
+    """
+    Process-wide cache of the Google Calendar service and its credentials.
+
+    The service is built once, normally during application startup, and shared by every
+    request. `refresh_forever` keeps the credentials ahead of expiry in the background so
+    requests never refresh a token or build a client inline. When a request does hit an auth
+    error, `invalidate` drops the cached service so the next call builds a fresh one.
+
+    #### Methods:
+        ```
+        get_service() -> Resource | GoogleCalendarResponse:
+        ```
+        Returns the cached service, building it on first use.
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        refresh_margin: int = CREDENTIAL_REFRESH_MARGIN,
+        refresh_interval: int = CREDENTIAL_REFRESH_INTERVAL,
+    ):
+        self._logger = logger
+        self._refresh_margin = timedelta(seconds=refresh_margin)
+        self._refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._service = None
+        self._credentials = None
+
+    def get_service(self):
+        """
+        Returns the cached Google Calendar service.
+
+        Returns:
+            Resource | GoogleCalendarResponse: The service, or an error response if no credentials were found.
+        """
+        service = self._service
+        if service is not None:
+            return service
+
+        with self._lock:
+            if self._service is None:
+                credentials = getCredentials(self._logger)
+
+                if not credentials:
+                    return GoogleCalendarResponse(error="defaultCreds not found")
+
+                refreshCredentials(credentials, self._logger)
+
+                self._credentials = credentials
+                self._service = buildService(credentials)
+                self._logger.debug("Google Calendar client built")
+
+            return self._service
+
+    def invalidate(self):
+        """Drops the cached service and credentials so the next call rebuilds them."""
+        with self._lock:
+            self._service = None
+            self._credentials = None
+        self._logger.info("Google Calendar client invalidated")
+
+    def seconds_until_refresh(self) -> float:
+        """
+        Returns how long the current credentials can be used before they should be refreshed.
+
+        Returns:
+            float: Seconds until the refresh margin is reached, 0 if a refresh is due now.
+        """
+        credentials = self._credentials
+        if credentials is None or not credentials.valid:
+            return 0
+
+        if credentials.expiry is None:
+            return self._refresh_interval
+
+        # google-auth stores expiry as a naive UTC datetime
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        remaining = credentials.expiry - self._refresh_margin - now
+
+        return max(0.0, remaining.total_seconds())
+
+    def refresh_credentials(self) -> bool:
+        """
+        Refreshes the cached credentials if they are within the refresh margin of expiry.
+
+        Returns:
+            bool: True if a refresh happened.
+        """
+        with self._lock:
+            credentials = self._credentials
+            if credentials is None or self.seconds_until_refresh() > 0:
+                return False
+
+            credentials.refresh(lazy_imports.get("Request")())
+
+        self._logger.debug("Credentials refreshed ahead of expiry")
+        return True
+
+    async def refresh_forever(self):
+        """
+        Background task that keeps the cached credentials fresh until cancelled.
+
+        Refresh errors are logged and retried so a transient failure never stops the loop.
+        """
+        while True:
+            try:
+                await run_blocking(self.get_service)
+                await run_blocking(self.refresh_credentials)
+
+                if self._credentials is None:
+                    delay = min(30, self._refresh_interval)
+                else:
+                    delay = min(self.seconds_until_refresh(), self._refresh_interval)
+            except Exception as e:
+                self._logger.warning(f"Background credential refresh failed: {e}")
+                delay = min(30, self._refresh_interval)
+
+            await asyncio.sleep(max(delay, 1))
+
+
+google_calendar_client = GoogleCalendarClient(loggerGoogleCalendarClient)
+
+
+class CalendarMetadataCache:
+    """
+    TTL cache of `isCalendarFound` lookups, keyed by calendar id.
+
+    Only successful lookups are cached. An entry is dropped when it expires or when an insert
+    into that calendar returns 404, so a deleted or unshared calendar is noticed on the next
+    request instead of after the TTL.
+    """
+
+    def __init__(self, ttl: int = CALENDAR_METADATA_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[str | None, tuple[float, dict]] = {}
+
+    def get(self, calendar_id: str | None, service) -> dict:
+        """
+        Returns the cached lookup for `calendar_id`, calling the Calendar API only on a miss.
+
+        Args:
+            calendar_id (str | None): The calendar to look up.
+            service (Resource): The Google Calendar service used on a miss.
+
+        Returns:
+            dict: `{"calendar": ..., "found": bool}` as returned by `isCalendarFound`.
+        """
+        with self._lock:
+            entry = self._entries.get(calendar_id)
+            if entry is not None and time.monotonic() < entry[0]:
+                CACHE_REQUESTS.inc(cache="calendar_metadata", result="hit")
+                return entry[1]
+
+        CACHE_REQUESTS.inc(cache="calendar_metadata", result="miss")
+
+        with STAGE_DURATION.time(stage="is_calendar_found"):
+            calendarFound = isCalendarFound(calendar_id=calendar_id, service=service)
+
+        if calendarFound["found"]:
+            with self._lock:
+                self._entries[calendar_id] = (
+                    time.monotonic() + self._ttl,
+                    calendarFound,
+                )
+
+        return calendarFound
+
+    def invalidate(self, calendar_id: str | None = None):
+        """
+        Drops the cached lookup for `calendar_id`, or every lookup when no id is given.
+
+        Args:
+            calendar_id (str | None, optional): The calendar to forget. Defaults to all calendars.
+        """
+        with self._lock:
+            if calendar_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(calendar_id, None)
+
+
+calendar_metadata_cache = CalendarMetadataCache()
+
+
+def warmGoogleCalendar(logger: Logger):
+    """
+    Builds the Google Calendar client and caches the target calendar's metadata.
+
+    Meant to run once at startup so the first request only pays for `events().insert`.
+    The calendar list is only fetched when debug logging is enabled.
+
+    Args:
+        logger (Logger): The logger instance for logging information and errors.
+    """
+    lazy_imports.load()
+
+    service = google_calendar_client.get_service()
+
+    if isinstance(service, GoogleCalendarResponse):
+        logger.warning(f"Google Calendar client not ready: {service.error}")
+        return
+
+    if logger.isEnabledFor(logging.DEBUG):
+        calendar_list = service.calendarList().list().execute()
+
+        for calendar in calendar_list["items"]:
+            logger.debug(f"Calendar Name: {calendar['summary']}")
+            logger.debug(f"Calendar ID: {calendar['id']}\n\n")
+
+    if not calendar_metadata_cache.get(calendar_id, service)["found"]:
+        logger.warning(f"Calendar {calendar_id} not found")
+
+
+def warmEventInsert(whole_user_input: GoogleCalendarInfoInput, logger: Logger):
+    """
+    Builds the `events().insert` request for an alarm without executing it.
+
+    The client builds each resource and method from the discovery document on first use, so a
+    warmup request calls this at startup instead of leaving that to the first alarm.
+
+    Args:
+        whole_user_input (GoogleCalendarInfoInput): The alarm to build the request for.
+        logger (Logger): The logger instance for logging information and errors.
+    """
+    service = google_calendar_client.get_service()
+
+    if isinstance(service, GoogleCalendarResponse):
+        logger.warning(f"Google Calendar client not ready: {service.error}")
+        return
+
+    service.events().insert(calendarId=calendar_id, body=buildEvent(whole_user_input))
+
+
+def buildEvent(whole_user_input: GoogleCalendarInfoInput) -> dict:
+    """
+    Builds the `events().insert` request body for an extracted alarm.
+
+    A recurring alarm becomes a single event with an RRULE, starting at its first occurrence,
+    and Google expands the occurrences.
+
+    Args:
+        whole_user_input (GoogleCalendarInfoInput): The user input containing the event details.
+
+    Returns:
+        dict: The Google Calendar event resource.
+    """
+    user_input = whole_user_input.jsonResponse
+
+    event = {
+        "summary": whole_user_input.response,
+        "location": user_input.location,
+        "start": {
+            "dateTime": user_input.event_time.isoformat(),
+            "timeZone": "America/New_York",
+        },
+        "end": {
+            "dateTime": user_input.event_time_end.isoformat(),
+            "timeZone": "America/New_York",
+        },
+    }
+
+    if user_input.recurrence:
+        event["recurrence"] = [f"RRULE:{user_input.recurrence}"]
+
+    return event
+
+
+def insertEvent(service, event: dict) -> dict:
+    """
+    Inserts an event, retrying transient failures without creating duplicates.
+
+    The event gets a client-generated id, so if an attempt that timed out did reach Google, the
+    retry is rejected with 409 instead of creating a second event.
+
+    Args:
+        service (Resource): The Google Calendar service.
+        event (dict): The event resource from `buildEvent`.
+
+    Returns:
+        dict: The created event.
+    """
+    # Event ids use base32hex characters, which include every hex digit
+    event = {**event, "id": uuid.uuid4().hex}
+
+    try:
+        return executeWithRetries(
+            service.events().insert(calendarId=calendar_id, body=event)
+        )
+    except HttpError as error:
+        if error.status_code == 409:
+            return event
+        raise
+
+
 def GoogleCalendarServiceScript(
     whole_user_input: GoogleCalendarInfoInput, logger: Logger
 ) -> GoogleCalendarResponse:
     """
     Interacts with the Google Calendar API to create a new event on the user's calendar.
 
+    In steady state this is a single `events().insert` call: the client comes from
+    `google_calendar_client` and the calendar lookup from `calendar_metadata_cache`. Transient
+    failures are retried, and while Google is failing the circuit breaker answers with an error
+    straight away.
+
     Args:
         whole_user_input (GoogleCalendarInfoInput): The user input containing the event details.
         logger (Logger): The logger instance for logging information and errors.
@@ -92,52 +573,186 @@ def GoogleCalendarServiceScript(
     Returns:
         dict[str, Any]: A dictionary containing either a success message with the created event details or an error message if event creation failed.
     """
-    user_input = whole_user_input.jsonResponse
-
     try:
         # see https://developers.google.com/calendar/api/v3/reference/events/insert
 
-        service = getService(logger)
-        calendar_list = service.calendarList().list().execute()
+        with STAGE_DURATION.time(stage="get_service"):
+            service = google_calendar_client.get_service()
 
-        for calendar in calendar_list["items"]:
-            logger.debug(f"Calendar Name: {calendar['summary']}")
-            logger.debug(f"Calendar ID: {calendar['id']}\n\n")
+        if isinstance(service, GoogleCalendarResponse):
+            ERRORS.inc(type="missing_credentials")
+            return service
+
+        myEvent = buildEvent(whole_user_input)
 
-        myEvent = {
-            "summary": whole_user_input.response,
-            "location": user_input.location,
-            "start": {
-                "dateTime": user_input.event_time.isoformat(),
-                "timeZone": "America/New_York",
-            },
-            "end": {
-                "dateTime": user_input.event_time_end.isoformat(),
-                "timeZone": "America/New_York",
-            },
-        }
-
-        logger.debug(f"Calendar List: {calendar_list}\n")
         logger.debug(f"Event Object: {myEvent}\n")
         logger.debug("Creating Event")
 
-        calendarFound = isCalendarFound(calendar_id=calendar_id, service=service)
+        calendarFound = calendar_metadata_cache.get(calendar_id, service)
 
         if calendarFound["found"]:
-            created_event = (
-                service.events().insert(calendarId=calendar_id, body=myEvent).execute()
-            )
+            with STAGE_DURATION.time(stage="events_insert"):
+                created_event = insertEvent(service, myEvent)
         else:
+            ERRORS.inc(type="calendar_not_found")
             return GoogleCalendarResponse(error="Calendar not found")
 
         if not created_event:
+            ERRORS.inc(type="event_creation_failed")
             return GoogleCalendarResponse(error="Event Creation Failed")
         else:
             logger.debug("Event Created")
             logger.debug(f"Created Event: {created_event}")
 
             return GoogleCalendarResponse(success="Event Created")
-    except (HttpError, MutualTLSChannelError) as error:
+    except CircuitOpenError as error:
+        logger.warning(error)
+        ERRORS.inc(type=type(error).__name__)
+        return GoogleCalendarResponse(error=str(error))
+    except (HttpError, MutualTLSChannelError, RefreshError) as error:
         logger.exception(error)
+        ERRORS.inc(type=type(error).__name__)
+
+        if isinstance(error, HttpError) and error.status_code == 404:
+            # The calendar was deleted or unshared since it was cached
+            calendar_metadata_cache.invalidate(calendar_id)
+
+            return GoogleCalendarResponse(error="Calendar not found")
+
+        if isinstance(error, RefreshError) or (
+            isinstance(error, HttpError) and error.status_code == 401
+        ):
+            # Credentials were revoked or rotated, build a fresh client for the next call
+            google_calendar_client.invalidate()
 
         return GoogleCalendarResponse(error=str(error))
+
+
+def GoogleCalendarBatchServiceScript(
+    whole_user_inputs: list[GoogleCalendarInfoInput], logger: Logger
+) -> list[GoogleCalendarResponse]:
+    """
+    Creates several events on the user's calendar with a single batch HTTP request.
+
+    Each insert succeeds or fails on its own, so the result list always lines up with the input
+    list. Inserts that fail transiently, or a batch that fails as a whole, are sent again in a
+    smaller batch with jittered backoff. See https://developers.google.com/calendar/api/guides/batch
+
+    Args:
+        whole_user_inputs (list[GoogleCalendarInfoInput]): The event details, at most 50.
+        logger (Logger): The logger instance for logging information and errors.
+
+    Returns:
+        list[GoogleCalendarResponse]: One success or error response per input, in input order.
+    """
+    if not whole_user_inputs:
+        return []
+
+    results: list[GoogleCalendarResponse] = [
+        GoogleCalendarResponse(error="Event Creation Failed")
+    ] * len(whole_user_inputs)
+    # Client-generated ids turn a resent insert that already landed into a 409
+    events = [
+        {**buildEvent(whole_user_input), "id": uuid.uuid4().hex}
+        for whole_user_input in whole_user_inputs
+    ]
+    to_retry: list[int] = []
+
+    def on_response(request_id: str, created_event, exception):
+        index = int(request_id)
+
+        if exception is not None and isRetryableGoogleError(exception):
+            to_retry.append(index)
+            results[index] = GoogleCalendarResponse(error=str(exception))
+        elif isinstance(exception, HttpError) and exception.status_code == 409:
+            results[index] = GoogleCalendarResponse(success="Event Created")
+        elif exception is not None:
+            logger.error(f"Batch insert {request_id} failed: {exception}")
+            ERRORS.inc(type=type(exception).__name__)
+
+            if isinstance(exception, HttpError) and exception.status_code == 404:
+                calendar_metadata_cache.invalidate(calendar_id)
+                results[index] = GoogleCalendarResponse(error="Calendar not found")
+            else:
+                if isinstance(exception, HttpError) and exception.status_code == 401:
+                    google_calendar_client.invalidate()
+                results[index] = GoogleCalendarResponse(error=str(exception))
+        elif created_event:
+            logger.debug(f"Created Event: {created_event}")
+            results[index] = GoogleCalendarResponse(success="Event Created")
+
+    try:
+        with STAGE_DURATION.time(stage="get_service"):
+            service = google_calendar_client.get_service()
+
+        if isinstance(service, GoogleCalendarResponse):
+            ERRORS.inc(len(whole_user_inputs), type="missing_credentials")
+            return [service] * len(whole_user_inputs)
+
+        if not calendar_metadata_cache.get(calendar_id, service)["found"]:
+            ERRORS.inc(len(whole_user_inputs), type="calendar_not_found")
+            return [GoogleCalendarResponse(error="Calendar not found")] * len(
+                whole_user_inputs
+            )
+
+        pending = list(range(len(whole_user_inputs)))
+
+        for attempt in range(GOOGLE_RETRY_POLICY.attempts):
+            google_calendar_breaker.before_call()
+            to_retry.clear()
+
+            batch = service.new_batch_http_request(callback=on_response)
+
+            for index in pending:
+                batch.add(
+                    service.events().insert(calendarId=calendar_id, body=events[index]),
+                    request_id=str(index),
+                )
+
+            logger.debug(f"Creating {len(pending)} Events in one batch")
+
+            try:
+                with STAGE_DURATION.time(stage="events_batch_insert"):
+                    batch.execute()
+            except Exception as error:
+                if not isRetryableGoogleError(error):
+                    google_calendar_breaker.record_success()
+                    raise
+                to_retry[:] = pending
+                for index in pending:
+                    results[index] = GoogleCalendarResponse(error=str(error))
+
+            if not to_retry:
+                google_calendar_breaker.record_success()
+                break
+
+            google_calendar_breaker.record_failure()
+            pending = sorted(set(to_retry))
+
+            if attempt + 1 < GOOGLE_RETRY_POLICY.attempts:
+                delay = GOOGLE_RETRY_POLICY.backoff(attempt)
+                logger.warning(f"Retrying {len(pending)} batch inserts in {delay:.2f}s")
+                RETRIES.inc(dependency=google_calendar_breaker.dependency)
+                time.sleep(delay)
+        else:
+            ERRORS.inc(len(pending), type="event_creation_failed")
+
+        return results
+    except CircuitOpenError as error:
+        logger.warning(error)
+        ERRORS.inc(len(whole_user_inputs), type=type(error).__name__)
+
+        return [
+            (result if result.success else GoogleCalendarResponse(error=str(error)))
+            for result in results
+        ]
+    except (HttpError, MutualTLSChannelError, RefreshError) as error:
+        logger.exception(error)
+        ERRORS.inc(len(whole_user_inputs), type=type(error).__name__)
+
+        if isinstance(error, RefreshError) or (
+            isinstance(error, HttpError) and error.status_code == 401
+        ):
+            google_calendar_client.invalidate()
+
+        return [GoogleCalendarResponse(error=str(error))] * len(whole_user_inputs)
@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Generic, Optional, TypeVar
+
+from calarmhelp.services.metrics import CACHE_REQUESTS
+
+T = TypeVar("T")
+
+
+def fingerprint(body: str) -> str:
+    """
+    Hashes a request body so a reused key can be told apart from a retry.
+
+    Args:
+        body (str): The request body, serialized the same way for every request.
+
+    Returns:
+        str: The SHA-256 hex digest of the body.
+    """
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class IdempotencyKeyReused(Exception):
+    """Raised when an `Idempotency-Key` arrives again with a different request body."""
+
+
+class IdempotencyStore(Generic[T]):
+    """
+    Bounded LRU store of recent results keyed by `Idempotency-Key`, with single-flight coalescing.
+
+    The first request for a key runs the work. Requests with the same key that arrive while it
+    is running wait for that run instead of starting their own, and requests that arrive later
+    get the stored result. The work runs in its own task, held in `tasks` until it finishes, so
+    a client that times out and disconnects does not cancel it: the retry picks up the result.
+
+    Only results accepted by `should_store` are kept. Failed requests created nothing, so a retry
+    is allowed to run them again.
+
+    Must be used from a single event loop.
+
+    #### Attributes:
+    ```
+    replays (int):
+    ```Requests answered from a stored result.
+    ```
+    coalesced (int):
+    ```Requests that waited on a run already in flight.
+    ```
+    misses (int):
+    ```Requests that ran the work.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: int = 86400):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, str, T]] = OrderedDict()
+        self._in_flight: dict[str, tuple[str, asyncio.Task]] = {}
+        self._background_tasks: set[asyncio.Task] = set()
+        self.replays = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._maxsize > 0
+
+    @property
+    def tasks(self) -> set[asyncio.Task]:
+        """The runs still in flight, which outlive their callers, for draining on shutdown."""
+        return set(self._background_tasks)
+
+    def _stored(self, key: str) -> Optional[tuple[float, str, T]]:
+        entry = self._entries.get(key)
+
+        if entry is not None and time.monotonic() >= entry[0]:
+            del self._entries[key]
+            return None
+
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: str, body_fingerprint: str, result: T):
+        self._entries[key] = (time.monotonic() + self._ttl, body_fingerprint, result)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    async def run(
+        self,
+        key: str,
+        body_fingerprint: str,
+        work: Callable[[], Awaitable[T]],
+        should_store: Callable[[T], bool] = lambda result: True,
+    ) -> tuple[T, bool]:
+        """
+        Runs `work` once per key, sharing its result with concurrent and later duplicates.
+
+        Args:
+            key (str): The idempotency key, scoped by the caller, e.g. to the endpoint.
+            body_fingerprint (str): The `fingerprint` of the request body.
+            work (Callable[[], Awaitable[T]]): Produces the result when no run exists for the key.
+            should_store (Callable[[T], bool], optional): Whether a result is kept for later duplicates.
+
+        Returns:
+            tuple[T, bool]: The result, and whether it came from another request's run.
+
+        Raises:
+            IdempotencyKeyReused: If the key was used with a different body.
+        """
+        if not self.enabled:
+            return await work(), False
+
+        in_flight = self._in_flight.get(key)
+
+        if in_flight is not None:
+            if in_flight[0] != body_fingerprint:
+                raise IdempotencyKeyReused(key)
+
+            self.coalesced += 1
+            CACHE_REQUESTS.inc(cache="idempotency", result="coalesced")
+            return await asyncio.shield(in_flight[1]), True
+
+        stored = self._stored(key)
+
+        if stored is not None:
+            if stored[1] != body_fingerprint:
+                raise IdempotencyKeyReused(key)
+
+            self.replays += 1
+            CACHE_REQUESTS.inc(cache="idempotency", result="hit")
+            return stored[2], True
+
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache="idempotency", result="miss")
+
+        async def run_and_store() -> T:
+            try:
+                result = await work()
+                if should_store(result):
+                    self._put(key, body_fingerprint, result)
+                return result
+            finally:
+                self._in_flight.pop(key, None)
+
+        task = asyncio.create_task(run_and_store())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        self._in_flight[key] = (body_fingerprint, task)
+
+        return await asyncio.shield(task), False
+
+    def clear(self):
+        """Drops every stored result and resets the counters. Runs in flight are kept."""
+        self._entries.clear()
+        self.replays = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Returns the replay, coalescing and miss counters and the current number of entries."""
+        return {
+            "replays": self.replays,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "in_flight": len(self._in_flight),
+        }
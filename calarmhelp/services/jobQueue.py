@@ -0,0 +1,456 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from calarmhelp.services.concurrency import run_blocking
+from calarmhelp.services.metrics import ERRORS
+from calarmhelp.services.resilience import RetryPolicy
+
+loggerJobQueue = logging.getLogger("Job Queue")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    not_before REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_status_updated ON jobs (status, updated_at);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT NOT NULL,
+    failed_at REAL NOT NULL
+);
+"""
+
+ADDED_COLUMNS = {
+    "lease_owner": "TEXT",
+    "lease_expires": "REAL",
+    "not_before": "REAL NOT NULL DEFAULT 0",
+}
+# Added to job tables created before jobs were leased and retries backed off.
+
+
+class JobQueue:
+    """
+    Durable FIFO queue of alarm jobs in a local SQLite database.
+
+    Jobs move from `queued` to `running` to `succeeded` or `failed`. Failed jobs are also copied
+    to the `dead_letters` table so they can be inspected and replayed. A retried job waits in
+    the queue until the delay it was given has passed.
+
+    A claim leases the job to this queue for `lease_seconds`, and the worker running it renews
+    the lease with `heartbeat`. A job whose lease ran out, because the process running it died
+    or hung, can be claimed again by any process sharing the database, so work survives crashes
+    and restarts without one process taking over jobs another is still running. A job that died
+    after writing its event can therefore run twice.
+
+    Every method blocks on disk. Call them through `run_blocking` from async code.
+
+    #### Attributes:
+    ```
+    path (str):
+    ```The SQLite database file, or `:memory:`.
+    ```
+    lease_seconds (float):
+    ```How long a claimed job stays with this queue without a heartbeat.
+    ```
+    owner (str):
+    ```Identifies this queue's leases.
+    """
+
+    def __init__(self, path: str = "jobs.sqlite3", lease_seconds: float = 30.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.owner = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.row_factory = sqlite3.Row
+
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+            columns = {
+                row["name"]
+                for row in self._connection.execute("PRAGMA table_info(jobs)")
+            }
+            for column, column_type in ADDED_COLUMNS.items():
+                if column not in columns:
+                    self._connection.execute(
+                        f"ALTER TABLE jobs ADD COLUMN {column} {column_type}"
+                    )
+
+    def enqueue(self, kind: str, payload: dict[str, Any]) -> str:
+        """
+        Adds a job to the back of the queue.
+
+        Args:
+            kind (str): What the job does, e.g. `create_alarm`.
+            payload (dict[str, Any]): The job input, stored as JSON.
+
+        Returns:
+            str: The job id.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), QUEUED, now, now),
+            )
+
+        return job_id
+
+    def claim(self) -> Optional[dict[str, Any]]:
+        """
+        Marks the oldest queued job that is due, or running job whose lease ran out, as running and leases it.
+
+        Returns:
+            dict[str, Any] | None: The job's `id`, `kind`, `payload` and `attempts`, or None if the queue is empty.
+        """
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._connection.execute(
+                    "SELECT id, kind, payload, attempts, status FROM jobs "
+                    "WHERE (status = ? AND not_before <= ?) "
+                    "OR (status = ? AND (lease_expires IS NULL OR lease_expires < ?)) "
+                    "ORDER BY updated_at LIMIT 1",
+                    (QUEUED, now, RUNNING, now),
+                ).fetchone()
+
+                if row is not None:
+                    self._connection.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ?, "
+                        "lease_owner = ?, lease_expires = ? WHERE id = ?",
+                        (
+                            RUNNING,
+                            now,
+                            self.owner,
+                            now + self.lease_seconds,
+                            row["id"],
+                        ),
+                    )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+        if row["status"] == RUNNING:
+            loggerJobQueue.warning(f"Reclaimed job {row['id']} after its lease ran out")
+
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "attempts": row["attempts"] + 1,
+        }
+
+    def heartbeat(self, job_id: str) -> bool:
+        """
+        Renews the lease on a job this queue claimed.
+
+        Returns:
+            bool: False if the lease was lost, e.g. it ran out and another process claimed the job.
+        """
+        now = time.time()
+
+        with self._lock:
+            return (
+                self._connection.execute(
+                    "UPDATE jobs SET lease_expires = ? "
+                    "WHERE id = ? AND status = ? AND lease_owner = ?",
+                    (now + self.lease_seconds, job_id, RUNNING, self.owner),
+                ).rowcount
+                == 1
+            )
+
+    def complete(self, job_id: str, result: dict[str, Any]):
+        """Stores the result of a job that succeeded."""
+        with self._lock:
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, updated_at = ?, "
+                "lease_owner = NULL, lease_expires = NULL WHERE id = ?",
+                (SUCCEEDED, json.dumps(result, default=str), time.time(), job_id),
+            )
+
+    def retry(self, job_id: str, error: str, delay: float = 0.0):
+        """
+        Puts a job that raised back in the queue, behind the jobs already waiting.
+
+        Args:
+            job_id (str): The job.
+            error (str): Why it raised.
+            delay (float, optional): Seconds before the job may be claimed again. Defaults to none.
+        """
+        now = time.time()
+
+        with self._lock:
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ?, not_before = ?, "
+                "lease_owner = NULL, lease_expires = NULL WHERE id = ?",
+                (QUEUED, error, now, now + delay, job_id),
+            )
+
+    def fail(self, job_id: str, error: str, result: Optional[dict[str, Any]] = None):
+        """
+        Marks a job as failed and copies it to the dead letter table.
+
+        Args:
+            job_id (str): The job.
+            error (str): Why it failed.
+            result (dict[str, Any], optional): The response the job produced, if any.
+        """
+        now = time.time()
+
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute(
+                    "UPDATE jobs SET status = ?, error = ?, result = ?, updated_at = ?, "
+                    "lease_owner = NULL, lease_expires = NULL WHERE id = ?",
+                    (
+                        FAILED,
+                        error,
+                        json.dumps(result, default=str) if result is not None else None,
+                        now,
+                        job_id,
+                    ),
+                )
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO dead_letters "
+                    "(job_id, kind, payload, attempts, error, failed_at) "
+                    "SELECT id, kind, payload, attempts, ?, ? FROM jobs WHERE id = ?",
+                    (error, now, job_id),
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def get(self, job_id: str) -> Optional[dict[str, Any]]:
+        """
+        Returns the status of a job.
+
+        Args:
+            job_id (str): The job.
+
+        Returns:
+            dict[str, Any] | None: `id`, `status`, `attempts`, `result`, `error` and timestamps, or None for an unknown id.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id, status, attempts, result, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            "id": row["id"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def dead_letters(self, limit: int = 100) -> list[dict[str, Any]]:
+        """Returns the most recent dead letters, newest first."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT job_id, kind, payload, attempts, error, failed_at "
+                "FROM dead_letters ORDER BY failed_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+        return [{**dict(row), "payload": json.loads(row["payload"])} for row in rows]
+
+    def stats(self) -> dict[str, int]:
+        """Returns the number of jobs in each status and of dead letters."""
+        with self._lock:
+            counts = dict(
+                self._connection.execute(
+                    "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+                ).fetchall()
+            )
+            dead_letters = self._connection.execute(
+                "SELECT COUNT(*) FROM dead_letters"
+            ).fetchone()[0]
+
+        return {
+            **{
+                status: counts.get(status, 0)
+                for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)
+            },
+            "dead_letters": dead_letters,
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+JobHandler = Callable[[str, dict[str, Any]], Awaitable[dict[str, Any]]]
+# Runs one job given its kind and payload, and returns its response body.
+
+
+class JobWorkerPool:
+    """
+    Asyncio workers that drain a `JobQueue`.
+
+    A handler that raises is retried until `max_attempts`, then dead-lettered. Each retry waits
+    out an exponential backoff with full jitter from `retry_base_delay`, capped at
+    `retry_max_delay`, so a dependency that is down is not hammered. An error with a
+    `retry_after`, such as a rate limit, waits that long instead. A handler that
+    returns a response `is_failure` rejects is dead-lettered straight away, since running the
+    same input again would fail the same way. While a handler runs, its job's lease is renewed
+    three times per `lease_seconds`.
+
+    #### Attributes:
+    ```
+    queue (JobQueue):
+    ```The queue being drained.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: JobHandler,
+        workers: int = 2,
+        max_attempts: int = 3,
+        poll_interval: float = 1.0,
+        is_failure: Callable[[dict[str, Any]], bool] = lambda result: False,
+        retry_base_delay: float = 2.0,
+        retry_max_delay: float = 300.0,
+    ):
+        self.queue = queue
+        self._handler = handler
+        self._workers = workers
+        self._max_attempts = max_attempts
+        self._retry_policy = RetryPolicy(
+            attempts=max_attempts,
+            base_delay=retry_base_delay,
+            max_delay=retry_max_delay,
+        )
+        self._poll_interval = poll_interval
+        self._is_failure = is_failure
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks: list[asyncio.Task] = []
+
+    async def enqueue(self, kind: str, payload: dict[str, Any]) -> str:
+        """Adds a job and wakes an idle worker."""
+        job_id = await run_blocking(self.queue.enqueue, kind, payload)
+        self._wakeup.set()
+        return job_id
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            if not await run_blocking(self.queue.heartbeat, job_id):
+                loggerJobQueue.warning(f"Lost the lease on job {job_id}")
+                return
+
+    async def _process(self, job: dict[str, Any]):
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            result = await self._handler(job["kind"], job["payload"])
+        except Exception as e:
+            loggerJobQueue.exception(f"Job {job['id']} raised: {e}")
+            ERRORS.inc(type=type(e).__name__)
+
+            if job["attempts"] >= self._max_attempts:
+                await run_blocking(self.queue.fail, job["id"], repr(e))
+            else:
+                await run_blocking(
+                    self.queue.retry,
+                    job["id"],
+                    repr(e),
+                    self._retry_policy.backoff(
+                        job["attempts"] - 1, getattr(e, "retry_after", None)
+                    ),
+                )
+            return
+        finally:
+            heartbeat.cancel()
+
+        if self._is_failure(result):
+            await run_blocking(
+                self.queue.fail, job["id"], str(result.get("error")), result
+            )
+        else:
+            await run_blocking(self.queue.complete, job["id"], result)
+
+    async def _work(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            job = await run_blocking(self.queue.claim)
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # There may be more where this came from, so let idle workers look too
+            self._wakeup.set()
+            await self._process(job)
+
+    def start(self):
+        """Starts the workers on the running event loop."""
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self._workers)]
+
+    async def stop(self, timeout: float = 0.0):
+        """
+        Stops the workers. They stop claiming jobs at once, and jobs already running get `timeout`
+        seconds to finish. A job cut off mid-run stays `running` until its lease runs out, and
+        is then claimed again.
+
+        Args:
+            timeout (float, optional): Seconds to let running jobs finish. Defaults to cancelling them.
+        """
+        self._stopping = True
+        self._wakeup.set()
+
+        if self._tasks and timeout > 0:
+            await asyncio.wait(self._tasks, timeout=timeout)
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -0,0 +1,68 @@
+import importlib
+import threading
+from typing import Any
+
+
+class LazyImports:
+    """
+    Module attributes that are imported on first use instead of when the module is imported.
+
+    Each name maps to `"package.module"` for a module or `"package.module:attribute"` for an
+    attribute of one. Imported values are bound in the owning module's namespace, so after the
+    first use they cost a dictionary lookup, and `unittest.mock.patch` can replace them as if
+    they had been imported at the top of the module. A patched name is never overwritten.
+
+    Example:
+    ```
+    lazy_imports = LazyImports(globals(), {"OpenAIGenerator": "haystack.components.generators:OpenAIGenerator"})
+    __getattr__ = lazy_imports.attribute  # lets other modules and `patch` see the names
+
+    generator = lazy_imports.get("OpenAIGenerator")(model="gpt-4.1")
+    ```
+    """
+
+    def __init__(self, namespace: dict[str, Any], imports: dict[str, str]):
+        self._namespace = namespace
+        self._imports = imports
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Any:
+        """
+        Returns a lazy attribute, importing it if this is its first use.
+
+        Args:
+            name (str): One of the names passed to the constructor.
+
+        Returns:
+            Any: The module or attribute, or whatever has been patched in its place.
+        """
+        try:
+            return self._namespace[name]
+        except KeyError:
+            pass
+
+        module_name, _, attribute = self._imports[name].partition(":")
+        value = importlib.import_module(module_name)
+        if attribute:
+            value = getattr(value, attribute)
+
+        with self._lock:
+            return self._namespace.setdefault(name, value)
+
+    def load(self):
+        """Imports every lazy attribute, e.g. during warmup so no request pays for it."""
+        for name in self._imports:
+            self.get(name)
+
+    def attribute(self, name: str) -> Any:
+        """
+        A module level `__getattr__` that resolves the lazy attributes.
+
+        Raises:
+            AttributeError: If `name` is not a lazy attribute of the module.
+        """
+        if name not in self._imports:
+            raise AttributeError(
+                f"module {self._namespace['__name__']!r} has no attribute {name!r}"
+            )
+        return self.get(name)
@@ -0,0 +1,314 @@
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator, Sequence, TypeVar
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+# Seconds. Covers in-process work (prompt build, validation) up to slow LLM calls.
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        """Returns the exposition lines of every sample."""
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    A monotonically increasing count, optionally split by labels.
+
+    Example:
+    ```
+    errors = Counter("errors_total", "Errors by type.", ["type"])
+    errors.inc(type="RefreshError")
+    ```
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        """
+        Adds `amount` to the series selected by `labels`.
+
+        Args:
+            amount (float, optional): How much to add. Defaults to 1.
+            **labels (str): One value per label name.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Returns the current count of the series selected by `labels`."""
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """
+    Observations counted into cumulative buckets, optionally split by labels.
+
+    Observing is a bisect and three additions under a lock, so it is cheap enough for the
+    request path. Percentiles are left to whatever scrapes `/metrics`.
+
+    Example:
+    ```
+    latency = Histogram("stage_duration_seconds", "Time per stage.", ["stage"])
+    with latency.time(stage="generator"):
+        ...
+    ```
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets))
+        # Per series: [count per bucket (the last one is +Inf), sum, count]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str):
+        """
+        Records one observation in the series selected by `labels`.
+
+        Args:
+            value (float): The observed value, in seconds for durations.
+            **labels (str): One value per label name.
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self._buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observes how long the `with` block took, including when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        """Returns how many observations the series selected by `labels` holds."""
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            series = sorted(
+                (key, (list(buckets), total, count))
+                for key, (buckets, total, count) in self._series.items()
+            )
+
+        names = self.labelnames + ("le",)
+        lines = []
+        for key, (buckets, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self._buckets + (float("inf"),), buckets):
+                cumulative += bucket_count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+M = TypeVar("M", bound=_Metric)
+
+
+class MetricsRegistry:
+    """
+    Collects metrics and renders them in the Prometheus text exposition format.
+
+    #### Attributes:
+    ```
+    metrics (dict[str, Counter | Histogram]):
+    ```The registered metrics by name.
+    """
+
+    def __init__(self):
+        self.metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: M) -> M:
+        """
+        Adds a metric so it is included in `render`.
+
+        Args:
+            metric (Counter | Histogram): The metric to add.
+
+        Returns:
+            Counter | Histogram: The metric, for assignment at module level.
+        """
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Returns every registered metric in the Prometheus text format."""
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.register(
+    Histogram(
+        "calarmhelp_stage_duration_seconds",
+        "Time spent in each stage of creating an alarm.",
+        ["stage"],
+    )
+)
+VALIDATION_LOOPS = registry.register(
+    Counter(
+        "calarmhelp_validation_loops_total",
+        "LLM replies checked by the extraction pipeline.",
+        ["mode"],
+    )
+)
+ERRORS = registry.register(
+    Counter(
+        "calarmhelp_errors_total",
+        "Errors returned to callers, by type.",
+        ["type"],
+    )
+)
+CACHE_REQUESTS = registry.register(
+    Counter(
+        "calarmhelp_cache_requests_total",
+        "Lookups in the fast path parser and the extraction and calendar metadata caches.",
+        ["cache", "result"],
+    )
+)
+RETRIES = registry.register(
+    Counter(
+        "calarmhelp_retries_total",
+        "Calls to OpenAI or Google Calendar retried after a transient failure.",
+        ["dependency"],
+    )
+)
+CIRCUIT_REJECTIONS = registry.register(
+    Counter(
+        "calarmhelp_circuit_rejections_total",
+        "Calls failed fast because the dependency's circuit breaker was open.",
+        ["dependency"],
+    )
+)
+HEDGED_REQUESTS = registry.register(
+    Counter(
+        "calarmhelp_hedged_requests_total",
+        "Backup calls started because the first call was slow, by which call answered first.",
+        ["dependency", "winner"],
+    )
+)
+RATE_LIMITED = registry.register(
+    Counter(
+        "calarmhelp_rate_limited_total",
+        "Requests or alarms rejected by a per-client rate limit, by bucket.",
+        ["bucket"],
+    )
+)
+MODEL_TIER_CALLS = registry.register(
+    Counter(
+        "calarmhelp_model_tier_calls_total",
+        "LLM calls per model of the ladder, by whether the reply was accepted or escalated.",
+        ["model", "outcome"],
+    )
+)
+MODEL_TIER_DURATION = registry.register(
+    Histogram(
+        "calarmhelp_model_tier_duration_seconds",
+        "Time per LLM call, including retries, by model of the ladder.",
+        ["model"],
+    )
+)
+TRACES = registry.register(
+    Counter(
+        "calarmhelp_traces_total",
+        "Finished pipeline traces, by whether they were exported, sampled out, dropped on a full queue or failed to export.",
+        ["result"],
+    )
+)
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from calarmhelp.services.metrics import RATE_LIMITED
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when a client has used up a rate limit bucket.
+
+    #### Attributes:
+    ```
+    bucket (str):
+    ```The limit that was hit, `llm` or `calendar`.
+    ```
+    retry_after (float):
+    ```Seconds until the bucket holds enough tokens again.
+    """
+
+    def __init__(self, bucket: str, retry_after: float):
+        super().__init__(
+            f"Rate limit for {bucket} exceeded, retry in {retry_after:.0f}s"
+        )
+        self.bucket = bucket
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by client identity.
+
+    Each client's bucket holds up to `burst` tokens and refills at `per_minute` tokens a minute.
+    Buckets are created full on a client's first request, and only the `max_clients` most
+    recently seen clients are tracked, so memory stays bounded. A forgotten client starts over
+    with a full bucket.
+
+    #### Attributes:
+    ```
+    name (str):
+    ```The bucket name used in errors and metrics, e.g. `llm`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        per_minute: float,
+        burst: int,
+        max_clients: int = 10000,
+    ):
+        self.name = name
+        self._rate = per_minute / 60
+        self._burst = burst
+        self._max_clients = max_clients
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self._rate > 0 and self._burst > 0
+
+    def _refilled(self, client: str, now: float) -> float:
+        tokens, updated = self._buckets.get(client, (self._burst, now))
+        return min(self._burst, tokens + (now - updated) * self._rate)
+
+    def acquire(self, client: str, cost: int = 1, now: Optional[float] = None):
+        """
+        Takes `cost` tokens from the client's bucket.
+
+        Args:
+            client (str): The client identity.
+            cost (int, optional): Tokens to take, e.g. one per alarm in a batch.
+            now (float, optional): The current `time.monotonic()`. Defaults to now.
+
+        Raises:
+            RateLimitExceeded: If the bucket holds fewer than `cost` tokens. Nothing is taken then.
+        """
+        if not self.enabled:
+            return
+
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            tokens = self._refilled(client, now)
+
+            if tokens < cost:
+                RATE_LIMITED.inc(bucket=self.name)
+                # A request larger than the burst can never pass, so report the full refill time
+                missing = min(cost, self._burst) - tokens
+                raise RateLimitExceeded(self.name, max(missing / self._rate, 1.0))
+
+            self._buckets[client] = (tokens - cost, now)
+            self._buckets.move_to_end(client)
+
+            while len(self._buckets) > self._max_clients:
+                self._buckets.popitem(last=False)
+
+    def refund(self, client: str, cost: int = 1, now: Optional[float] = None):
+        """
+        Returns tokens taken for work that did not happen, e.g. an alarm rejected by another limit.
+
+        Args:
+            client (str): The client identity.
+            cost (int, optional): Tokens to return.
+            now (float, optional): The current `time.monotonic()`. Defaults to now.
+        """
+        if not self.enabled or cost <= 0:
+            return
+
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            if client in self._buckets:
+                self._buckets[client] = (
+                    min(self._burst, self._refilled(client, now) + cost),
+                    now,
+                )
+
+    def clear(self):
+        """Forgets every client."""
+        with self._lock:
+            self._buckets.clear()
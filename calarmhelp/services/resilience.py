@@ -0,0 +1,291 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, TypeVar
+
+from dotenv import load_dotenv
+
+from calarmhelp.services.concurrency import ALARM_CONCURRENCY
+from calarmhelp.services.metrics import CIRCUIT_REJECTIONS, HEDGED_REQUESTS, RETRIES
+
+load_dotenv()
+
+loggerResilience = logging.getLogger("Resilience")
+
+T = TypeVar("T")
+
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", 0.5))
+# Defaults to 0.5 seconds if RETRY_BASE_DELAY is not set.
+
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", 8))
+# Defaults to 8 seconds if RETRY_MAX_DELAY is not set. Also caps Retry-After.
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+# Defaults to 5 consecutive failures if CIRCUIT_FAILURE_THRESHOLD is not set.
+
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", 30))
+# Defaults to 30 seconds if CIRCUIT_RESET_TIMEOUT is not set.
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a dependency whose circuit breaker is open.
+
+    #### Attributes:
+    ```
+    dependency (str):
+    ```The dependency, e.g. `openai`.
+    ```
+    retry_after (float):
+    ```Seconds until the breaker lets a trial call through.
+    """
+
+    def __init__(self, dependency: str, retry_after: float):
+        super().__init__(
+            f"{dependency} is unavailable, retry in {max(retry_after, 0):.0f}s"
+        )
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Bounded exponential backoff with full jitter.
+
+    #### Attributes:
+    ```
+    attempts (int):
+    ```Calls made in total, including the first. 1 disables retries.
+    ```
+    base_delay (float):
+    ```Upper bound of the first delay, in seconds. Doubles on every retry.
+    ```
+    max_delay (float):
+    ```Cap on any single delay, including one asked for with Retry-After.
+    """
+
+    attempts: int = 3
+    base_delay: float = RETRY_BASE_DELAY
+    max_delay: float = RETRY_MAX_DELAY
+
+    def backoff(self, retry: int, retry_after: Optional[float] = None) -> float:
+        """
+        Returns the delay before a retry.
+
+        Args:
+            retry (int): 0 for the first retry, 1 for the second, and so on.
+            retry_after (float, optional): The delay the dependency asked for, which wins over the jittered backoff.
+
+        Returns:
+            float: Seconds to sleep, at most `max_delay`.
+        """
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), self.max_delay)
+        # Full jitter spreads out retries from requests that failed together
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**retry))
+
+
+class CircuitBreaker:
+    """
+    Per-dependency circuit breaker, shared by every thread calling that dependency.
+
+    After `failure_threshold` consecutive failures the breaker opens and calls fail fast with
+    `CircuitOpenError`, so requests stop queueing behind a dependency that is down. Once
+    `reset_timeout` has passed a single trial call is let through: success closes the breaker,
+    failure opens it for another `reset_timeout`.
+
+    #### Attributes:
+    ```
+    dependency (str):
+    ```The dependency, used in errors and metrics.
+    ```
+    state (str):
+    ````closed`, `open` or `half_open`.
+    """
+
+    def __init__(
+        self,
+        dependency: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+    ):
+        self.dependency = dependency
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.state = "closed"
+
+    def before_call(self):
+        """
+        Claims permission to call the dependency.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half open with its trial call in flight.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return
+
+            remaining = self._opened_at + self._reset_timeout - time.monotonic()
+
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"
+
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+
+        CIRCUIT_REJECTIONS.inc(dependency=self.dependency)
+        raise CircuitOpenError(self.dependency, max(remaining, 0.0))
+
+    def record_success(self):
+        """Closes the breaker and resets the failure count."""
+        with self._lock:
+            if self.state != "closed":
+                loggerResilience.info(f"{self.dependency} circuit closed")
+            self.state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Counts a failure, opening the breaker at the threshold or after a failed trial."""
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+
+            if self.state == "half_open" or self._failures >= self._failure_threshold:
+                if self.state != "open":
+                    loggerResilience.warning(
+                        f"{self.dependency} circuit opened after {self._failures} failures"
+                    )
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def reset(self):
+        """Closes the breaker and forgets past failures."""
+        self.record_success()
+
+
+def call_with_retries(
+    func: Callable[[], T],
+    breaker: CircuitBreaker,
+    policy: RetryPolicy,
+    is_retryable: Callable[[BaseException], bool],
+    retry_after: Callable[[BaseException], Optional[float]] = lambda error: None,
+) -> T:
+    """
+    Calls a dependency through its circuit breaker, retrying transient failures.
+
+    Only failures `is_retryable` accepts, such as 429, 5xx and connection errors, are retried
+    and count against the breaker. Other errors, such as a 400, mean the dependency is healthy
+    and are raised straight away.
+
+    Args:
+        func (Callable[[], T]): Makes one call. Blocks, so run it on a worker thread.
+        breaker (CircuitBreaker): The dependency's breaker.
+        policy (RetryPolicy): How often and how long to back off.
+        is_retryable (Callable[[BaseException], bool]): Whether a failure is transient.
+        retry_after (Callable[[BaseException], float | None], optional): Reads a Retry-After delay from a failure.
+
+    Returns:
+        T: The return value of `func`.
+
+    Raises:
+        CircuitOpenError: If the breaker is open.
+    """
+    attempt = 0
+
+    while True:
+        breaker.before_call()
+
+        try:
+            result = func()
+        except Exception as error:
+            if not is_retryable(error):
+                breaker.record_success()
+                raise
+
+            breaker.record_failure()
+
+            attempt += 1
+            if attempt >= policy.attempts:
+                raise
+
+            delay = policy.backoff(attempt - 1, retry_after(error))
+            loggerResilience.warning(
+                f"{breaker.dependency} call failed ({error}), retry {attempt} in {delay:.2f}s"
+            )
+            RETRIES.inc(dependency=breaker.dependency)
+            time.sleep(delay)
+            continue
+
+        breaker.record_success()
+        return result
+
+
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=2 * ALARM_CONCURRENCY, thread_name_prefix="calarmhelp-hedge"
+)
+
+
+def call_hedged(func: Callable[[], T], hedge_after: float, dependency: str) -> T:
+    """
+    Calls `func`, and calls it again if the first call has not returned after `hedge_after` seconds.
+
+    The first successful call wins. The slower call is left to finish in the background, so only
+    hedge idempotent calls, such as a temperature 0 LLM completion.
+
+    Args:
+        func (Callable[[], T]): Makes one call.
+        hedge_after (float): Seconds to wait before the backup call. 0 or less disables hedging.
+        dependency (str): The dependency, used in metrics.
+
+    Returns:
+        T: The result of whichever call succeeded first.
+    """
+    if hedge_after <= 0:
+        return func()
+
+    first = _hedge_executor.submit(func)
+    done, _ = wait([first], timeout=hedge_after)
+    if done:
+        return first.result()
+
+    backup = _hedge_executor.submit(func)
+    pending = {first, backup}
+    error: Optional[BaseException] = None
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            if future.exception() is None:
+                HEDGED_REQUESTS.inc(
+                    dependency=dependency,
+                    winner="first" if future is first else "backup",
+                )
+                return future.result()
+            error = future.exception()
+
+    if error is None:
+        raise RuntimeError(
+            f"Hedged calls to {dependency} finished without a result or an error"
+        )
+    raise error
+
+
+def breaker_stats(*breakers: CircuitBreaker) -> dict[str, Any]:
+    """Returns the state of each breaker, keyed by dependency."""
+    return {breaker.dependency: breaker.state for breaker in breakers}
+
+
+openai_breaker = CircuitBreaker("openai")
+google_calendar_breaker = CircuitBreaker("google_calendar")
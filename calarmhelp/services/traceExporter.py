@@ -0,0 +1,389 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator, Optional
+
+from dotenv import load_dotenv
+from haystack.tracing import Span, Tracer
+from haystack.tracing.tracer import NullTracer
+from haystack.tracing.utils import coerce_tag_value
+
+from calarmhelp.services.lazy import LazyImports
+from calarmhelp.services.metrics import TRACES
+
+load_dotenv()
+
+lazy_imports = LazyImports(globals(), {"Langfuse": "langfuse:Langfuse"})
+__getattr__ = lazy_imports.attribute
+
+loggerTraceExporter = logging.getLogger("Trace Exporter")
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 1.0))
+# Defaults to tracing every run if TRACE_SAMPLE_RATE is not set.
+
+TRACE_ERRORS = os.getenv("TRACE_ERRORS", "true").lower() == "true"
+# Defaults to tracing every failed run, sampled or not, if TRACE_ERRORS is not set.
+
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", 1000))
+# Defaults to 1000 traces waiting for export if TRACE_QUEUE_SIZE is not set.
+
+CONTENT_TAGS = {
+    "haystack.component.input": "input",
+    "haystack.component.output": "output",
+}
+# Content tag -> `RecordedSpan` attribute. Only set when Haystack content tracing is enabled.
+
+
+@dataclass
+class RecordedSpan:
+    """
+    A span of a recorded trace, e.g. one component run.
+
+    #### Attributes:
+    ```
+    operation (str):
+    ```The Haystack operation, e.g. `haystack.component.run`.
+    ```
+    tags (dict[str, Any]):
+    ```The Haystack tags, converted to JSON friendly values only when exported.
+    ```
+    parent (int | None):
+    ```Index of the enclosing span in `TraceRecord.spans`, None at the top level.
+    ```
+    start (float), end (float):
+    ````time.time()` when the span opened and closed.
+    """
+
+    operation: str
+    tags: dict[str, Any]
+    parent: Optional[int]
+    start: float
+    end: float = 0.0
+    input: Any = None
+    output: Any = None
+    error: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return self.tags.get("haystack.component.name", self.operation)
+
+    @property
+    def is_generation(self) -> bool:
+        """Whether the span is an LLM call, i.e. a component with `replies` and `meta` outputs."""
+        outputs = self.tags.get("haystack.component.output_spec") or {}
+        return "replies" in outputs and "meta" in outputs
+
+
+@dataclass
+class TraceRecord:
+    """
+    Everything recorded during one pipeline run, held in memory until it is exported.
+
+    #### Attributes:
+    ```
+    name (str):
+    ```The trace name, e.g. `Calendar Alarm Service`.
+    ```
+    sampled (bool):
+    ```Whether the run was picked by `TRACE_SAMPLE_RATE`. Unsampled runs are only exported on error.
+    ```
+    error (str | None):
+    ```Why the run failed. Set by the caller for failures that are returned rather than raised.
+    """
+
+    name: str
+    start: float
+    sampled: bool
+    end: float = 0.0
+    input: Any = None
+    output: Any = None
+    error: Optional[str] = None
+    spans: list[RecordedSpan] = field(default_factory=list)
+
+
+class RecordingSpan(Span):
+    """Haystack span that writes its tags into a `RecordedSpan`."""
+
+    def __init__(self, recorded: RecordedSpan):
+        self._recorded = recorded
+
+    def set_tag(self, key: str, value: Any):
+        attribute = CONTENT_TAGS.get(key)
+        if attribute is None:
+            self._recorded.tags[key] = value
+        else:
+            setattr(self._recorded, attribute, value)
+
+    def raw_span(self) -> RecordedSpan:
+        return self._recorded
+
+
+class TraceExporter:
+    """
+    Exports finished traces from a background thread, so requests never wait on the tracing backend.
+
+    `submit` only puts the trace on a bounded queue. When the queue is full, because the backend
+    is slow or down, the trace is dropped rather than making the request wait. The export thread
+    and the sink are created on first use. Queued traces are exported at interpreter exit.
+
+    #### Attributes:
+    ```
+    sample_rate (float):
+    ```Fraction of runs that are traced, from 0 to 1.
+    ```
+    trace_errors (bool):
+    ```Whether failed runs are traced even when they were not sampled.
+    """
+
+    def __init__(
+        self,
+        sink_factory: Callable[[], Callable[[TraceRecord], None]],
+        sample_rate: float = TRACE_SAMPLE_RATE,
+        trace_errors: bool = TRACE_ERRORS,
+        queue_size: int = TRACE_QUEUE_SIZE,
+    ):
+        self.sample_rate = sample_rate
+        self.trace_errors = trace_errors
+        self._sink_factory = sink_factory
+        self._sink: Optional[Callable[[TraceRecord], None]] = None
+        self._queue: queue.Queue[TraceRecord] = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> bool:
+        """Decides whether a run starting now is sampled."""
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def submit(self, trace: TraceRecord):
+        """
+        Queues a finished trace for export, unless it was sampled out. Never blocks.
+
+        Args:
+            trace (TraceRecord): The finished trace.
+        """
+        if not (trace.sampled or (self.trace_errors and trace.error is not None)):
+            TRACES.inc(result="sampled_out")
+            return
+
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            TRACES.inc(result="dropped")
+            return
+
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._export, name="calarmhelp-trace-export", daemon=True
+                )
+                self._thread.start()
+
+    def _export(self):
+        try:
+            self._sink = self._sink_factory()
+        except Exception:
+            loggerTraceExporter.exception("Trace export disabled, no sink")
+            self._sink = lambda trace: None
+        # Registered after the sink, whose client may register its own shutdown, so this runs first
+        atexit.register(self.close)
+
+        while True:
+            trace = self._queue.get()
+            try:
+                self._sink(trace)
+                TRACES.inc(result="exported")
+            except Exception:
+                loggerTraceExporter.exception(f"Failed to export trace {trace.name}")
+                TRACES.inc(result="failed")
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Waits until every queued trace has been handed to the sink.
+
+        Args:
+            timeout (float, optional): Seconds to wait at most.
+
+        Returns:
+            bool: True if the queue was drained in time.
+        """
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(
+                lambda: not self._queue.unfinished_tasks, timeout
+            )
+
+    def close(self, timeout: float = 5.0):
+        """Drains the queue, then flushes the sink if it buffers traces itself."""
+        if not self.flush(timeout):
+            loggerTraceExporter.warning(
+                f"{self._queue.qsize()} traces were not exported in time"
+            )
+        flush = getattr(self._sink, "flush", None)
+        if flush is not None:
+            flush()
+
+
+class TraceRecorder(Tracer):
+    """
+    Haystack tracer that records the spans of pipeline runs wrapped in `record`.
+
+    Spans are kept in memory on the running thread and handed to a `TraceExporter` once the run
+    is over, so the sampling decision can wait until it is known whether the run failed.
+    Outside `record` every span is delegated to `tracer`, the tracer that was active before.
+
+    #### Attributes:
+    ```
+    exporter (TraceExporter):
+    ```Receives the finished traces.
+    ```
+    tracer (Tracer):
+    ```Handles spans outside `record`.
+    """
+
+    def __init__(self, exporter: TraceExporter, tracer: Optional[Tracer] = None):
+        self.exporter = exporter
+        self.tracer = tracer or NullTracer()
+        self._local = threading.local()
+
+    @contextmanager
+    def record(self, name: str, input: Any = None) -> Iterator[Optional[TraceRecord]]:
+        """
+        Records the spans opened by this thread for the duration of the `with` block.
+
+        Args:
+            name (str): The trace name.
+            input (Any, optional): The trace input, e.g. the user input.
+
+        Yields:
+            TraceRecord | None: The trace, so the caller can set its `output` or `error`. None when
+            the run was not sampled and errors are not traced either, so nothing is recorded.
+        """
+        sampled = self.exporter.sample()
+        if not sampled and not self.exporter.trace_errors:
+            TRACES.inc(result="sampled_out")
+            yield None
+            return
+
+        trace = TraceRecord(name=name, start=time.time(), sampled=sampled, input=input)
+        self._local.trace = trace
+        self._local.spans = []
+
+        try:
+            yield trace
+        except BaseException as e:
+            trace.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._local.trace = None
+            trace.end = time.time()
+            self.exporter.submit(trace)
+
+    @contextmanager
+    def trace(
+        self, operation_name: str, tags: Optional[dict[str, Any]] = None
+    ) -> Iterator[Span]:
+        trace: Optional[TraceRecord] = getattr(self._local, "trace", None)
+        if trace is None:
+            with self.tracer.trace(operation_name, tags=tags) as span:
+                yield span
+            return
+
+        spans: list[tuple[int, RecordingSpan]] = self._local.spans
+        recorded = RecordedSpan(
+            operation=operation_name,
+            tags=tags if tags is not None else {},
+            parent=spans[-1][0] if spans else None,
+            start=time.time(),
+        )
+        span = RecordingSpan(recorded)
+        trace.spans.append(recorded)
+        spans.append((len(trace.spans) - 1, span))
+
+        try:
+            yield span
+        except BaseException as e:
+            recorded.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            recorded.end = time.time()
+            spans.pop()
+
+    def current_span(self) -> Optional[Span]:
+        if getattr(self._local, "trace", None) is None:
+            return self.tracer.current_span()
+        spans = self._local.spans
+        return spans[-1][1] if spans else None
+
+
+def _timestamp(seconds: float) -> datetime:
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+
+class LangfuseSink:
+    """
+    Sends recorded traces to Langfuse. Built on the export thread, which is the only caller.
+
+    The Langfuse client reads `LANGFUSE_PUBLIC_KEY`, `LANGFUSE_SECRET_KEY` and `LANGFUSE_HOST`,
+    and batches its own uploads, so `__call__` returns as soon as the events are queued.
+    """
+
+    def __init__(self):
+        self._client = lazy_imports.get("Langfuse")()
+
+    def __call__(self, trace: TraceRecord):
+        langfuse_trace = self._client.trace(
+            name=trace.name,
+            timestamp=_timestamp(trace.start),
+            input=trace.input,
+            output=trace.output,
+            metadata={"sampled": trace.sampled, "error": trace.error},
+            tags=["error"] if trace.error is not None else None,
+        )
+        observations: dict[int, Any] = {}
+
+        for index, span in enumerate(trace.spans):
+            parent = observations.get(span.parent, langfuse_trace)
+            kwargs: dict[str, Any] = {
+                "name": span.name,
+                "start_time": _timestamp(span.start),
+                "end_time": _timestamp(span.end),
+                "input": span.input,
+                "output": span.output,
+                "metadata": {
+                    key: coerce_tag_value(value) for key, value in span.tags.items()
+                },
+                "level": "ERROR" if span.error is not None else "DEFAULT",
+                "status_message": span.error,
+            }
+
+            if span.is_generation:
+                # One meta dict per reply, all from the same call
+                meta = (span.output or {}).get("meta") or [{}]
+                observations[index] = parent.generation(
+                    model=meta[0].get("model"),
+                    usage=meta[0].get("usage") or None,
+                    **kwargs,
+                )
+            else:
+                observations[index] = parent.span(**kwargs)
+
+        loggerTraceExporter.debug(f"Langfuse: {langfuse_trace.get_trace_url()}")
+
+    def flush(self):
+        self._client.flush()
+
+
+trace_exporter = TraceExporter(LangfuseSink)
+trace_recorder = TraceRecorder(trace_exporter)
@@ -1,15 +1,47 @@
+from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 import json
+from json.encoder import encode_basestring
+import re
 from typing import Any, Dict, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+RRULE_FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+# Finer frequencies would flood the calendar with alarms.
+
+RRULE_PART_RES = {
+    "FREQ": re.compile("|".join(RRULE_FREQUENCIES)),
+    "INTERVAL": re.compile(r"[1-9]\d{0,2}"),
+    "COUNT": re.compile(r"[1-9]\d{0,3}"),
+    "UNTIL": re.compile(r"\d{8}(?:T\d{6}Z)?"),
+    "BYDAY": re.compile(
+        r"[+-]?\d{0,2}(?:MO|TU|WE|TH|FR|SA|SU)(?:,[+-]?\d{0,2}(?:MO|TU|WE|TH|FR|SA|SU))*"
+    ),
+    "BYMONTHDAY": re.compile(r"-?\d{1,2}(?:,-?\d{1,2})*"),
+    "BYMONTH": re.compile(r"\d{1,2}(?:,\d{1,2})*"),
+    "BYSETPOS": re.compile(r"-?\d{1,3}(?:,-?\d{1,3})*"),
+    "WKST": re.compile("MO|TU|WE|TH|FR|SA|SU"),
+}
+# The RFC 5545 recurrence rule parts accepted, with the values each may take.
+
+
+def json_string(value: Optional[str]) -> str:
+    """Encodes a string as JSON the way `fastapi.responses.JSONResponse` does, without escaping non-ASCII."""
+    return "null" if value is None else encode_basestring(value)
 
 
 class CreateAlarmRequest(BaseModel):
     input: str
 
 
+class CreateAlarmsRequest(BaseModel):
+    """Model for creating several alarms at once. One Google batch request holds 50 inserts."""
+
+    inputs: list[str] = Field(min_length=1, max_length=50)
+
+
 class Category(str, Enum):
     """Enumeration for event categories."""
 
@@ -37,6 +69,10 @@ class CalendarAlarmResponse(BaseModel):
     location: Optional[str] = Field(
         default=None, description="Location of event, if provided"
     )
+    recurrence: Optional[str] = Field(
+        default=None,
+        description="If the event repeats, an RFC 5545 RRULE without the 'RRULE:' prefix, e.g. 'FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR' for every weekday. Null for a one-off event.",
+    )
     error: bool = Field(
         default=False,
         description="If there was an error in the input then True. Otherwise, False.",
@@ -45,6 +81,43 @@ class CalendarAlarmResponse(BaseModel):
         description="The current time. Always following the 'America/New_York' timezone."
     )
 
+    @field_validator("recurrence")
+    @classmethod
+    def check_recurrence(cls, value: Optional[str]) -> Optional[str]:
+        """
+        Normalizes the recurrence to an upper case RRULE without its prefix, and rejects rules
+        Google Calendar would not accept. An empty rule means a one-off event.
+
+        Raises:
+            ValueError: If a part is unknown, repeated or malformed, FREQ is missing, or both
+            COUNT and UNTIL are given.
+        """
+        if value is None:
+            return None
+
+        rule = value.strip().upper().removeprefix("RRULE:").strip(" ;")
+        if not rule:
+            return None
+
+        parts: dict[str, str] = {}
+        for part in rule.split(";"):
+            key, _, part_value = part.partition("=")
+            pattern = RRULE_PART_RES.get(key)
+            if pattern is None:
+                raise ValueError(f"unsupported RRULE part {part!r}")
+            if key in parts:
+                raise ValueError(f"RRULE part {key} is repeated")
+            if not pattern.fullmatch(part_value):
+                raise ValueError(f"invalid RRULE part {part!r}")
+            parts[key] = part_value
+
+        if "FREQ" not in parts:
+            raise ValueError(f"RRULE needs FREQ, one of {', '.join(RRULE_FREQUENCIES)}")
+        if "COUNT" in parts and "UNTIL" in parts:
+            raise ValueError("RRULE may have COUNT or UNTIL, not both")
+
+        return rule
+
     def to_dict(self) -> Dict[str, Union[str, Any]]:
         """Serializes object"""
         return {
@@ -54,13 +127,55 @@ class CalendarAlarmResponse(BaseModel):
             "event_time": self.event_time.isoformat(),
             "event_time_end": self.event_time_end.isoformat(),
             "location": self.location,
+            "recurrence": self.recurrence,
             "error": self.error,
-            "current_time": self.current_time,
+            "current_time": self.current_time.isoformat(),
         }
 
     def to_json(self) -> str:
         return json.dumps(self.to_dict(), default=str)
 
+    def to_json_bytes(self) -> bytes:
+        """
+        Serializes the object straight to the response body, skipping FastAPI's generic encoder.
+
+        Returns:
+            bytes: The same bytes `JSONResponse(self.to_dict())` renders.
+        """
+        return (
+            f'{{"name":{encode_basestring(self.name)},'
+            f'"category":"{self.category.value}",'
+            f'"lead_time":{self.lead_time:d},'
+            f'"event_time":"{self.event_time.isoformat()}",'
+            f'"event_time_end":"{self.event_time_end.isoformat()}",'
+            f'"location":{json_string(self.location)},'
+            f'"recurrence":{json_string(self.recurrence)},'
+            f'"error":{"true" if self.error else "false"},'
+            f'"current_time":"{self.current_time.isoformat()}"}}'
+        ).encode()
+
+
+def create_alarm_readout(input: CalendarAlarmResponse) -> str:
+    """Provides the 'description' field for google calendar
+
+    Args:
+        input (CalendarAlarmResponse): The input object containing alarm information.
+
+    Returns:
+        str: A string that describes the alarm in a format that Google Calendar can understand.
+    """
+
+    month = input.event_time.strftime("%B")
+    day_number = input.event_time.strftime("%d")
+    day_of_week = input.event_time.strftime("%A")
+    hour = input.event_time.strftime("%I").lstrip("0")
+    minutes_am_pm = input.event_time.strftime(":%M %p")
+    time_of_day = hour + minutes_am_pm
+    locationCondition = f"{(' at ' + input.location) if input.location else ''}"
+
+    # Take care with format. Everything, even spacing - is intentional.
+    return f"{input.name.capitalize()} @ {time_of_day}{locationCondition} on {day_of_week} {month} {day_number.casefold()} #{input.category.name.lower()} [{input.lead_time}m]"
+
 
 class GoogleCalendarInfoInput(BaseModel):
     """Model for Google Calendar information input."""
@@ -78,36 +193,74 @@ class GoogleCalendarInfoInput(BaseModel):
     def to_json(self) -> str:
         return json.dumps(self.to_dict(), default=str)
 
+    def to_json_bytes(self) -> bytes:
+        """Serializes the object straight to the response body, like `CalendarAlarmResponse.to_json_bytes`."""
+        return b'{"response":%s,"jsonResponse":%s}' % (
+            encode_basestring(self.response).encode(),
+            self.jsonResponse.to_json_bytes(),
+        )
 
-class GoogleCalendarResponse(BaseModel):
-    """Model for Google Calendar response with dynamic keys."""
+
+@dataclass(frozen=True, slots=True)
+class GoogleCalendarResponse:
+    """
+    Outcome of a calendar write, or the error that stopped an alarm before it.
+
+    #### Attributes:
+    ```
+    success (str | None):
+    ```What was created, e.g. `Event Created`.
+    ```
+    error (str | None):
+    ```Why nothing was created.
+    """
 
     success: Optional[str] = None
     error: Optional[str] = None
 
-    __pydantic_extra__: Dict[str, Any] = {}
+    def __getitem__(self, item: str) -> Optional[str]:
+        if item not in ("success", "error"):
+            raise KeyError(item)
+        return getattr(self, item)
 
-    class Config:
-        extra = "allow"
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializes object"""
+        return {"success": self.success, "error": self.error}
 
-    def __getitem__(self, item):
-        return self.__dict__.get(item)
+    def to_json(self) -> str:
+        return self.to_json_bytes().decode()
+
+    def to_json_bytes(self) -> bytes:
+        """Serializes the object straight to the response body, like `CalendarAlarmResponse.to_json_bytes`."""
+        return (
+            f'{{"success":{json_string(self.success)},'
+            f'"error":{json_string(self.error)}}}'
+        ).encode()
+
+
+AlarmResult = Union[GoogleCalendarInfoInput, GoogleCalendarResponse]
+# What `/create_alarm` answers: the created alarm, or the error that stopped it.
 
-    def __getattr__(self, item):
-        if self.__pydantic_extra__ is None:
-            self.__pydantic_extra__ = {}
-        if item in self.__pydantic_extra__:
-            return self.__pydantic_extra__[item]
-        try:
-            return self.__dict__[item]
-        except KeyError:
-            raise AttributeError(
-                f"'GoogleCalendarResponse' object has no attribute '{item}'"
-            )
+
+@dataclass(frozen=True, slots=True)
+class AlarmBatchResult:
+    """
+    What `/create_alarms` answers.
+
+    #### Attributes:
+    ```
+    results (list[AlarmResult]):
+    ```One result per input, in input order.
+    """
+
+    results: list[AlarmResult]
 
     def to_dict(self) -> Dict[str, Any]:
         """Serializes object"""
-        return self.model_dump()
+        return {"results": [result.to_dict() for result in self.results]}
 
-    def to_json(self) -> str:
-        return self.model_dump_json()
+    def to_json_bytes(self) -> bytes:
+        """Serializes the object straight to the response body, like `CalendarAlarmResponse.to_json_bytes`."""
+        return b'{"results":[%s]}' % b",".join(
+            result.to_json_bytes() for result in self.results
+        )
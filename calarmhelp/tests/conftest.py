@@ -14,6 +14,11 @@ from calarmhelp.services.util.util import (
     GoogleCalendarResponse,
 )
 from calarmhelp.main import app
+from calarmhelp.services.googleCalendarService import (
+    GoogleCalendarClient,
+    calendar_metadata_cache,
+)
+from calarmhelp.services.resilience import google_calendar_breaker, openai_breaker
 
 
 @pytest.fixture
@@ -22,6 +27,36 @@ def test_client() -> TestClient:
     return TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def mock_google_calendar_client() -> Generator:
+    """Keep tests from building real Google clients or refreshing real credentials."""
+    client = MagicMock(spec=GoogleCalendarClient)
+    client.get_service.return_value = MagicMock()
+
+    with patch("calarmhelp.main.google_calendar_client", client), patch(
+        "calarmhelp.services.googleCalendarService.google_calendar_client", client
+    ):
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers() -> Generator:
+    """Start every test with closed circuit breakers."""
+    openai_breaker.reset()
+    google_calendar_breaker.reset()
+    yield
+    openai_breaker.reset()
+    google_calendar_breaker.reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_calendar_metadata_cache() -> Generator:
+    """Start every test without cached calendar lookups."""
+    calendar_metadata_cache.invalidate()
+    yield
+    calendar_metadata_cache.invalidate()
+
+
 @pytest.fixture
 def mock_env_vars() -> Generator:
     """Mock environment variables required for testing."""
@@ -1,18 +1,68 @@
 """Tests for API endpoints."""
 
 import json
+import time
 import pytest
 from unittest.mock import patch, MagicMock
 
 from fastapi import status
 
+from calarmhelp.main import extraction_cache, idempotency_store
+from calarmhelp.services.rateLimiter import RateLimiter
+from calarmhelp.services.resilience import CircuitOpenError
+
 from calarmhelp.services.util.util import (
     CalendarAlarmResponse,
+    GoogleCalendarInfoInput,
     GoogleCalendarResponse,
     Category,
 )
 
 
+@pytest.fixture(autouse=True)
+def disable_fast_path():
+    """Send every request through the (mocked) LLM pipeline unless a test opts in."""
+    with patch("calarmhelp.main.FAST_PATH_ENABLED", False):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_extraction_cache():
+    """Start every test with an empty extraction cache."""
+    extraction_cache.clear()
+    yield
+    extraction_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_idempotency_store():
+    """Start every test with no stored idempotent responses."""
+    idempotency_store.clear()
+    yield
+    idempotency_store.clear()
+
+
+@pytest.fixture
+def rate_limits():
+    """Swap in small LLM and calendar rate limits for the duration of a test."""
+    llm = RateLimiter("llm", per_minute=1, burst=1)
+    calendar = RateLimiter("calendar", per_minute=1, burst=2)
+
+    with patch("calarmhelp.main.llm_rate_limiter", llm), patch(
+        "calarmhelp.main.calendar_rate_limiter", calendar
+    ):
+        yield llm, calendar
+
+
+def parse_sse(body: str) -> list[tuple[str, dict]]:
+    """Split a text/event-stream body into (event, data) pairs."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
 class TestAPIEndpoints:
     """Tests for API endpoints."""
 
@@ -37,10 +87,11 @@ class TestAPIEndpoints:
             success="Event created successfully",
         )
 
-        # Make request
-        response = test_client.post(
-            "/create_alarm", json={"input": "Remind me to buy groceries at 5pm"}
-        )
+        # Make request; entering the client runs the lifespan that fills the pool
+        with test_client:
+            response = test_client.post(
+                "/create_alarm", json={"input": "Remind me to buy groceries at 5pm"}
+            )
 
         # Check response
         assert response.status_code == status.HTTP_201_CREATED
@@ -67,8 +118,11 @@ class TestAPIEndpoints:
         error_response = GoogleCalendarResponse(error="Failed to parse input")
         mock_calendar_pipeline_instance.run.return_value = error_response
 
-        # Make request
-        response = test_client.post("/create_alarm", json={"input": "Invalid input"})
+        # Make request; entering the client runs the lifespan that fills the pool
+        with test_client:
+            response = test_client.post(
+                "/create_alarm", json={"input": "Invalid input"}
+            )
 
         # Check response
         assert response.status_code == status.HTTP_201_CREATED
@@ -105,10 +159,11 @@ class TestAPIEndpoints:
         )
         mock_google_calendar_service.return_value = error_response
 
-        # Make request
-        response = test_client.post(
-            "/create_alarm", json={"input": "Remind me to buy groceries at 5pm"}
-        )
+        # Make request; entering the client runs the lifespan that fills the pool
+        with test_client:
+            response = test_client.post(
+                "/create_alarm", json={"input": "Remind me to buy groceries at 5pm"}
+            )
 
         # Check response
         assert response.status_code == status.HTTP_201_CREATED
@@ -122,3 +177,603 @@ class TestAPIEndpoints:
         )
         # We only check if the mock was called, not the exact arguments since it includes a logger
         assert mock_google_calendar_service.called
+
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarServiceScript")
+    def test_create_alarm_reuses_pooled_pipeline(
+        self,
+        mock_google_calendar_service,
+        mock_calendar_alarm_service,
+        test_client,
+        sample_calendar_alarm_response,
+    ):
+        """Test that sequential requests reuse a pipeline built at startup."""
+        mock_calendar_alarm_service.return_value.run.return_value = (
+            sample_calendar_alarm_response
+        )
+        mock_google_calendar_service.return_value = GoogleCalendarResponse(
+            success="Event created successfully",
+        )
+
+        with test_client:
+            built_at_startup = mock_calendar_alarm_service.call_count
+            for _ in range(3):
+                response = test_client.post(
+                    "/create_alarm", json={"input": "Remind me to buy groceries at 5pm"}
+                )
+                assert response.status_code == status.HTTP_201_CREATED
+
+        assert built_at_startup >= 1
+        assert mock_calendar_alarm_service.call_count == built_at_startup
+        assert mock_calendar_alarm_service.return_value.run.call_count == 3
+
+    @patch("calarmhelp.main.STARTUP_WARMUP", "background")
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarServiceScript")
+    def test_create_alarm_waits_for_background_warmup(
+        self,
+        mock_google_calendar_service,
+        mock_calendar_alarm_service,
+        test_client,
+        sample_calendar_alarm_response,
+    ):
+        """Test that with a background warmup, a request needing the pipeline waits for the pool."""
+        mock_calendar_alarm_service.return_value.run.return_value = (
+            sample_calendar_alarm_response
+        )
+        mock_google_calendar_service.return_value = GoogleCalendarResponse(
+            success="Event created successfully",
+        )
+
+        with test_client:
+            response = test_client.post(
+                "/create_alarm", json={"input": "Remind me to buy groceries at 5pm"}
+            )
+            timings = test_client.app.state.startup_timings
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert mock_calendar_alarm_service.return_value.run.call_count == 1
+        assert set(timings) == {
+            "pipeline_imports",
+            "pipeline_pool",
+            "google_calendar",
+            "warmup_request",
+        }
+
+    @patch("calarmhelp.main.FAST_PATH_ENABLED", True)
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarServiceScript")
+    def test_create_alarm_fast_path_skips_pipeline(
+        self,
+        mock_google_calendar_service,
+        mock_calendar_alarm_service,
+        test_client,
+    ):
+        """Test that a recognised phrasing never reaches the LLM pipeline."""
+        mock_google_calendar_service.return_value = GoogleCalendarResponse(
+            success="Event created successfully",
+        )
+
+        with test_client:
+            response = test_client.post(
+                "/create_alarm",
+                json={
+                    "input": "Respond to Tom at 5PM tomorrow with a 5 minute reminder"
+                },
+            )
+            stats = test_client.get("/stats").json()
+
+        assert response.status_code == status.HTTP_201_CREATED
+        data = response.json()
+        assert data["jsonResponse"]["name"] == "Respond to Tom"
+        assert data["jsonResponse"]["lead_time"] == 5
+        assert "[5m]" in data["response"]
+
+        mock_calendar_alarm_service.return_value.run.assert_not_called()
+        event_input = mock_google_calendar_service.call_args.args[0]
+        assert isinstance(event_input, GoogleCalendarInfoInput)
+        assert stats["fast_path"]["hits"] >= 1
+
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    def test_create_alarm_circuit_open_returns_503(
+        self, mock_calendar_alarm_service, test_client
+    ):
+        """Test that an open circuit breaker answers 503 with Retry-After instead of a 500."""
+        mock_calendar_alarm_service.return_value.run.side_effect = CircuitOpenError(
+            "openai", 12.3
+        )
+
+        with test_client:
+            response = test_client.post(
+                "/create_alarm", json={"input": "Remind me to buy groceries at 5pm"}
+            )
+            stats = test_client.get("/stats").json()
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "13"
+        assert "openai is unavailable" in response.json()["error"]
+        assert stats["circuit_breakers"] == {
+            "openai": "closed",
+            "google_calendar": "closed",
+        }
+
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarServiceScript")
+    def test_create_alarm_calendar_rate_limit_returns_429(
+        self,
+        mock_google_calendar_service,
+        mock_calendar_alarm_service,
+        test_client,
+        rate_limits,
+    ):
+        """Test that a client over the calendar limit gets 429 without reaching the pipeline."""
+        _, calendar = rate_limits
+        calendar.acquire("id:noisy", cost=2)
+
+        with test_client:
+            response = test_client.post(
+                "/create_alarm",
+                json={"input": "Remind me to buy groceries at 5pm"},
+                headers={"X-Client-Id": "noisy"},
+            )
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response.headers["Retry-After"]) >= 1
+        assert "Rate limit for calendar exceeded" in response.json()["error"]
+        mock_calendar_alarm_service.return_value.run.assert_not_called()
+        mock_google_calendar_service.assert_not_called()
+
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarServiceScript")
+    def test_create_alarm_llm_rate_limit_is_per_client(
+        self,
+        mock_google_calendar_service,
+        mock_calendar_alarm_service,
+        test_client,
+        sample_calendar_alarm_response,
+        rate_limits,
+    ):
+        """Test that the LLM limit rejects a client's second LLM call but not other clients."""
+        mock_calendar_alarm_service.return_value.run.return_value = (
+            sample_calendar_alarm_response
+        )
+        mock_google_calendar_service.return_value = GoogleCalendarResponse(
+            success="Event created successfully",
+        )
+
+        with test_client:
+            first = test_client.post(
+                "/create_alarm",
+                json={"input": "Remind me to buy groceries at 5pm"},
+                headers={"X-Client-Id": "noisy"},
+            )
+            second = test_client.post(
+                "/create_alarm",
+                json={"input": "Remind me to call mum at 6pm"},
+                headers={"X-Client-Id": "noisy"},
+            )
+            other = test_client.post(
+                "/create_alarm",
+                json={"input": "Remind me to call mum at 6pm"},
+                headers={"X-Client-Id": "quiet"},
+            )
+
+        assert first.status_code == status.HTTP_201_CREATED
+        assert second.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert "Rate limit for llm exceeded" in second.json()["error"]
+        assert other.status_code == status.HTTP_201_CREATED
+        assert mock_calendar_alarm_service.return_value.run.call_count == 2
+
+    @patch("calarmhelp.main.FAST_PATH_ENABLED", True)
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarServiceScript")
+    def test_create_alarm_fast_path_skips_llm_rate_limit(
+        self,
+        mock_google_calendar_service,
+        mock_calendar_alarm_service,
+        test_client,
+        rate_limits,
+    ):
+        """Test that inputs the fast path handles do not use up the LLM bucket."""
+        llm, _ = rate_limits
+        llm.acquire("id:noisy")
+        mock_google_calendar_service.return_value = GoogleCalendarResponse(
+            success="Event created successfully",
+        )
+
+        with test_client:
+            response = test_client.post(
+                "/create_alarm",
+                json={
+                    "input": "Respond to Tom at 5PM tomorrow with a 5 minute reminder"
+                },
+                headers={"X-Client-Id": "noisy"},
+            )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        mock_calendar_alarm_service.return_value.run.assert_not_called()
+
+    def test_metrics_endpoint(self, test_client):
+        """Test that /metrics serves the Prometheus text format."""
+        with test_client:
+            response = test_client.get("/metrics")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE calarmhelp_stage_duration_seconds histogram" in response.text
+        assert "# TYPE calarmhelp_errors_total counter" in response.text
+
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    def test_ready_after_warmup(self, mock_calendar_alarm_service, test_client):
+        """Test that /ready reports 503 before startup and 200 once the warmup request ran."""
+        not_started = test_client.get("/ready")
+
+        with test_client:
+            response = test_client.get("/ready")
+
+        assert not_started.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert not_started.json() == {"ready": False}
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["ready"] is True
+        assert "warmup_request" in response.json()["startup_timings"]
+        mock_calendar_alarm_service.return_value.warm_up.assert_called_once()
+
+    @patch("calarmhelp.main.FAST_PATH_ENABLED", True)
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarServiceScript")
+    def test_create_alarm_fast_path_falls_back_to_pipeline(
+        self,
+        mock_google_calendar_service,
+        mock_calendar_alarm_service,
+        test_client,
+        sample_calendar_alarm_response,
+    ):
+        """Test that an ambiguous phrasing falls back to the LLM pipeline."""
+        mock_calendar_alarm_service.return_value.run.return_value = (
+            sample_calendar_alarm_response
+        )
+        mock_google_calendar_service.return_value = GoogleCalendarResponse(
+            success="Event created successfully",
+        )
+
+        with test_client:
+            response = test_client.post(
+                "/create_alarm", json={"input": "Meeting with Sam at 3"}
+            )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        mock_calendar_alarm_service.return_value.run.assert_called_once_with(
+            input="Meeting with Sam at 3"
+        )
+
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarServiceScript")
+    def test_create_alarm_repeated_input_served_from_cache(
+        self,
+        mock_google_calendar_service,
+        mock_calendar_alarm_service,
+        test_client,
+        sample_google_calendar_info_input,
+    ):
+        """Test that a repeated utterance skips the LLM pipeline."""
+        mock_calendar_alarm_service.return_value.run.return_value = (
+            sample_google_calendar_info_input
+        )
+        mock_google_calendar_service.return_value = GoogleCalendarResponse(
+            success="Event created successfully",
+        )
+
+        with test_client:
+            first = test_client.post(
+                "/create_alarm", json={"input": "Remind me to buy groceries at 5pm"}
+            )
+            second = test_client.post(
+                "/create_alarm", json={"input": "remind me to  buy groceries at 5pm."}
+            )
+            stats = test_client.get("/stats").json()
+
+        assert first.json()["response"] == second.json()["response"]
+        mock_calendar_alarm_service.return_value.run.assert_called_once()
+        assert mock_google_calendar_service.call_count == 2
+        assert stats["extraction_cache"]["hits"] == 1
+        assert stats["extraction_cache"]["misses"] == 1
+
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarServiceScript")
+    def test_create_alarm_idempotency_key_replays_response(
+        self,
+        mock_google_calendar_service,
+        mock_calendar_alarm_service,
+        test_client,
+        sample_google_calendar_info_input,
+    ):
+        """Test that a retry with the same Idempotency-Key creates no second event."""
+        mock_calendar_alarm_service.return_value.run.return_value = (
+            sample_google_calendar_info_input
+        )
+        mock_google_calendar_service.return_value = GoogleCalendarResponse(
+            success="Event created successfully",
+        )
+        body = {"input": "Remind me to buy groceries at 5pm"}
+        headers = {"Idempotency-Key": "retry-1"}
+
+        with test_client:
+            first = test_client.post("/create_alarm", json=body, headers=headers)
+            retry = test_client.post("/create_alarm", json=body, headers=headers)
+            reused = test_client.post(
+                "/create_alarm", json={"input": "Something else"}, headers=headers
+            )
+            stats = test_client.get("/stats").json()
+
+        assert first.status_code == retry.status_code == status.HTTP_201_CREATED
+        assert first.json() == retry.json()
+        assert "Idempotent-Replayed" not in first.headers
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert reused.status_code == 422
+        mock_calendar_alarm_service.return_value.run.assert_called_once()
+        mock_google_calendar_service.assert_called_once()
+        assert stats["idempotency"]["replays"] == 1
+
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarServiceScript")
+    def test_create_alarm_idempotency_replay_skips_calendar_rate_limit(
+        self,
+        mock_google_calendar_service,
+        mock_calendar_alarm_service,
+        test_client,
+        sample_google_calendar_info_input,
+        rate_limits,
+    ):
+        """Test that a replay succeeds while the calendar bucket is empty, and takes no token."""
+        _, calendar = rate_limits
+        mock_calendar_alarm_service.return_value.run.return_value = (
+            sample_google_calendar_info_input
+        )
+        mock_google_calendar_service.return_value = GoogleCalendarResponse(
+            success="Event created successfully",
+        )
+        body = {"input": "Remind me to buy groceries at 5pm"}
+        headers = {"Idempotency-Key": "retry-3", "X-Client-Id": "retrying"}
+
+        with test_client:
+            first = test_client.post("/create_alarm", json=body, headers=headers)
+            calendar.acquire("id:retrying")
+            retry = test_client.post("/create_alarm", json=body, headers=headers)
+            fresh = test_client.post(
+                "/create_alarm",
+                json={"input": "Something else"},
+                headers={"X-Client-Id": "retrying"},
+            )
+
+        assert first.status_code == retry.status_code == status.HTTP_201_CREATED
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert fresh.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        mock_google_calendar_service.assert_called_once()
+
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarServiceScript")
+    def test_create_alarm_idempotency_key_retries_errors(
+        self,
+        mock_google_calendar_service,
+        mock_calendar_alarm_service,
+        test_client,
+        sample_google_calendar_info_input,
+    ):
+        """Test that a response that created no event is not replayed."""
+        mock_calendar_alarm_service.return_value.run.return_value = (
+            sample_google_calendar_info_input
+        )
+        mock_google_calendar_service.return_value = GoogleCalendarResponse(
+            error="Could not create event",
+        )
+        body = {"input": "Remind me to buy groceries at 5pm"}
+        headers = {"Idempotency-Key": "retry-2"}
+
+        with test_client:
+            test_client.post("/create_alarm", json=body, headers=headers)
+            retry = test_client.post("/create_alarm", json=body, headers=headers)
+
+        assert "Idempotent-Replayed" not in retry.headers
+        assert mock_google_calendar_service.call_count == 2
+
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarServiceScript")
+    def test_create_alarm_async_job_mode(
+        self,
+        mock_google_calendar_service,
+        mock_calendar_alarm_service,
+        test_client,
+        sample_google_calendar_info_input,
+        tmp_path,
+    ):
+        """Test that async job mode answers 202 with a job id whose result can be polled."""
+        mock_calendar_alarm_service.return_value.run.return_value = (
+            sample_google_calendar_info_input
+        )
+        mock_google_calendar_service.return_value = GoogleCalendarResponse(
+            success="Event created successfully",
+        )
+
+        with patch("calarmhelp.main.JOB_MODE", "async"), patch(
+            "calarmhelp.main.JOB_QUEUE_PATH", str(tmp_path / "jobs.sqlite3")
+        ), test_client:
+            accepted = test_client.post(
+                "/create_alarm", json={"input": "Remind me to buy groceries at 5pm"}
+            )
+            job_id = accepted.json()["job_id"]
+
+            for _ in range(200):
+                job = test_client.get(f"/jobs/{job_id}").json()
+                if job["status"] == "succeeded":
+                    break
+                time.sleep(0.01)
+
+            missing = test_client.get("/jobs/unknown")
+            stats = test_client.get("/stats").json()
+
+        assert accepted.status_code == status.HTTP_202_ACCEPTED
+        assert accepted.json()["status_url"] == f"/jobs/{job_id}"
+        assert job["status"] == "succeeded"
+        assert job["result"]["response"] == sample_google_calendar_info_input.response
+        assert missing.status_code == status.HTTP_404_NOT_FOUND
+        assert stats["jobs"]["succeeded"] == 1
+
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarServiceScript")
+    def test_async_job_applies_llm_rate_limit(
+        self,
+        mock_google_calendar_service,
+        mock_calendar_alarm_service,
+        test_client,
+        rate_limits,
+        tmp_path,
+    ):
+        """Test that a queued job of a client over its LLM limit waits instead of calling the LLM."""
+        llm, _ = rate_limits
+        llm.acquire("id:noisy")
+
+        with patch("calarmhelp.main.JOB_MODE", "async"), patch(
+            "calarmhelp.main.JOB_QUEUE_PATH", str(tmp_path / "jobs.sqlite3")
+        ), test_client:
+            accepted = test_client.post(
+                "/create_alarm",
+                json={"input": "Remind me to buy groceries at 5pm"},
+                headers={"X-Client-Id": "noisy"},
+            )
+            job_id = accepted.json()["job_id"]
+
+            for _ in range(200):
+                job = test_client.get(f"/jobs/{job_id}").json()
+                if job["error"]:
+                    break
+                time.sleep(0.01)
+
+        assert accepted.status_code == status.HTTP_202_ACCEPTED
+        assert job["status"] == "queued"
+        assert "Rate limit for llm exceeded" in job["error"]
+        mock_calendar_alarm_service.return_value.run.assert_not_called()
+        mock_google_calendar_service.assert_not_called()
+
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarBatchServiceScript")
+    def test_create_alarms_per_item_results(
+        self,
+        mock_google_calendar_batch_service,
+        mock_calendar_alarm_service,
+        test_client,
+        sample_google_calendar_info_input,
+    ):
+        """Test that one failing input does not fail the rest of the batch."""
+
+        def run(input):
+            if input == "Invalid input":
+                return GoogleCalendarResponse(error="Failed to parse input")
+            if input == "Explodes":
+                raise RuntimeError("LLM unavailable")
+            return sample_google_calendar_info_input
+
+        mock_calendar_alarm_service.return_value.run.side_effect = run
+        mock_google_calendar_batch_service.return_value = [
+            GoogleCalendarResponse(success="Event Created"),
+            GoogleCalendarResponse(error="Rate Limit Exceeded"),
+        ]
+
+        with test_client:
+            response = test_client.post(
+                "/create_alarms",
+                json={
+                    "inputs": [
+                        "Buy groceries at 5pm",
+                        "Invalid input",
+                        "Explodes",
+                        "Call mom at 6pm",
+                    ]
+                },
+            )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        results = response.json()["results"]
+        assert len(results) == 4
+        assert results[0]["response"] == "Test response"
+        assert results[1]["error"] == "Failed to parse input"
+        assert "LLM unavailable" in results[2]["error"]
+        assert results[3]["error"] == "Rate Limit Exceeded"
+
+        # Both valid extractions went to Google in a single batch call
+        mock_google_calendar_batch_service.assert_called_once()
+        assert len(mock_google_calendar_batch_service.call_args.args[0]) == 2
+
+    def test_create_alarms_rejects_empty_batch(self, test_client):
+        """Test that an empty list of inputs is rejected."""
+        response = test_client.post("/create_alarms", json={"inputs": []})
+
+        assert response.status_code == 422
+
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    @patch("calarmhelp.main.GoogleCalendarServiceScript")
+    def test_create_alarm_stream_emits_stages_in_order(
+        self,
+        mock_google_calendar_service,
+        mock_calendar_alarm_service,
+        test_client,
+        sample_google_calendar_info_input,
+    ):
+        """Test that the SSE endpoint streams every stage before the final body."""
+        pipeline = mock_calendar_alarm_service.return_value
+        listeners = []
+        pipeline.set_validation_listener.side_effect = listeners.append
+
+        def run(input):
+            listeners[-1](1, False)
+            listeners[-1](2, True)
+            return sample_google_calendar_info_input
+
+        pipeline.run.side_effect = run
+        mock_google_calendar_service.return_value = GoogleCalendarResponse(
+            success="Event Created",
+        )
+
+        with test_client:
+            response = test_client.post(
+                "/create_alarm/stream",
+                json={"input": "Remind me to buy groceries at 5pm"},
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = parse_sse(response.text)
+        assert [event for event, _ in events] == [
+            "extraction_started",
+            "validation_loop",
+            "validation_loop",
+            "parsed",
+            "calendar_written",
+            "done",
+        ]
+        assert events[1][1] == {"loop": 1, "done": False}
+        assert events[3][1]["response"] == "Test response"
+        assert events[4][1]["success"] == "Event Created"
+        assert events[5][1] == events[3][1]
+
+        # The listener is cleared before the pipeline goes back to the pool
+        assert listeners[-1] is None
+
+    @patch("calarmhelp.main.CalendarAlarmServicePipeline")
+    def test_create_alarm_stream_reports_errors(
+        self, mock_calendar_alarm_service, test_client
+    ):
+        """Test that a failing extraction ends the stream with an error event."""
+        mock_calendar_alarm_service.return_value.run.side_effect = RuntimeError(
+            "LLM unavailable"
+        )
+
+        with test_client:
+            response = test_client.post(
+                "/create_alarm/stream", json={"input": "Invalid input"}
+            )
+
+        events = parse_sse(response.text)
+        assert events[0][0] == "extraction_started"
+        assert events[-1][0] == "error"
+        assert "LLM unavailable" in events[-1][1]["error"]
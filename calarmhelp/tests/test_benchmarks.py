@@ -0,0 +1,68 @@
+"""Tests for the micro-benchmark runner."""
+
+import json
+
+from calarmhelp.benchmarks.runner import (
+    Benchmark,
+    compare_results,
+    main,
+    run_benchmarks,
+)
+
+
+class TestBenchmarkRunner:
+    """Tests for the benchmark runner."""
+
+    def test_run_benchmarks_reports_time_per_call(self):
+        """Test that every benchmark gets a result with the scaled iteration count."""
+        calls = []
+        bench = Benchmark("append", lambda: lambda: calls.append(1), iterations=100)
+
+        results = run_benchmarks([bench], repeat=2, scale=0.5, log=lambda line: None)
+
+        result = results["benchmarks"]["append"]
+        assert result["iterations"] == 50
+        assert result["repeat"] == 2
+        assert 0 < result["best_us"] <= result["median_us"]
+        assert result["peak_alloc_bytes"] >= 0
+        # One warm-up call, the timed repeats, and one call traced for allocations
+        assert len(calls) == 102
+
+    def test_compare_results_flags_slowdowns(self):
+        """Test that only benchmarks slower than the threshold are reported."""
+        baseline = {
+            "benchmarks": {"fast": {"median_us": 1.0}, "slow": {"median_us": 1.0}}
+        }
+        current = {
+            "benchmarks": {
+                "fast": {"median_us": 1.1},
+                "slow": {"median_us": 1.5},
+                "new": {"median_us": 9.0},
+            }
+        }
+
+        regressions = compare_results(current, baseline, threshold=0.2)
+
+        assert len(regressions) == 1
+        assert regressions[0].startswith("slow:")
+
+    def test_main_writes_results(self, tmp_path):
+        """Test that the command line writes machine-readable results."""
+        output = tmp_path / "results.json"
+
+        exit_code = main(
+            [
+                "--output",
+                str(output),
+                "--filter",
+                "clean_json_output",
+                "--scale",
+                "0.001",
+                "--repeat",
+                "1",
+            ]
+        )
+
+        results = json.loads(output.read_text())
+        assert exit_code == 0
+        assert list(results["benchmarks"]) == ["clean_json_output"]
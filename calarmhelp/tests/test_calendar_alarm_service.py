@@ -1,17 +1,32 @@
 """Tests for Calendar Alarm Service."""
 
+import asyncio
 import os
 import pytest
 from unittest.mock import patch, MagicMock
-from datetime import datetime
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 
+from haystack.components.builders import PromptBuilder
+
+from calarmhelp.fakes.openAIServer import PromptCacheSimulator
 from calarmhelp.services.calendarAlarmService import (
     create_alarm_readout,
+    create_response_format,
+    escalation_reason,
+    load_prompt_template,
+    prompt_token_usage,
+    CalendarAlarmPipelinePool,
     CalendarAlarmServicePipeline,
+    LLMCallStats,
+    ModelLadderGenerator,
+    ModelTierStats,
 )
 from calarmhelp.services.util.util import (
     CalendarAlarmResponse,
     Category,
+    GoogleCalendarInfoInput,
+    GoogleCalendarResponse,
 )
 
 
@@ -86,3 +101,479 @@ class TestCalendarAlarmService:
 
                 # Verify mock was called
                 mock_run.assert_called_once_with("Remind me to buy groceries at 5pm")
+
+    @patch(
+        "calarmhelp.services.calendarAlarmService.langfuse_configured",
+        return_value=True,
+    )
+    @patch("calarmhelp.services.calendarAlarmService.OpenAIGenerator")
+    @patch("calarmhelp.services.calendarAlarmService.Pipeline")
+    def test_pipeline_is_connected_once(
+        self, mock_pipeline, mock_openai_generator, mock_langfuse_configured
+    ):
+        """Test that components are wired at construction, not on every run."""
+        mock_pipeline_instance = MagicMock()
+        mock_pipeline.return_value = mock_pipeline_instance
+        mock_pipeline_instance.run.return_value = {"validator": {"json": "DONE{}"}}
+
+        with patch("calarmhelp.services.calendarAlarmService.PromptBuilder"):
+            with patch(
+                "calarmhelp.services.calendarAlarmService.trace_recorder"
+            ) as mock_trace_recorder:
+                service = CalendarAlarmServicePipeline(max_loops_allowed=10)
+                service.run("First input")
+                service.run("Second input")
+
+        assert mock_pipeline_instance.add_component.call_count == 3
+        assert mock_trace_recorder.record.call_count == 2
+        assert mock_pipeline_instance.connect.call_count == 5
+        assert mock_pipeline_instance.run.call_count == 2
+
+
+class TestPromptTemplate:
+    """Tests for the cache-friendly prompt layout."""
+
+    def _render(self, user_input, **kwargs):
+        builder = PromptBuilder(template=load_prompt_template())
+        return builder.run(
+            input={"user_input": user_input, "current_time": "2024-08-25T09:10:06"},
+            **kwargs,
+        )["prompt"]
+
+    def test_requests_share_the_static_prefix(self):
+        """Test that everything before the user input is identical across requests."""
+        first = self._render("Buy milk at 5PM")
+        second = self._render("Call mom tomorrow at noon")
+        validation = self._render(
+            "Buy milk at 5PM", properties_to_validate="{}", validation_errors="- x"
+        )
+
+        shared = os.path.commonprefix([first, second, validation])
+        assert len(shared) > 2000
+        assert "Buy milk" not in shared
+        assert "- x" in validation
+
+    def test_static_prefix_is_long_enough_to_cache(self):
+        """Test that the shared prefix passes OpenAI's 1024 token caching minimum."""
+        cache = PromptCacheSimulator()
+        cache.cached_tokens(self._render("Buy milk at 5PM"))
+
+        assert cache.cached_tokens(self._render("Call mom tomorrow at noon")) >= 1024
+
+    def test_prompt_token_usage(self):
+        """Test that prompt and cached tokens are summed over replies."""
+        meta = [
+            {"usage": {"prompt_tokens": 1100, "prompt_tokens_details": None}},
+            {
+                "usage": {
+                    "prompt_tokens": 1300,
+                    "prompt_tokens_details": MagicMock(cached_tokens=1024),
+                }
+            },
+            {"usage": {}},
+        ]
+
+        assert prompt_token_usage(meta) == (2400, 1024)
+
+
+class TestStructuredOutputMode:
+    """Tests for the schema-constrained extraction mode."""
+
+    def test_response_format_is_strict(self):
+        """Test that every property is required and no extra properties are allowed."""
+        response_format = create_response_format(CalendarAlarmResponse)
+        schema = response_format["json_schema"]["schema"]
+
+        assert response_format["type"] == "json_schema"
+        assert response_format["json_schema"]["strict"] is True
+        assert schema["additionalProperties"] is False
+        assert set(schema["required"]) == set(CalendarAlarmResponse.model_fields)
+        assert schema["properties"]["category"]["enum"] == ["always", "work", "home"]
+        assert "$ref" not in str(schema)
+        assert "default" not in str(schema)
+
+    @patch(
+        "calarmhelp.services.calendarAlarmService.langfuse_configured",
+        return_value=True,
+    )
+    @patch("calarmhelp.services.calendarAlarmService.OpenAIGenerator")
+    @patch("calarmhelp.services.calendarAlarmService.Pipeline")
+    def test_structured_mode_skips_validator(
+        self, mock_pipeline, mock_openai_generator, mock_langfuse_configured
+    ):
+        """Test that structured mode wires a single call and passes the response format."""
+        mock_pipeline_instance = MagicMock()
+        mock_pipeline.return_value = mock_pipeline_instance
+
+        with patch("calarmhelp.services.calendarAlarmService.PromptBuilder"):
+            with patch("calarmhelp.services.calendarAlarmService.trace_recorder"):
+                CalendarAlarmServicePipeline(mode="structured")
+
+        generation_kwargs = mock_openai_generator.call_args.kwargs["generation_kwargs"]
+        assert generation_kwargs["response_format"]["type"] == "json_schema"
+        assert mock_pipeline_instance.add_component.call_count == 2
+        assert mock_pipeline_instance.connect.call_count == 1
+
+    @patch("calarmhelp.services.calendarAlarmService.OpenAIGenerator")
+    @patch("calarmhelp.services.calendarAlarmService.Pipeline")
+    def test_structured_mode_parses_generator_reply(
+        self, mock_pipeline, mock_openai_generator
+    ):
+        """Test that the generator reply is parsed directly and counted as one call."""
+        sample_date = datetime.now()
+        reply = CalendarAlarmResponse(
+            name="Test Event",
+            category=Category.HOME,
+            lead_time=10,
+            event_time=sample_date + timedelta(hours=1),
+            event_time_end=sample_date + timedelta(hours=2),
+            location=None,
+            error=False,
+            current_time=sample_date,
+        ).model_dump_json()
+        mock_pipeline.return_value.run.return_value = {
+            "generator": {
+                "replies": [reply],
+                "meta": [
+                    {
+                        "usage": {
+                            "prompt_tokens": 1200,
+                            "prompt_tokens_details": {"cached_tokens": 1024},
+                        }
+                    }
+                ],
+            },
+        }
+        listener = MagicMock()
+        stats = LLMCallStats()
+
+        with patch("calarmhelp.services.calendarAlarmService.PromptBuilder"):
+            with patch("calarmhelp.services.calendarAlarmService.trace_recorder"):
+                with patch(
+                    "calarmhelp.services.calendarAlarmService.llm_call_stats", stats
+                ):
+                    service = CalendarAlarmServicePipeline(mode="structured")
+                    service.set_validation_listener(listener)
+                    result = service.run("Test Event at 5PM")
+
+        assert isinstance(result, GoogleCalendarInfoInput)
+        assert result.jsonResponse.name == "Test Event"
+        listener.assert_called_once_with(1, True)
+        structured = stats.stats()["structured"]
+        assert structured["alarms"] == 1
+        assert structured["llm_calls_per_alarm"] == 1.0
+        assert structured["prompt_tokens_per_alarm"] == 1200
+        assert structured["cached_prompt_tokens"] == 1024
+
+    @patch("calarmhelp.services.calendarAlarmService.OpenAIGenerator")
+    @patch("calarmhelp.services.calendarAlarmService.Pipeline")
+    def test_structured_mode_rejects_invalid_times(
+        self, mock_pipeline, mock_openai_generator
+    ):
+        """Test that a schema-valid reply with an event in the past becomes an error response."""
+        sample_date = datetime.now()
+        reply = CalendarAlarmResponse(
+            name="Test Event",
+            category=Category.HOME,
+            lead_time=10,
+            event_time=sample_date - timedelta(days=1),
+            event_time_end=sample_date - timedelta(days=1, minutes=-30),
+            location=None,
+            error=False,
+            current_time=sample_date,
+        ).model_dump_json()
+        mock_pipeline.return_value.run.return_value = {
+            "generator": {"replies": [reply], "meta": []},
+        }
+
+        with patch("calarmhelp.services.calendarAlarmService.PromptBuilder"):
+            with patch("calarmhelp.services.calendarAlarmService.trace_recorder"):
+                result = CalendarAlarmServicePipeline(mode="structured").run(
+                    "Test Event yesterday at 5PM"
+                )
+
+        assert isinstance(result, GoogleCalendarResponse)
+        assert "is in the past" in result.error
+
+    @patch("calarmhelp.services.calendarAlarmService.OpenAIGenerator")
+    @patch("calarmhelp.services.calendarAlarmService.Pipeline")
+    def test_prompt_current_time_is_in_new_york(
+        self, mock_pipeline, mock_openai_generator
+    ):
+        """Test that the prompt gets the current time with its New York offset."""
+        mock_pipeline.return_value.run.return_value = {"validator": {"json": "DONE{}"}}
+
+        with patch("calarmhelp.services.calendarAlarmService.PromptBuilder"):
+            with patch("calarmhelp.services.calendarAlarmService.trace_recorder"):
+                CalendarAlarmServicePipeline().run("Test Event at 5PM")
+
+        data = mock_pipeline.return_value.run.call_args.kwargs["data"]
+        current_time = datetime.fromisoformat(
+            data["prompt_builder"]["input"]["current_time"]
+        )
+        assert (
+            current_time.utcoffset()
+            == current_time.astimezone(ZoneInfo("America/New_York")).utcoffset()
+        )
+
+    def test_invalid_mode(self):
+        """Test that an unknown extraction mode is rejected."""
+        with pytest.raises(ValueError):
+            CalendarAlarmServicePipeline(mode="guess")
+
+    def test_llm_call_stats_average(self):
+        """Test that calls per alarm are averaged per mode."""
+        stats = LLMCallStats()
+        stats.record("loop", 2)
+        stats.record("loop", 4)
+
+        assert stats.stats()["loop"]["llm_calls_per_alarm"] == 3.0
+        assert stats.stats()["structured"]["alarms"] == 0
+
+        stats.reset()
+        assert stats.stats()["loop"]["alarms"] == 0
+
+    @patch.dict(os.environ, {"LANGFUSE_PUBLIC_KEY": "", "LANGFUSE_SECRET_KEY": ""})
+    @patch("calarmhelp.services.calendarAlarmService.OpenAIGenerator")
+    @patch("calarmhelp.services.calendarAlarmService.Pipeline")
+    def test_tracer_skipped_without_langfuse_keys(
+        self, mock_pipeline, mock_openai_generator
+    ):
+        """Test that runs are not traced when Langfuse is not configured."""
+        mock_pipeline.return_value.run.return_value = {"validator": {"json": "DONE{}"}}
+
+        with patch(
+            "calarmhelp.services.calendarAlarmService.trace_recorder"
+        ) as mock_trace_recorder:
+            CalendarAlarmServicePipeline().run("Test input")
+
+        mock_trace_recorder.record.assert_not_called()
+        added = [
+            call.args[0]
+            for call in mock_pipeline.return_value.add_component.call_args_list
+        ]
+        assert added == ["prompt_builder", "generator", "validator"]
+
+
+def ladder_reply(error: bool = False) -> str:
+    """A reply for an event an hour from now that passes the local checks."""
+    start = datetime.now() + timedelta(hours=1)
+    return CalendarAlarmResponse(
+        name="Test Event",
+        lead_time=10,
+        event_time=start,
+        event_time_end=start + timedelta(minutes=30),
+        error=error,
+        current_time=datetime.now(),
+    ).model_dump_json()
+
+
+def ladder_tier(*replies: str, finish_reason: str = "stop") -> MagicMock:
+    """A generator returning the given replies, one per call."""
+    generator = MagicMock()
+    generator.run.side_effect = [
+        {"replies": [reply], "meta": [{"finish_reason": finish_reason}]}
+        for reply in replies
+    ]
+    return generator
+
+
+class TestModelLadderGenerator:
+    """Tests for ModelLadderGenerator and escalation_reason."""
+
+    def test_escalation_reason(self):
+        """Test that invalid, truncated and self-flagged replies are escalated."""
+        ok = [{"finish_reason": "stop"}]
+
+        assert escalation_reason([ladder_reply()], ok) is None
+        assert escalation_reason(["not json"], ok) == "invalid"
+        assert escalation_reason([ladder_reply(error=True)], ok) == "flagged"
+        assert (
+            escalation_reason([ladder_reply()], [{"finish_reason": "length"}])
+            == "truncated"
+        )
+
+    def test_cheap_model_reply_is_kept(self):
+        """Test that the larger model is not called when the cheap model's reply passes."""
+        small, large = ladder_tier(ladder_reply()), ladder_tier()
+        stats = ModelTierStats()
+        router = ModelLadderGenerator([("small", small), ("large", large)], stats)
+
+        result = router.run(prompt="prompt")
+
+        assert escalation_reason(result["replies"], result["meta"]) is None
+        large.run.assert_not_called()
+        assert router.escalations == 0
+        assert stats.stats()["small"]["success_rate"] == 1.0
+
+    def test_invalid_reply_escalates_and_stays_escalated(self):
+        """Test that a failed reply moves the run up the ladder until `reset`."""
+        small = ladder_tier("not json", ladder_reply())
+        large = ladder_tier(ladder_reply(), "still not json")
+        stats = ModelTierStats()
+        router = ModelLadderGenerator([("small", small), ("large", large)], stats)
+
+        first = router.run(prompt="prompt")
+        second = router.run(prompt="prompt with feedback")
+
+        assert escalation_reason(first["replies"], first["meta"]) is None
+        assert len(first["meta"]) == 2
+        assert second["replies"] == ["still not json"]
+        assert small.run.call_count == 1
+        assert (router.tier, router.escalations) == (1, 1)
+        assert router.rejected == "invalid"
+
+        router.reset()
+        assert router.rejected is None
+        router.run(prompt="next request")
+        assert small.run.call_count == 2
+
+        tiers = stats.stats()
+        assert tiers["small"]["escalated"] == 1
+        assert tiers["small"]["accepted"] == 1
+        assert tiers["large"]["accepted"] == 1
+        assert tiers["large"]["rejected"] == 1
+        assert tiers["large"]["success_rate"] == 0.5
+
+    def test_errors_are_recorded_and_raised(self):
+        """Test that a call that fails after its retries counts as an error for its model."""
+        small = MagicMock()
+        small.run.side_effect = RuntimeError("down")
+        stats = ModelTierStats()
+        router = ModelLadderGenerator([("small", small)], stats)
+
+        with pytest.raises(RuntimeError):
+            router.run(prompt="prompt")
+
+        assert stats.stats()["small"]["error"] == 1
+
+    @patch("calarmhelp.services.calendarAlarmService.OpenAIGenerator")
+    @patch("calarmhelp.services.calendarAlarmService.Pipeline")
+    def test_pipeline_builds_one_generator_per_model(
+        self, mock_pipeline, mock_openai_generator
+    ):
+        """Test that the pipeline builds a generator for each model of the ladder, in order."""
+        CalendarAlarmServicePipeline(models=["small", "large"])
+
+        models = [call.kwargs["model"] for call in mock_openai_generator.call_args_list]
+        assert models == ["small", "large"]
+
+    @patch("calarmhelp.services.calendarAlarmService.OpenAIGenerator")
+    @patch("calarmhelp.services.calendarAlarmService.Pipeline")
+    def test_run_rejected_by_every_model_is_an_error(
+        self, mock_pipeline, mock_openai_generator
+    ):
+        """Test that a run whose last reply every model failed returns an error response."""
+        with patch("calarmhelp.services.calendarAlarmService.PromptBuilder"):
+            with patch("calarmhelp.services.calendarAlarmService.trace_recorder"):
+                service = CalendarAlarmServicePipeline(mode="structured")
+
+                def run(data):
+                    service._router.rejected = "flagged"
+                    return {
+                        "generator": {"replies": [ladder_reply(error=True)], "meta": []}
+                    }
+
+                mock_pipeline.return_value.run.side_effect = run
+                result = service.run("hello there")
+
+        assert isinstance(result, GoogleCalendarResponse)
+        assert "flagged" in result.error
+
+
+class TestCalendarAlarmPipelinePool:
+    """Tests for CalendarAlarmPipelinePool."""
+
+    def test_start_builds_warm_instances(self):
+        """Test that start builds the warm instances up front."""
+        factory = MagicMock(side_effect=lambda: MagicMock())
+        pool = CalendarAlarmPipelinePool(factory=factory, size=4, warm=2)
+
+        asyncio.run(pool.start())
+
+        assert factory.call_count == 2
+        assert pool.created == 2
+
+    def test_acquire_reuses_released_instance(self):
+        """Test that a released instance is handed to the next borrower."""
+        factory = MagicMock(side_effect=lambda: MagicMock())
+        pool = CalendarAlarmPipelinePool(factory=factory, size=4, warm=1)
+
+        async def main():
+            await pool.start()
+            async with pool.acquire() as first:
+                pass
+            async with pool.acquire() as second:
+                pass
+            return first, second
+
+        first, second = asyncio.run(main())
+
+        assert first is second
+        assert factory.call_count == 1
+
+    def test_acquire_is_bounded_by_size(self):
+        """Test that concurrent borrowers never build more than size instances."""
+        factory = MagicMock(side_effect=lambda: MagicMock())
+        pool = CalendarAlarmPipelinePool(factory=factory, size=2, warm=0)
+        in_use = set()
+        peak = 0
+
+        async def borrow():
+            nonlocal peak
+            async with pool.acquire() as pipeline:
+                assert pipeline not in in_use
+                in_use.add(pipeline)
+                peak = max(peak, len(in_use))
+                await asyncio.sleep(0.01)
+                in_use.discard(pipeline)
+
+        async def main():
+            await asyncio.gather(*(borrow() for _ in range(8)))
+
+        asyncio.run(main())
+
+        assert factory.call_count == 2
+        assert peak == 2
+
+    def test_failed_build_releases_slot(self):
+        """Test that a failing factory does not use up pool capacity."""
+        factory = MagicMock(side_effect=[RuntimeError("boom"), MagicMock()])
+        pool = CalendarAlarmPipelinePool(factory=factory, size=1, warm=0)
+
+        async def main():
+            with pytest.raises(RuntimeError):
+                async with pool.acquire():
+                    pass
+            async with pool.acquire() as pipeline:
+                return pipeline
+
+        assert asyncio.run(main()) is not None
+        assert pool.created == 1
+
+    def test_failed_build_wakes_waiting_borrowers(self):
+        """Test that borrowers waiting for a slot build their own when the first build fails."""
+        factory = MagicMock(side_effect=[RuntimeError("boom"), MagicMock()])
+        pool = CalendarAlarmPipelinePool(factory=factory, size=1, warm=0)
+
+        async def borrow():
+            async with pool.acquire() as pipeline:
+                await asyncio.sleep(0.01)
+                return pipeline
+
+        async def main():
+            return await asyncio.wait_for(
+                asyncio.gather(*(borrow() for _ in range(3)), return_exceptions=True),
+                timeout=5,
+            )
+
+        first, second, third = asyncio.run(main())
+
+        assert isinstance(first, RuntimeError)
+        assert second is third is not None
+        assert pool.created == 1
+
+    def test_invalid_size(self):
+        """Test that a pool must hold at least one instance."""
+        with pytest.raises(ValueError):
+            CalendarAlarmPipelinePool(factory=MagicMock(), size=0)
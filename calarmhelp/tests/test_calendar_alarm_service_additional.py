@@ -4,11 +4,14 @@ import os
 import json
 import pytest
 from unittest.mock import patch, MagicMock
-from datetime import datetime
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 
 from calarmhelp.services.calendarAlarmService import (
     create_alarm_readout,
     CalendarAlarmServicePipeline,
+    JSONValidator,
+    check_alarm_reply,
 )
 from calarmhelp.services.util.util import (
     CalendarAlarmResponse,
@@ -60,9 +63,7 @@ class TestCalendarAlarmServiceAdditional:
             return_value=mock_pipeline_instance,
         ):
             with patch("calarmhelp.services.calendarAlarmService.JSONValidator"):
-                with patch(
-                    "calarmhelp.services.calendarAlarmService.LangfuseConnector"
-                ):
+                with patch("calarmhelp.services.calendarAlarmService.trace_recorder"):
                     # Create service with init parameters
                     service = CalendarAlarmServicePipeline(max_loops_allowed=10)
 
@@ -74,10 +75,14 @@ class TestCalendarAlarmServiceAdditional:
         assert result.error is not None
         assert "Error in Google Calendar Service" in result.error
 
+    @patch(
+        "calarmhelp.services.calendarAlarmService.langfuse_configured",
+        return_value=True,
+    )
     @patch("calarmhelp.services.calendarAlarmService.OpenAIGenerator")
     @patch("calarmhelp.services.calendarAlarmService.Pipeline")
     def test_pipeline_creation_and_connections(
-        self, mock_pipeline, mock_openai_generator
+        self, mock_pipeline, mock_openai_generator, mock_langfuse_configured
     ):
         """Test pipeline creation and component connections."""
         # Create mock pipeline
@@ -87,9 +92,7 @@ class TestCalendarAlarmServiceAdditional:
         # Create service
         with patch("calarmhelp.services.calendarAlarmService.PromptBuilder"):
             with patch("calarmhelp.services.calendarAlarmService.JSONValidator"):
-                with patch(
-                    "calarmhelp.services.calendarAlarmService.LangfuseConnector"
-                ):
+                with patch("calarmhelp.services.calendarAlarmService.trace_recorder"):
                     service = CalendarAlarmServicePipeline(max_loops_allowed=15)
 
                     # Call run to trigger pipeline setup
@@ -100,11 +103,11 @@ class TestCalendarAlarmServiceAdditional:
 
         # Verify pipeline components were added and connected
         assert (
-            mock_pipeline_instance.add_component.call_count == 4
-        )  # prompt_builder, generator, validator, tracer
+            mock_pipeline_instance.add_component.call_count == 3
+        )  # prompt_builder, generator, validator
         assert (
-            mock_pipeline_instance.connect.call_count == 3
-        )  # Three connections in the pipeline
+            mock_pipeline_instance.connect.call_count == 5
+        )  # Five connections, two of them feeding validation back to the prompt
 
     @patch("calarmhelp.services.calendarAlarmService.OpenAIGenerator")
     @patch("calarmhelp.services.calendarAlarmService.PromptBuilder")
@@ -134,7 +137,6 @@ class TestCalendarAlarmServiceAdditional:
         mock_pipeline_instance = MagicMock()
         mock_pipeline_instance.run.return_value = {
             "validator": {"json": f"DONE{json_response}"},
-            "tracer": {"trace_url": "https://example.com/trace/123"},
         }
 
         # Set up the pipeline's instance attributes
@@ -149,9 +151,7 @@ class TestCalendarAlarmServiceAdditional:
             return_value=mock_pipeline_instance,
         ):
             with patch("calarmhelp.services.calendarAlarmService.JSONValidator"):
-                with patch(
-                    "calarmhelp.services.calendarAlarmService.LangfuseConnector"
-                ):
+                with patch("calarmhelp.services.calendarAlarmService.trace_recorder"):
                     # Create service
                     service = CalendarAlarmServicePipeline(max_loops_allowed=10)
 
@@ -164,3 +164,87 @@ class TestCalendarAlarmServiceAdditional:
         assert "Test event" in result.response
         assert result.jsonResponse.name == "Test Event"
         assert result.jsonResponse.category == Category.HOME
+
+    def test_json_validator_reports_each_loop(self):
+        """Test that the validator counts loops and notifies its listener."""
+        validator = JSONValidator()
+        seen = []
+        validator.listener = lambda loop, done: seen.append((loop, done))
+
+        result = validator.run(['DONE{"name": "Test Event"}'])
+        assert result["properties_to_validate"] == 'DONE{"name": "Test Event"}'
+        assert "lead_time: Field required" in result["validation_errors"]
+
+        assert "json" in validator.run([self._reply()])
+
+        assert validator.loops == 2
+        assert seen == [(1, False), (2, True)]
+
+    @staticmethod
+    def _reply(
+        start_offset=timedelta(hours=1),
+        duration=timedelta(minutes=30),
+        recurrence=None,
+    ):
+        now = datetime.now(ZoneInfo("America/New_York"))
+        return CalendarAlarmResponse(
+            name="Test Event",
+            category=Category.HOME,
+            lead_time=10,
+            event_time=now + start_offset,
+            event_time_end=now + start_offset + duration,
+            location=None,
+            recurrence=recurrence,
+            error=False,
+            current_time=now,
+        ).model_dump_json()
+
+    def test_first_valid_reply_is_accepted(self):
+        """Test that a valid reply ends the loop without waiting for DONE."""
+        validator = JSONValidator()
+
+        result = validator.run([f"```json\n{self._reply()}\n```"])
+
+        assert CalendarAlarmResponse.model_validate_json(result["json"]).name == (
+            "Test Event"
+        )
+        assert "properties_to_validate" not in result
+
+    def test_check_alarm_reply_rejects_past_event(self):
+        """Test that an event starting in the past is reported."""
+        alarm, errors = check_alarm_reply(self._reply(start_offset=-timedelta(hours=2)))
+
+        assert alarm is not None
+        assert len(errors) == 1
+        assert "is in the past" in errors[0]
+
+    def test_check_alarm_reply_rejects_end_before_start(self):
+        """Test that an event ending before it starts is reported."""
+        _, errors = check_alarm_reply(self._reply(duration=-timedelta(minutes=5)))
+
+        assert len(errors) == 1
+        assert "must be after event_time" in errors[0]
+
+    def test_check_alarm_reply_rejects_recurrence_skipping_first_day(self):
+        """Test that a weekly rule must include the day the event starts on."""
+        start = datetime.now(ZoneInfo("America/New_York")) + timedelta(hours=1)
+        today = start.strftime("%a")[:2].upper()
+        other = "TU" if today == "MO" else "MO"
+
+        _, errors = check_alarm_reply(
+            self._reply(recurrence=f"FREQ=WEEKLY;BYDAY={other}")
+        )
+        _, no_errors = check_alarm_reply(
+            self._reply(recurrence=f"FREQ=WEEKLY;BYDAY={other},{today}")
+        )
+
+        assert len(errors) == 1
+        assert "does not include it" in errors[0]
+        assert no_errors == []
+
+    def test_check_alarm_reply_reports_invalid_json(self):
+        """Test that unparseable replies come back as errors, not exceptions."""
+        alarm, errors = check_alarm_reply("not json")
+
+        assert alarm is None
+        assert errors
@@ -0,0 +1,53 @@
+"""Tests for the blocking-call worker pool."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from calarmhelp.services.concurrency import run_blocking
+
+
+class TestRunBlocking:
+    """Tests for run_blocking."""
+
+    def test_run_blocking_returns_result(self):
+        """Test that arguments are forwarded and the result is returned."""
+
+        def add(a, b, scale=1):
+            return (a + b) * scale
+
+        result = asyncio.run(run_blocking(add, 1, 2, scale=10))
+        assert result == 30
+
+    def test_run_blocking_runs_off_the_event_loop(self):
+        """Test that the callable does not run on the event loop thread."""
+
+        async def main():
+            loop_thread = threading.get_ident()
+            worker_thread = await run_blocking(threading.get_ident)
+            return loop_thread, worker_thread
+
+        loop_thread, worker_thread = asyncio.run(main())
+        assert loop_thread != worker_thread
+
+    def test_run_blocking_calls_overlap(self):
+        """Test that several blocking calls are in flight at the same time."""
+
+        async def main():
+            start = time.perf_counter()
+            await asyncio.gather(*(run_blocking(time.sleep, 0.2) for _ in range(5)))
+            return time.perf_counter() - start
+
+        elapsed = asyncio.run(main())
+        assert elapsed < 0.2 * 5
+
+    def test_run_blocking_propagates_exceptions(self):
+        """Test that exceptions raised by the callable reach the caller."""
+
+        def boom():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            asyncio.run(run_blocking(boom))
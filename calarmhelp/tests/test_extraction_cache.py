@@ -0,0 +1,146 @@
+"""Tests for the extraction result cache."""
+
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from calarmhelp.services.extractionCache import ExtractionCache, normalize_input
+from calarmhelp.services.util.util import (
+    CalendarAlarmResponse,
+    Category,
+    GoogleCalendarInfoInput,
+)
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def _extraction(event_time: datetime, now: datetime) -> GoogleCalendarInfoInput:
+    return GoogleCalendarInfoInput(
+        response="Buy groceries @ 5:00 PM on Sunday August 25 #always [30m]",
+        theJson=CalendarAlarmResponse(
+            name="Buy groceries",
+            category=Category.ALWAYS,
+            lead_time=30,
+            event_time=event_time,
+            event_time_end=event_time + timedelta(minutes=30),
+            current_time=now,
+        ),
+    )
+
+
+@pytest.fixture
+def morning() -> datetime:
+    """Sunday 2024-08-25 at 9:10 AM in New York."""
+    return datetime(2024, 8, 25, 9, 10, tzinfo=NEW_YORK)
+
+
+@pytest.fixture
+def five_pm_today(morning) -> GoogleCalendarInfoInput:
+    """An extraction of 'at 5pm' made in the morning."""
+    return _extraction(morning.replace(hour=17, minute=0), morning)
+
+
+class TestNormalizeInput:
+    """Tests for normalize_input."""
+
+    def test_normalize_input(self):
+        """Test case, whitespace and trailing punctuation are ignored."""
+        assert normalize_input("  Buy   Groceries at 5PM. ") == "buy groceries at 5pm"
+
+
+class TestExtractionCache:
+    """Tests for ExtractionCache."""
+
+    def test_hit_updates_current_time(self, morning, five_pm_today):
+        """Test that a hit returns the cached event with the current time refreshed."""
+        cache = ExtractionCache()
+        cache.put("Buy groceries at 5pm", five_pm_today, morning)
+
+        later = morning + timedelta(hours=2)
+        hit = cache.get("buy groceries at 5PM", later)
+
+        assert hit.response == five_pm_today.response
+        assert hit.jsonResponse.event_time == five_pm_today.jsonResponse.event_time
+        assert hit.jsonResponse.current_time == later
+        assert cache.stats()["hits"] == 1
+
+    def test_miss_after_event_time_passed(self, morning, five_pm_today):
+        """Test that 'at 5pm' is not reused once 5pm has passed."""
+        cache = ExtractionCache()
+        cache.put("Buy groceries at 5pm", five_pm_today, morning)
+
+        assert cache.get("Buy groceries at 5pm", morning.replace(hour=18)) is None
+        assert cache.stats()["size"] == 0
+
+    def test_miss_on_another_day(self, morning):
+        """Test that an entry is not reused on a different date."""
+        cache = ExtractionCache()
+        tomorrow_event = _extraction(morning + timedelta(days=2), morning)
+        cache.put("Buy groceries at 5pm", tomorrow_event, morning)
+
+        assert cache.get("Buy groceries at 5pm", morning + timedelta(days=1)) is None
+
+    def test_ttl_expiry(self, morning, five_pm_today):
+        """Test that entries expire after the TTL."""
+        cache = ExtractionCache(ttl=0)
+        cache.put("Buy groceries at 5pm", five_pm_today, morning)
+
+        assert cache.get("Buy groceries at 5pm", morning) is None
+
+    def test_lru_eviction(self, morning, five_pm_today):
+        """Test that the least recently used entry is evicted when full."""
+        cache = ExtractionCache(maxsize=2)
+        cache.put("first", five_pm_today, morning)
+        cache.put("second", five_pm_today, morning)
+        cache.get("first", morning)
+        cache.put("third", five_pm_today, morning)
+
+        assert cache.get("second", morning) is None
+        assert cache.get("first", morning) is not None
+        assert cache.get("third", morning) is not None
+
+    def test_errors_are_not_cached(self, morning, five_pm_today):
+        """Test that extractions flagged as errors are never stored."""
+        cache = ExtractionCache()
+        five_pm_today.jsonResponse.error = True
+        cache.put("Buy groceries at 5pm", five_pm_today, morning)
+
+        assert cache.get("Buy groceries at 5pm", morning) is None
+
+    @pytest.mark.parametrize(
+        "user_input",
+        [
+            "Remind me in 20 minutes",
+            "Take the pizza out in half an hour",
+            "Call mom 2 hours from now",
+            "Call mom later",
+            "Dinner tonight",
+            "Lunch this afternoon",
+        ],
+    )
+    def test_inputs_relative_to_now_are_not_cached(
+        self, morning, five_pm_today, user_input
+    ):
+        """Test that inputs timed from the current time of day are never stored or looked up."""
+        cache = ExtractionCache()
+        cache.put(user_input, five_pm_today, morning)
+
+        assert cache.get(user_input, morning + timedelta(minutes=5)) is None
+        assert cache.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0, "size": 0}
+
+    def test_disabled(self, morning, five_pm_today):
+        """Test that a zero size disables the cache."""
+        cache = ExtractionCache(maxsize=0)
+        cache.put("Buy groceries at 5pm", five_pm_today, morning)
+
+        assert cache.get("Buy groceries at 5pm", morning) is None
+        assert cache.stats()["misses"] == 0
+
+    def test_naive_event_time(self, morning):
+        """Test that naive LLM datetimes are compared in New York time."""
+        cache = ExtractionCache()
+        naive = _extraction(datetime(2024, 8, 25, 17, 0), morning)
+        cache.put("Buy groceries at 5pm", naive, morning)
+
+        assert cache.get("Buy groceries at 5pm", morning) is not None
@@ -0,0 +1,139 @@
+"""Tests for the stand-in OpenAI and Google Calendar servers, over real HTTP."""
+
+import logging
+import os
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from calarmhelp.fakes.googleCalendarServer import create_calendar_app
+from calarmhelp.fakes.openAIServer import (
+    DEFAULT_REPLY,
+    PromptCacheSimulator,
+    create_openai_app,
+)
+from calarmhelp.fakes.server import BackgroundServer, FakeBehaviour
+from calarmhelp.services.calendarAlarmService import CalendarAlarmServicePipeline
+from calarmhelp.services.googleCalendarService import (
+    GoogleCalendarBatchServiceScript,
+    GoogleCalendarClient,
+    GoogleCalendarServiceScript,
+)
+from calarmhelp.services.util.util import GoogleCalendarInfoInput
+
+logger = logging.getLogger("test")
+
+
+@pytest.fixture
+def calendar_server():
+    """A fake Calendar API that only knows the `test-calendar-id` calendar."""
+    app = create_calendar_app(FakeBehaviour(), calendars={"test-calendar-id"})
+    with BackgroundServer(app) as server:
+        yield server, app
+
+
+@pytest.fixture
+def real_calendar_client(calendar_server):
+    """Point the real googleapiclient code at the fake Calendar API."""
+    server, _ = calendar_server
+    client = GoogleCalendarClient(logger)
+
+    with patch(
+        "calarmhelp.services.googleCalendarService.CALENDAR_ROOT_URL", f"{server.url}/"
+    ), patch(
+        "calarmhelp.services.googleCalendarService.calendar_id", "test-calendar-id"
+    ), patch(
+        "calarmhelp.services.googleCalendarService.google_calendar_client", client
+    ):
+        yield client
+
+
+class TestFakeBackends:
+    """Tests for the stand-in servers."""
+
+    def test_pipeline_against_fake_openai(self):
+        """Test that the real OpenAIGenerator loops until the fake's reply validates."""
+        app = create_openai_app(FakeBehaviour(), replies=["not json", DEFAULT_REPLY])
+
+        with BackgroundServer(app) as server, patch.dict(
+            os.environ, {"OPENAI_BASE_URL": f"{server.url}/v1"}
+        ):
+            service = CalendarAlarmServicePipeline(max_loops_allowed=10)
+            result = service.run("Respond to Tom at 5PM tomorrow")
+
+        assert isinstance(result, GoogleCalendarInfoInput)
+        assert result.jsonResponse.name == "Respond to Tom"
+        assert app.state.requests == 2
+
+    def test_insert_against_fake_calendar(
+        self, calendar_server, real_calendar_client, sample_google_calendar_info_input
+    ):
+        """Test that a single insert goes over HTTP and lands in the fake."""
+        _, app = calendar_server
+
+        response = GoogleCalendarServiceScript(
+            sample_google_calendar_info_input, logger
+        )
+
+        assert response["success"] == "Event Created"
+        assert len(app.state.events) == 1
+        assert app.state.events[0]["summary"] == "Test response"
+
+    def test_resent_insert_is_a_success(
+        self, calendar_server, real_calendar_client, sample_google_calendar_info_input
+    ):
+        """Test that an insert resent with an id that already landed gets 409, read as created."""
+        _, app = calendar_server
+
+        with patch("uuid.uuid4", return_value=uuid.UUID(int=1)):
+            first = GoogleCalendarServiceScript(
+                sample_google_calendar_info_input, logger
+            )
+            resent = GoogleCalendarServiceScript(
+                sample_google_calendar_info_input, logger
+            )
+
+        assert first["success"] == resent["success"] == "Event Created"
+        assert len(app.state.events) == 1
+        assert app.state.events[0]["id"] == uuid.UUID(int=1).hex
+
+    def test_batch_against_fake_calendar(
+        self, calendar_server, real_calendar_client, sample_google_calendar_info_input
+    ):
+        """Test that a batch insert is split into one event per part."""
+        _, app = calendar_server
+
+        responses = GoogleCalendarBatchServiceScript(
+            [sample_google_calendar_info_input] * 3, logger
+        )
+
+        assert [response["success"] for response in responses] == ["Event Created"] * 3
+        assert len(app.state.events) == 3
+
+    def test_injected_errors_reach_the_client(self, sample_google_calendar_info_input):
+        """Test that the error rate turns into HTTP errors the real client reports."""
+        app = create_calendar_app(FakeBehaviour(error_rate=1.0, error_status=403))
+        client = GoogleCalendarClient(logger)
+
+        with BackgroundServer(app) as server, patch(
+            "calarmhelp.services.googleCalendarService.CALENDAR_ROOT_URL",
+            f"{server.url}/",
+        ), patch(
+            "calarmhelp.services.googleCalendarService.google_calendar_client", client
+        ):
+            response = GoogleCalendarServiceScript(
+                sample_google_calendar_info_input, logger
+            )
+
+        assert response["error"] == "Calendar not found"
+        assert app.state.events == []
+
+    def test_prompt_cache_simulator(self):
+        """Test that only a shared prefix of at least 1024 tokens counts as cached."""
+        cache = PromptCacheSimulator()
+        prefix = "x" * 8192
+
+        assert cache.cached_tokens(prefix + "first") == 0
+        assert cache.cached_tokens(prefix + "second") == 2048
+        assert cache.cached_tokens("short" + prefix) == 0
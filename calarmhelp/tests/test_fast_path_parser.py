@@ -0,0 +1,200 @@
+"""Tests for the rule-based fast path parser."""
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from calarmhelp.services.fastPathParser import FastPathParser
+from calarmhelp.services.util.util import Category
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+@pytest.fixture
+def parser() -> FastPathParser:
+    """Create a parser with fresh counters."""
+    return FastPathParser()
+
+
+@pytest.fixture
+def morning() -> datetime:
+    """Sunday 2024-08-25 at 9:10 AM in New York."""
+    return datetime(2024, 8, 25, 9, 10, tzinfo=NEW_YORK)
+
+
+class TestFastPathParser:
+    """Tests for FastPathParser."""
+
+    def test_template_example_tomorrow(self, parser, morning):
+        """Test the 'tomorrow' template example."""
+        alarm = parser.parse(
+            "Respond to Tom at 5PM tomorrow with a 5 minute reminder.", morning
+        )
+
+        assert alarm.name == "Respond to Tom"
+        assert alarm.category == Category.ALWAYS
+        assert alarm.lead_time == 5
+        assert alarm.event_time == datetime(2024, 8, 26, 17, 0, tzinfo=NEW_YORK)
+        assert alarm.event_time_end == datetime(2024, 8, 26, 17, 30, tzinfo=NEW_YORK)
+        assert alarm.location is None
+        assert alarm.error is False
+
+    def test_template_example_location(self, parser, morning):
+        """Test the 'at home' template example with a separate reminder sentence."""
+        alarm = parser.parse(
+            "Fix your app at 2PM Today at home. Remind me 10 minutes beforehand.",
+            morning,
+        )
+
+        assert alarm.name == "Fix your app"
+        assert alarm.category == Category.HOME
+        assert alarm.location == "home"
+        assert alarm.lead_time == 10
+        assert alarm.event_time == datetime(2024, 8, 25, 14, 0, tzinfo=NEW_YORK)
+
+    @pytest.mark.parametrize(
+        "text, expected_minutes",
+        [
+            ("Pay rent at 9am tomorrow, remind me an hour before", 60),
+            ("Take out the trash at 8AM 10 minutes early", 10),
+            ("Call the bank at 3pm with a 15-minute heads up", 15),
+            ("Call the bank at 3pm", 30),
+        ],
+    )
+    def test_lead_time(self, parser, morning, text, expected_minutes):
+        """Test the supported reminder phrasings and the 30 minute default."""
+        assert parser.parse(text, morning).lead_time == expected_minutes
+
+    def test_next_occurrence_without_day(self, parser, morning):
+        """Test that a time already passed today moves to tomorrow."""
+        alarm = parser.parse("Stretch at 8am", morning)
+
+        assert alarm.event_time == datetime(2024, 8, 26, 8, 0, tzinfo=NEW_YORK)
+
+    def test_weekday_and_duration(self, parser, morning):
+        """Test weekday resolution and an explicit duration."""
+        alarm = parser.parse("Call mom on Friday at 6:30 pm for 1 hour", morning)
+
+        assert alarm.event_time == datetime(2024, 8, 30, 18, 30, tzinfo=NEW_YORK)
+        assert alarm.event_time_end == datetime(2024, 8, 30, 19, 30, tzinfo=NEW_YORK)
+
+    def test_24_hour_clock_and_hashtag_category(self, parser, morning):
+        """Test a 24h time with a #work category."""
+        alarm = parser.parse("Standup at 09:15 tomorrow #work", morning)
+
+        assert alarm.name == "Standup"
+        assert alarm.category == Category.WORK
+        assert alarm.event_time == datetime(2024, 8, 26, 9, 15, tzinfo=NEW_YORK)
+
+    def test_noon(self, parser, morning):
+        """Test the 'noon' keyword."""
+        alarm = parser.parse("Lunch at noon", morning)
+
+        assert alarm.event_time == datetime(2024, 8, 25, 12, 0, tzinfo=NEW_YORK)
+
+    @pytest.mark.parametrize(
+        "text, recurrence, first_occurrence",
+        [
+            (
+                "Gym every weekday at 6am",
+                "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+                datetime(2024, 8, 26, 6, 0, tzinfo=NEW_YORK),
+            ),
+            (
+                "Stretch daily at 9am",
+                "FREQ=DAILY",
+                datetime(2024, 8, 26, 9, 0, tzinfo=NEW_YORK),
+            ),
+            (
+                "Take out the trash every Monday and Thursday at 7pm",
+                "FREQ=WEEKLY;BYDAY=MO,TH",
+                datetime(2024, 8, 26, 19, 0, tzinfo=NEW_YORK),
+            ),
+            (
+                "Call mom on Sundays at 5pm",
+                "FREQ=WEEKLY;BYDAY=SU",
+                datetime(2024, 8, 25, 17, 0, tzinfo=NEW_YORK),
+            ),
+        ],
+    )
+    def test_recurring_schedule(
+        self, parser, morning, text, recurrence, first_occurrence
+    ):
+        """Test that a recurring schedule becomes an RRULE starting at its first occurrence."""
+        alarm = parser.parse(text, morning)
+
+        assert alarm.recurrence == recurrence
+        assert alarm.event_time == first_occurrence
+        assert alarm.name.split()[0] in text
+
+    def test_single_weekday_does_not_recur(self, parser, morning):
+        """Test that "on Monday" is one event, unlike "on Mondays"."""
+        alarm = parser.parse("Gym on Monday at 6am", morning)
+
+        assert alarm.recurrence is None
+        assert alarm.event_time == datetime(2024, 8, 26, 6, 0, tzinfo=NEW_YORK)
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "Meeting with Sam at 3",
+            "Look at the report at 3pm",
+            "Gym every other day at 6am",
+            "Gym every weekday tomorrow at 6am",
+            "Submit taxes on April 15 at 5pm",
+            "Doctor next Tuesday at 10am",
+            "Call Sam at 3pm or 4pm",
+            "Breakfast at 8pm in the morning",
+            "Fix your app at 8AM today",
+            "at 5pm",
+        ],
+    )
+    def test_ambiguous_inputs_fall_back(self, parser, morning, text):
+        """Test that anything not understood with confidence is left to the LLM."""
+        assert parser.parse(text, morning) is None
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "Call Tom at 5pm in two weeks",
+            "Call Tom at 5pm in 3 days",
+            "Pay rent at 9am in a few days",
+            "Water the lawn at 7am every couple of days",
+            "Renew the lease at 9am in six months",
+            "Visit grandma at 5pm in a year",
+            "Review the budget at 9am fortnightly",
+            "Renew the license at 9am annually",
+            "Buy the turkey at 9am before Thanksgiving",
+            "Call Santa at 5pm on Christmas Eve",
+            "Call Tom at 5pm EST",
+            "Call Tom at 5pm pst",
+            "Dentist at 9am on the third",
+            "Dinner at 7:00",
+            "Pick up kids at 3:15",
+            "Call at 5pm Central time",
+            "Flight at 5pm Pacific",
+            "Meeting at 5pm London",
+            "Standup at 9am Eastern",
+            "Hike at 8am Mountain time",
+            "Call Tom at 17:00 UTC",
+        ],
+    )
+    def test_unparsed_timing_falls_back(self, parser, morning, text):
+        """Test that number words and unparsed date, time or timezone words reach the LLM."""
+        assert parser.parse(text, morning) is None
+
+    def test_hit_rate(self, parser, morning):
+        """Test the hit and miss counters."""
+        parser.parse("Stretch at 8am", morning)
+        parser.parse("Meeting with Sam at 3", morning)
+        parser.parse("Lunch at noon", morning)
+        parser.parse("Gym every other day at 6am", morning)
+
+        assert parser.stats() == {"hits": 2, "misses": 2, "hit_rate": 0.5}
+
+    def test_naive_now_is_treated_as_new_york(self, parser):
+        """Test that a naive current time is interpreted in the event timezone."""
+        alarm = parser.parse("Stretch at 8pm", datetime(2024, 8, 25, 9, 10))
+
+        assert alarm.event_time == datetime(2024, 8, 25, 20, 0, tzinfo=NEW_YORK)
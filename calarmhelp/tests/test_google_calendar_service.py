@@ -1,15 +1,30 @@
 """Tests for Google Calendar Service."""
 
+import asyncio
 import os
 import logging
+from datetime import datetime, timedelta, timezone
 import pytest
 from unittest.mock import patch, MagicMock
 
+from google.auth.exceptions import RefreshError
+from googleapiclient.errors import HttpError
+
 from calarmhelp.services.googleCalendarService import (
     isCalendarFound,
     getService,
+    CalendarMetadataCache,
+    GoogleCalendarBatchServiceScript,
+    GoogleCalendarClient,
     GoogleCalendarServiceScript,
+    warmGoogleCalendar,
 )
+from calarmhelp.services.resilience import RetryPolicy, google_calendar_breaker
+from calarmhelp.services.util.util import GoogleCalendarResponse
+
+
+def _http_error(status: int) -> HttpError:
+    return HttpError(MagicMock(status=status, reason="Error"), b"")
 
 
 class TestGoogleCalendarService:
@@ -67,18 +82,17 @@ class TestGoogleCalendarService:
         assert result == mock_service
         mock_build.assert_called_once()
 
-    @patch("calarmhelp.services.googleCalendarService.getService")
     @patch("calarmhelp.services.googleCalendarService.isCalendarFound")
     def test_google_calendar_service_script_success(
         self,
         mock_is_calendar_found,
-        mock_get_service,
+        mock_google_calendar_client,
         sample_google_calendar_info_input,
     ):
         """Test GoogleCalendarServiceScript with successful event creation."""
         # Configure mocks
         mock_service = MagicMock()
-        mock_get_service.return_value = mock_service
+        mock_google_calendar_client.get_service.return_value = mock_service
 
         mock_is_calendar_found.return_value = {
             "found": True,
@@ -105,3 +119,439 @@ class TestGoogleCalendarService:
         assert result.success is not None
         # The implementation returns "Event Created" as success message, not the htmlLink
         assert "Event Created" in result.success
+
+    def test_google_calendar_service_script_missing_credentials(
+        self, mock_google_calendar_client, sample_google_calendar_info_input
+    ):
+        """Test that a client without credentials returns its error response."""
+        mock_google_calendar_client.get_service.return_value = GoogleCalendarResponse(
+            error="defaultCreds not found"
+        )
+
+        result = GoogleCalendarServiceScript(
+            sample_google_calendar_info_input, MagicMock()
+        )
+
+        assert result.error == "defaultCreds not found"
+
+    @patch("calarmhelp.services.googleCalendarService.isCalendarFound")
+    def test_google_calendar_service_script_auth_error_invalidates_client(
+        self,
+        mock_is_calendar_found,
+        mock_google_calendar_client,
+        sample_google_calendar_info_input,
+    ):
+        """Test that an auth error drops the cached client so it is rebuilt."""
+        mock_service = MagicMock()
+        mock_service.events().insert().execute.side_effect = RefreshError(
+            "invalid_grant"
+        )
+        mock_google_calendar_client.get_service.return_value = mock_service
+
+        result = GoogleCalendarServiceScript(
+            sample_google_calendar_info_input, MagicMock()
+        )
+
+        assert "invalid_grant" in result.error
+        mock_google_calendar_client.invalidate.assert_called_once()
+
+    def test_google_calendar_service_script_single_api_call(
+        self, mock_google_calendar_client, sample_google_calendar_info_input
+    ):
+        """Test that a warm cache leaves events().insert as the only API call."""
+        mock_service = MagicMock()
+        mock_service.events().insert().execute.return_value = {"id": "test-event-id"}
+        mock_google_calendar_client.get_service.return_value = mock_service
+
+        with patch(
+            "calarmhelp.services.googleCalendarService.calendar_id", "test-calendar-id"
+        ):
+            warmGoogleCalendar(MagicMock(isEnabledFor=MagicMock(return_value=False)))
+            mock_service.reset_mock()
+
+            for _ in range(3):
+                result = GoogleCalendarServiceScript(
+                    sample_google_calendar_info_input, MagicMock()
+                )
+                assert result.success == "Event Created"
+
+        mock_service.calendarList.assert_not_called()
+        mock_service.calendars.assert_not_called()
+        assert mock_service.events().insert().execute.call_count == 3
+
+    def test_google_calendar_service_script_recurring_event(
+        self, mock_google_calendar_client, sample_google_calendar_info_input
+    ):
+        """Test that a recurring alarm is inserted once, as an event with an RRULE."""
+        mock_service = MagicMock()
+        mock_service.events().insert().execute.return_value = {"id": "test-event-id"}
+        mock_google_calendar_client.get_service.return_value = mock_service
+        mock_service.reset_mock()
+        recurring = sample_google_calendar_info_input.model_copy(
+            update={
+                "jsonResponse": sample_google_calendar_info_input.jsonResponse.model_copy(
+                    update={"recurrence": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"}
+                )
+            }
+        )
+
+        with patch(
+            "calarmhelp.services.googleCalendarService.calendar_id", "test-calendar-id"
+        ):
+            result = GoogleCalendarServiceScript(recurring, MagicMock())
+
+        assert result.success == "Event Created"
+        mock_service.events().insert.assert_called_once()
+        event = mock_service.events().insert.call_args.kwargs["body"]
+        assert event["recurrence"] == ["RRULE:FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"]
+        assert event["start"]["timeZone"] == "America/New_York"
+
+    def test_google_calendar_service_script_404_invalidates_calendar(
+        self, mock_google_calendar_client, sample_google_calendar_info_input
+    ):
+        """Test that an insert 404 drops the cached calendar lookup."""
+        mock_service = MagicMock()
+        mock_service.events().insert().execute.side_effect = HttpError(
+            MagicMock(status=404, reason="Not Found"), b"Not Found"
+        )
+        mock_google_calendar_client.get_service.return_value = mock_service
+
+        with patch(
+            "calarmhelp.services.googleCalendarService.calendar_id", "test-calendar-id"
+        ):
+            GoogleCalendarServiceScript(sample_google_calendar_info_input, MagicMock())
+            mock_service.calendars.reset_mock()
+            result = GoogleCalendarServiceScript(
+                sample_google_calendar_info_input, MagicMock()
+            )
+
+        assert result.error == "Calendar not found"
+        # The lookup ran again because the 404 invalidated the cached entry
+        mock_service.calendars().get.assert_called_with(calendarId="test-calendar-id")
+
+    def test_google_calendar_batch_service_script(
+        self, mock_google_calendar_client, sample_google_calendar_info_input
+    ):
+        """Test that several inserts go out as one batch with per-item results."""
+        mock_service = MagicMock()
+        mock_google_calendar_client.get_service.return_value = mock_service
+        batch = MagicMock()
+        added = []
+
+        def new_batch_http_request(callback):
+            def execute():
+                for request_id in added:
+                    if request_id == "1":
+                        callback(
+                            request_id,
+                            None,
+                            HttpError(MagicMock(status=403, reason="Forbidden"), b""),
+                        )
+                    else:
+                        callback(request_id, {"id": f"event-{request_id}"}, None)
+
+            batch.execute.side_effect = execute
+            return batch
+
+        mock_service.new_batch_http_request.side_effect = new_batch_http_request
+        batch.add.side_effect = lambda request, request_id: added.append(request_id)
+
+        with patch(
+            "calarmhelp.services.googleCalendarService.calendar_id", "test-calendar-id"
+        ):
+            results = GoogleCalendarBatchServiceScript(
+                [sample_google_calendar_info_input] * 3, MagicMock()
+            )
+
+        assert [result.success for result in results] == [
+            "Event Created",
+            None,
+            "Event Created",
+        ]
+        assert results[1].error is not None
+        assert batch.add.call_count == 3
+        batch.execute.assert_called_once()
+        mock_service.events().insert().execute.assert_not_called()
+
+    def test_google_calendar_batch_service_script_calendar_missing(
+        self, mock_google_calendar_client, sample_google_calendar_info_input
+    ):
+        """Test that a missing calendar fails every item without a batch call."""
+        mock_service = MagicMock()
+        mock_service.calendars().get.side_effect = Exception("Calendar not found")
+        mock_google_calendar_client.get_service.return_value = mock_service
+
+        results = GoogleCalendarBatchServiceScript(
+            [sample_google_calendar_info_input] * 2, MagicMock()
+        )
+
+        assert [result.error for result in results] == ["Calendar not found"] * 2
+        mock_service.new_batch_http_request.assert_not_called()
+
+    @patch(
+        "calarmhelp.services.googleCalendarService.GOOGLE_RETRY_POLICY",
+        RetryPolicy(attempts=3, base_delay=0, max_delay=0),
+    )
+    def test_google_calendar_service_script_retries_transient_errors(
+        self, mock_google_calendar_client, sample_google_calendar_info_input
+    ):
+        """Test that a 503 is retried with the same event id, so a retry cannot duplicate it."""
+        mock_service = MagicMock()
+        insert = mock_service.events().insert
+        insert().execute.side_effect = [_http_error(503), {"id": "created"}]
+        insert.reset_mock()
+        mock_google_calendar_client.get_service.return_value = mock_service
+
+        result = GoogleCalendarServiceScript(
+            sample_google_calendar_info_input, MagicMock()
+        )
+
+        # One request with one event id, executed twice
+        built = [call.kwargs["body"] for call in insert.call_args_list if call.kwargs]
+        assert result.success == "Event Created"
+        assert len(built) == 1 and built[0]["id"]
+        assert insert().execute.call_count == 2
+
+    @patch(
+        "calarmhelp.services.googleCalendarService.GOOGLE_RETRY_POLICY",
+        RetryPolicy(attempts=2, base_delay=0, max_delay=0),
+    )
+    def test_google_calendar_service_script_duplicate_on_retry_is_success(
+        self, mock_google_calendar_client, sample_google_calendar_info_input
+    ):
+        """Test that a 409 after a timed-out attempt means the first attempt landed."""
+        mock_service = MagicMock()
+        mock_service.events().insert().execute.side_effect = [
+            TimeoutError("timed out"),
+            _http_error(409),
+        ]
+        mock_google_calendar_client.get_service.return_value = mock_service
+
+        result = GoogleCalendarServiceScript(
+            sample_google_calendar_info_input, MagicMock()
+        )
+
+        assert result.success == "Event Created"
+
+    @patch(
+        "calarmhelp.services.googleCalendarService.GOOGLE_RETRY_POLICY",
+        RetryPolicy(attempts=1, base_delay=0, max_delay=0),
+    )
+    def test_google_calendar_service_script_fails_fast_when_circuit_open(
+        self, mock_google_calendar_client, sample_google_calendar_info_input
+    ):
+        """Test that once Google keeps failing, calls stop reaching it."""
+        mock_service = MagicMock()
+        mock_service.events().insert().execute.side_effect = _http_error(503)
+        mock_google_calendar_client.get_service.return_value = mock_service
+
+        for _ in range(5):
+            GoogleCalendarServiceScript(sample_google_calendar_info_input, MagicMock())
+
+        result = GoogleCalendarServiceScript(
+            sample_google_calendar_info_input, MagicMock()
+        )
+
+        assert google_calendar_breaker.state == "open"
+        assert "google_calendar is unavailable" in result.error
+        assert mock_service.events().insert().execute.call_count == 5
+
+    @patch(
+        "calarmhelp.services.googleCalendarService.GOOGLE_RETRY_POLICY",
+        RetryPolicy(attempts=3, base_delay=0, max_delay=0),
+    )
+    def test_google_calendar_batch_service_script_retries_failed_items(
+        self, mock_google_calendar_client, sample_google_calendar_info_input
+    ):
+        """Test that only the inserts that failed transiently are sent again."""
+        mock_service = MagicMock()
+        mock_google_calendar_client.get_service.return_value = mock_service
+        batches = []
+
+        def new_batch_http_request(callback):
+            batch = MagicMock()
+            added = []
+            batch.add.side_effect = lambda request, request_id: added.append(request_id)
+
+            def execute():
+                for request_id in added:
+                    if request_id == "1" and len(batches) == 1:
+                        callback(request_id, None, _http_error(503))
+                    else:
+                        callback(request_id, {"id": f"event-{request_id}"}, None)
+
+            batch.execute.side_effect = execute
+            batches.append(added)
+            return batch
+
+        mock_service.new_batch_http_request.side_effect = new_batch_http_request
+
+        results = GoogleCalendarBatchServiceScript(
+            [sample_google_calendar_info_input] * 3, MagicMock()
+        )
+
+        assert [result.success for result in results] == ["Event Created"] * 3
+        assert batches == [["0", "1", "2"], ["1"]]
+
+    def test_google_calendar_batch_service_script_empty(self):
+        """Test that an empty batch makes no API calls."""
+        assert GoogleCalendarBatchServiceScript([], MagicMock()) == []
+
+
+class TestCalendarMetadataCache:
+    """Tests for CalendarMetadataCache."""
+
+    def test_get_caches_found_calendar(self):
+        """Test that a found calendar is looked up once within the TTL."""
+        cache = CalendarMetadataCache(ttl=60)
+        mock_service = MagicMock()
+        mock_service.calendars().get().execute.return_value = {"summary": "Test"}
+        mock_service.calendars.reset_mock()
+
+        assert cache.get("test-calendar-id", mock_service)["found"] is True
+        assert cache.get("test-calendar-id", mock_service)["found"] is True
+
+        assert mock_service.calendars().get.call_count == 1
+
+    def test_get_expires_after_ttl(self):
+        """Test that an expired entry triggers a new lookup."""
+        cache = CalendarMetadataCache(ttl=0)
+        mock_service = MagicMock()
+        mock_service.calendars().get().execute.return_value = {"summary": "Test"}
+        mock_service.calendars.reset_mock()
+
+        cache.get("test-calendar-id", mock_service)
+        cache.get("test-calendar-id", mock_service)
+
+        assert mock_service.calendars().get.call_count == 2
+
+    def test_get_does_not_cache_missing_calendar(self):
+        """Test that a failed lookup is retried on the next call."""
+        cache = CalendarMetadataCache(ttl=60)
+        mock_service = MagicMock()
+        mock_service.calendars().get.side_effect = Exception("Calendar not found")
+
+        assert cache.get("missing-id", mock_service)["found"] is False
+        assert cache.get("missing-id", mock_service)["found"] is False
+
+        assert mock_service.calendars().get.call_count == 2
+
+    def test_invalidate(self):
+        """Test that invalidate forces a new lookup."""
+        cache = CalendarMetadataCache(ttl=60)
+        mock_service = MagicMock()
+        mock_service.calendars().get().execute.return_value = {"summary": "Test"}
+        mock_service.calendars.reset_mock()
+
+        cache.get("test-calendar-id", mock_service)
+        cache.invalidate("test-calendar-id")
+        cache.get("test-calendar-id", mock_service)
+
+        assert mock_service.calendars().get.call_count == 2
+
+
+def _valid_credentials(expires_in: timedelta) -> MagicMock:
+    credentials = MagicMock()
+    credentials.valid = True
+    credentials.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + expires_in
+    return credentials
+
+
+class TestGoogleCalendarClient:
+    """Tests for the cached GoogleCalendarClient."""
+
+    @patch("calarmhelp.services.googleCalendarService.buildService")
+    @patch("calarmhelp.services.googleCalendarService.getCredentials")
+    def test_get_service_builds_once(self, mock_get_credentials, mock_build_service):
+        """Test that the service is built on first use and then cached."""
+        mock_get_credentials.return_value = _valid_credentials(timedelta(hours=1))
+        client = GoogleCalendarClient(MagicMock())
+
+        first = client.get_service()
+        second = client.get_service()
+
+        assert first is second
+        mock_get_credentials.assert_called_once()
+        mock_build_service.assert_called_once()
+
+    @patch("calarmhelp.services.googleCalendarService.buildService")
+    @patch("calarmhelp.services.googleCalendarService.getCredentials")
+    def test_get_service_without_credentials(
+        self, mock_get_credentials, mock_build_service
+    ):
+        """Test that missing credentials return an error response and nothing is cached."""
+        mock_get_credentials.return_value = None
+        client = GoogleCalendarClient(MagicMock())
+
+        result = client.get_service()
+
+        assert isinstance(result, GoogleCalendarResponse)
+        assert result.error == "defaultCreds not found"
+        mock_build_service.assert_not_called()
+
+    @patch("calarmhelp.services.googleCalendarService.buildService")
+    @patch("calarmhelp.services.googleCalendarService.getCredentials")
+    def test_invalidate_rebuilds_service(
+        self, mock_get_credentials, mock_build_service
+    ):
+        """Test that invalidate forces a rebuild on the next call."""
+        mock_get_credentials.return_value = _valid_credentials(timedelta(hours=1))
+        mock_build_service.side_effect = [MagicMock(), MagicMock()]
+        client = GoogleCalendarClient(MagicMock())
+
+        first = client.get_service()
+        client.invalidate()
+        second = client.get_service()
+
+        assert first is not second
+        assert mock_build_service.call_count == 2
+
+    @patch("calarmhelp.services.googleCalendarService.buildService")
+    @patch("calarmhelp.services.googleCalendarService.getCredentials")
+    def test_refresh_credentials_skips_fresh_token(
+        self, mock_get_credentials, mock_build_service
+    ):
+        """Test that credentials far from expiry are left alone."""
+        credentials = _valid_credentials(timedelta(hours=1))
+        mock_get_credentials.return_value = credentials
+        client = GoogleCalendarClient(MagicMock(), refresh_margin=300)
+        client.get_service()
+
+        assert client.refresh_credentials() is False
+        credentials.refresh.assert_not_called()
+        assert client.seconds_until_refresh() > 0
+
+    @patch("calarmhelp.services.googleCalendarService.buildService")
+    @patch("calarmhelp.services.googleCalendarService.getCredentials")
+    def test_refresh_credentials_ahead_of_expiry(
+        self, mock_get_credentials, mock_build_service
+    ):
+        """Test that credentials inside the refresh margin are refreshed."""
+        credentials = _valid_credentials(timedelta(minutes=2))
+        mock_get_credentials.return_value = credentials
+        client = GoogleCalendarClient(MagicMock(), refresh_margin=300)
+        client.get_service()
+
+        assert client.seconds_until_refresh() == 0
+        assert client.refresh_credentials() is True
+        credentials.refresh.assert_called_once()
+
+    @patch("calarmhelp.services.googleCalendarService.buildService")
+    @patch("calarmhelp.services.googleCalendarService.getCredentials")
+    def test_refresh_forever_survives_errors(
+        self, mock_get_credentials, mock_build_service
+    ):
+        """Test that the background loop logs refresh errors and keeps running."""
+        mock_get_credentials.side_effect = FileNotFoundError("no credentials file")
+        logger = MagicMock()
+        client = GoogleCalendarClient(logger)
+
+        async def main():
+            task = asyncio.create_task(client.refresh_forever())
+            await asyncio.sleep(0.05)
+            assert not task.done()
+            task.cancel()
+
+        asyncio.run(main())
+
+        logger.warning.assert_called()
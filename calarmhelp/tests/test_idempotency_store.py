@@ -0,0 +1,181 @@
+"""Tests for the idempotency key store."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from calarmhelp.services.idempotencyStore import (
+    IdempotencyKeyReused,
+    IdempotencyStore,
+    fingerprint,
+)
+
+
+class TestIdempotencyStore:
+    """Tests for IdempotencyStore."""
+
+    def test_concurrent_duplicates_share_one_run(self):
+        """Test that requests arriving while the first runs wait for it instead of running again."""
+        store = IdempotencyStore()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"success": "Event Created"}
+
+        async def main():
+            return await asyncio.gather(
+                *(store.run("key", fingerprint("body"), work) for _ in range(5))
+            )
+
+        results = asyncio.run(main())
+
+        assert len(calls) == 1
+        assert [replayed for _, replayed in results] == [False] + [True] * 4
+        assert all(result == {"success": "Event Created"} for result, _ in results)
+        assert store.stats()["coalesced"] == 4
+        assert store.stats()["in_flight"] == 0
+
+    def test_later_duplicate_replays_stored_result(self):
+        """Test that a retry after the run finished gets the stored result."""
+        store = IdempotencyStore()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return {"success": len(calls)}
+
+        async def main():
+            first = await store.run("key", fingerprint("body"), work)
+            second = await store.run("key", fingerprint("body"), work)
+            return first, second
+
+        first, second = asyncio.run(main())
+
+        assert first == ({"success": 1}, False)
+        assert second == ({"success": 1}, True)
+        assert store.stats()["replays"] == 1
+
+    def test_unstored_results_run_again(self):
+        """Test that results rejected by should_store do not block a retry."""
+        store = IdempotencyStore()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return {"error": "Could not create event"}
+
+        async def main():
+            for _ in range(2):
+                await store.run(
+                    "key",
+                    fingerprint("body"),
+                    work,
+                    should_store=lambda result: not result["error"],
+                )
+
+        asyncio.run(main())
+
+        assert len(calls) == 2
+
+    def test_failed_run_is_not_stored(self):
+        """Test that an exception reaches every waiter and the next request runs again."""
+        store = IdempotencyStore()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        async def succeed():
+            return {"success": "Event Created"}
+
+        async def main():
+            failures = await asyncio.gather(
+                store.run("key", fingerprint("body"), fail),
+                store.run("key", fingerprint("body"), fail),
+                return_exceptions=True,
+            )
+            return failures, await store.run("key", fingerprint("body"), succeed)
+
+        failures, retry = asyncio.run(main())
+
+        assert all(isinstance(failure, RuntimeError) for failure in failures)
+        assert retry == ({"success": "Event Created"}, False)
+
+    def test_key_reused_with_different_body(self):
+        """Test that a key cannot be reused for a different request, in flight or stored."""
+        store = IdempotencyStore()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            return {"success": "Event Created"}
+
+        async def main():
+            first = asyncio.create_task(store.run("key", fingerprint("a"), work))
+            await asyncio.sleep(0)
+            with pytest.raises(IdempotencyKeyReused):
+                await store.run("key", fingerprint("b"), work)
+            await first
+            with pytest.raises(IdempotencyKeyReused):
+                await store.run("key", fingerprint("b"), work)
+
+        asyncio.run(main())
+
+    def test_cancelled_caller_does_not_cancel_the_run(self):
+        """Test that a client giving up still lets the run finish and be stored for its retry."""
+        store = IdempotencyStore()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return {"success": "Event Created"}
+
+        async def main():
+            caller = asyncio.create_task(store.run("key", fingerprint("body"), work))
+            await asyncio.sleep(0.005)
+            caller.cancel()
+            assert len(store.tasks) == 1
+            await asyncio.sleep(0.03)
+            assert store.tasks == set()
+            return await store.run("key", fingerprint("body"), work)
+
+        assert asyncio.run(main()) == ({"success": "Event Created"}, True)
+
+    def test_evicts_least_recently_used_and_expires(self):
+        """Test that the store stays bounded and drops results older than the TTL."""
+        store = IdempotencyStore(maxsize=2, ttl=60)
+
+        async def work():
+            return {"success": "Event Created"}
+
+        async def run(key):
+            return (await store.run(key, fingerprint("body"), work))[1]
+
+        async def main():
+            for key in ("a", "b", "c"):
+                await run(key)
+            return await run("a"), await run("c")
+
+        assert asyncio.run(main()) == (False, True)
+
+        with patch("calarmhelp.services.idempotencyStore.time.monotonic") as monotonic:
+            monotonic.return_value = 10**9
+            assert asyncio.run(run("c")) is False
+
+    def test_disabled_store_always_runs(self):
+        """Test that maxsize=0 turns the store into a pass-through."""
+        store = IdempotencyStore(maxsize=0)
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return {}
+
+        async def main():
+            for _ in range(2):
+                assert await store.run("key", fingerprint("body"), work) == ({}, False)
+
+        asyncio.run(main())
+
+        assert len(calls) == 2
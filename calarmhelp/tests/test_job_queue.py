@@ -0,0 +1,243 @@
+"""Tests for the SQLite job queue and its workers."""
+
+import asyncio
+import time
+
+from calarmhelp.services.jobQueue import (
+    FAILED,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    JobQueue,
+    JobWorkerPool,
+)
+
+
+class TestJobQueue:
+    """Tests for JobQueue."""
+
+    def test_jobs_are_claimed_in_order(self, tmp_path):
+        """Test that claims return the oldest queued job and mark it running."""
+        queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+        first = queue.enqueue("create_alarm", {"input": "first"})
+        second = queue.enqueue("create_alarm", {"input": "second"})
+
+        claimed = queue.claim()
+
+        assert claimed == {
+            "id": first,
+            "kind": "create_alarm",
+            "payload": {"input": "first"},
+            "attempts": 1,
+        }
+        assert queue.get(first)["status"] == RUNNING
+        assert queue.claim()["id"] == second
+        assert queue.claim() is None
+
+    def test_complete_stores_result(self, tmp_path):
+        """Test that a completed job reports its result."""
+        queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+        job_id = queue.enqueue("create_alarm", {"input": "Call mom at 8"})
+        queue.claim()
+
+        queue.complete(job_id, {"response": "Call mom"})
+
+        job = queue.get(job_id)
+        assert job["status"] == SUCCEEDED
+        assert job["result"] == {"response": "Call mom"}
+        assert queue.get("unknown") is None
+
+    def test_fail_writes_dead_letter(self, tmp_path):
+        """Test that failed jobs are copied to the dead letter table."""
+        queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+        job_id = queue.enqueue("create_alarm", {"input": "gibberish"})
+        queue.claim()
+
+        queue.fail(job_id, "Could not parse", {"error": "Could not parse"})
+
+        assert queue.get(job_id)["status"] == FAILED
+        assert queue.dead_letters() == [
+            {
+                "job_id": job_id,
+                "kind": "create_alarm",
+                "payload": {"input": "gibberish"},
+                "attempts": 1,
+                "error": "Could not parse",
+                "failed_at": queue.dead_letters()[0]["failed_at"],
+            }
+        ]
+        assert queue.stats()["dead_letters"] == 1
+
+    def test_interrupted_jobs_survive_restart(self, tmp_path):
+        """Test that a job left running by a dead process is claimed again once its lease runs out."""
+        path = str(tmp_path / "jobs.sqlite3")
+        queue = JobQueue(path, lease_seconds=0.05)
+        job_id = queue.enqueue("create_alarm", {"input": "Call mom at 8"})
+        queue.claim()
+        queue.close()
+
+        reopened = JobQueue(path)
+
+        assert reopened.get(job_id)["status"] == RUNNING
+        time.sleep(0.1)
+        assert reopened.claim()["attempts"] == 2
+
+    def test_retried_jobs_wait_for_their_backoff(self, tmp_path):
+        """Test that a retried job is not claimed again before its delay has passed."""
+        queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+        job_id = queue.enqueue("create_alarm", {"input": "Call mom at 8"})
+        queue.claim()
+
+        queue.retry(job_id, "OpenAI unavailable", delay=0.1)
+
+        assert queue.get(job_id)["status"] == QUEUED
+        assert queue.claim() is None
+        time.sleep(0.15)
+        assert queue.claim()["attempts"] == 2
+
+    def test_leased_jobs_are_not_taken_over(self, tmp_path):
+        """Test that another process cannot claim a job whose lease is renewed."""
+        path = str(tmp_path / "jobs.sqlite3")
+        queue = JobQueue(path, lease_seconds=0.2)
+        other = JobQueue(path)
+        job_id = queue.enqueue("create_alarm", {"input": "Call mom at 8"})
+        queue.claim()
+
+        for _ in range(3):
+            time.sleep(0.1)
+            assert queue.heartbeat(job_id)
+            assert other.claim() is None
+
+        assert not other.heartbeat(job_id)
+        queue.complete(job_id, {"response": "Call mom"})
+        assert not queue.heartbeat(job_id)
+
+
+class TestJobWorkerPool:
+    """Tests for JobWorkerPool."""
+
+    @staticmethod
+    async def _drain(pool: JobWorkerPool, job_ids: list[str]):
+        pool.start()
+        try:
+            for _ in range(200):
+                statuses = {pool.queue.get(job_id)["status"] for job_id in job_ids}
+                if statuses <= {SUCCEEDED, FAILED}:
+                    return
+                await asyncio.sleep(0.01)
+        finally:
+            await pool.stop()
+
+    def test_workers_run_jobs(self, tmp_path):
+        """Test that queued jobs are handed to the handler and their results stored."""
+        seen = []
+
+        async def handler(kind, payload):
+            seen.append((kind, payload["input"]))
+            return {"response": payload["input"]}
+
+        async def main():
+            pool = JobWorkerPool(
+                JobQueue(str(tmp_path / "jobs.sqlite3")), handler, workers=2
+            )
+            job_ids = [
+                await pool.enqueue("create_alarm", {"input": text})
+                for text in ("one", "two", "three")
+            ]
+            await self._drain(pool, job_ids)
+            return pool, job_ids
+
+        pool, job_ids = asyncio.run(main())
+
+        assert sorted(seen) == [
+            ("create_alarm", "one"),
+            ("create_alarm", "three"),
+            ("create_alarm", "two"),
+        ]
+        assert [pool.queue.get(job_id)["result"] for job_id in job_ids] == [
+            {"response": "one"},
+            {"response": "two"},
+            {"response": "three"},
+        ]
+
+    def test_raising_jobs_retry_then_dead_letter(self, tmp_path):
+        """Test that a handler that keeps raising is retried up to max_attempts."""
+        attempts = []
+
+        async def handler(kind, payload):
+            attempts.append(1)
+            raise RuntimeError("OpenAI unavailable")
+
+        async def main():
+            pool = JobWorkerPool(
+                JobQueue(str(tmp_path / "jobs.sqlite3")),
+                handler,
+                workers=1,
+                max_attempts=3,
+                poll_interval=0.01,
+                retry_base_delay=0.01,
+            )
+            job_id = await pool.enqueue("create_alarm", {"input": "Call mom at 8"})
+            await self._drain(pool, [job_id])
+            return pool, job_id
+
+        pool, job_id = asyncio.run(main())
+
+        assert len(attempts) == 3
+        assert pool.queue.get(job_id)["status"] == FAILED
+        assert "OpenAI unavailable" in pool.queue.dead_letters()[0]["error"]
+
+    def test_failed_results_dead_letter_without_retry(self, tmp_path):
+        """Test that a response rejected by is_failure is not retried."""
+        attempts = []
+
+        async def handler(kind, payload):
+            attempts.append(1)
+            return {"error": "Could not create event"}
+
+        async def main():
+            pool = JobWorkerPool(
+                JobQueue(str(tmp_path / "jobs.sqlite3")),
+                handler,
+                is_failure=lambda result: bool(result.get("error")),
+            )
+            job_id = await pool.enqueue("create_alarm", {"input": "Call mom at 8"})
+            await self._drain(pool, [job_id])
+            return pool, job_id
+
+        pool, job_id = asyncio.run(main())
+
+        job = pool.queue.get(job_id)
+        assert len(attempts) == 1
+        assert job["status"] == FAILED
+        assert job["result"] == {"error": "Could not create event"}
+        assert pool.queue.dead_letters()[0]["error"] == "Could not create event"
+
+    def test_stop_drains_running_jobs(self, tmp_path):
+        """Test that stopping lets the running job finish and leaves queued jobs queued."""
+        started = []
+
+        async def handler(kind, payload):
+            started.append(payload["input"])
+            await asyncio.sleep(0.2)
+            return {"response": payload["input"]}
+
+        async def main():
+            pool = JobWorkerPool(
+                JobQueue(str(tmp_path / "jobs.sqlite3")), handler, workers=1
+            )
+            job_ids = [
+                await pool.enqueue("create_alarm", {"input": text})
+                for text in ("one", "two")
+            ]
+            pool.start()
+            while not started:
+                await asyncio.sleep(0.01)
+            await pool.stop(timeout=5)
+            return pool, job_ids
+
+        pool, job_ids = asyncio.run(main())
+
+        assert started == ["one"]
+        assert pool.queue.get(job_ids[0])["status"] == SUCCEEDED
+        assert pool.queue.get(job_ids[1])["status"] == QUEUED
@@ -0,0 +1,63 @@
+"""Tests for deferred module attributes."""
+
+import sys
+import types
+from unittest.mock import patch
+
+import pytest
+
+from calarmhelp.services.lazy import LazyImports
+
+
+def lazy_module() -> types.ModuleType:
+    """A throwaway module whose `JSONDecoder` and `statistics` attributes are lazy."""
+    module = types.ModuleType("calarmhelp_lazy_test")
+    module.lazy_imports = LazyImports(
+        vars(module),
+        {"JSONDecoder": "json:JSONDecoder", "statistics": "statistics"},
+    )
+    module.__getattr__ = module.lazy_imports.attribute
+    return module
+
+
+class TestLazyImports:
+    """Tests for LazyImports."""
+
+    def test_get_imports_and_binds(self):
+        """Test that the first use imports the attribute and binds it in the module."""
+        import json
+        import statistics
+
+        module = lazy_module()
+
+        assert "JSONDecoder" not in vars(module)
+        assert module.lazy_imports.get("JSONDecoder") is json.JSONDecoder
+        assert vars(module)["JSONDecoder"] is json.JSONDecoder
+        assert module.statistics is statistics
+
+    def test_unknown_attribute(self):
+        """Test that names that are not lazy still raise AttributeError."""
+        module = lazy_module()
+
+        with pytest.raises(AttributeError):
+            module.missing
+
+    def test_patched_value_wins(self):
+        """Test that `patch` can replace a lazy attribute that was never used."""
+        module = lazy_module()
+        sys.modules[module.__name__] = module
+
+        try:
+            with patch(f"{module.__name__}.JSONDecoder") as mock_decoder:
+                assert module.lazy_imports.get("JSONDecoder") is mock_decoder
+            assert module.lazy_imports.get("JSONDecoder") is not mock_decoder
+        finally:
+            del sys.modules[module.__name__]
+
+    def test_load_imports_everything(self):
+        """Test that `load` binds every lazy attribute."""
+        module = lazy_module()
+
+        module.lazy_imports.load()
+
+        assert {"JSONDecoder", "statistics"} <= set(vars(module))
@@ -0,0 +1,150 @@
+"""Tests for the load test script, against a stub app served over real HTTP."""
+
+import asyncio
+import json
+from collections import Counter
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from calarmhelp.fakes.server import BackgroundServer
+from calarmhelp.scripts.loadtest import LoadGenerator, main, percentile, summarize
+
+
+def create_stub_app() -> FastAPI:
+    """An app shaped like calarmhelp that fails every input mentioning `fail`."""
+    app = FastAPI()
+    app.state.inputs = []
+
+    def result(text: str) -> dict:
+        app.state.inputs.append(text)
+        if "fail" in text:
+            return {"error": "Could not create event"}
+        return {"success": "Event Created"}
+
+    @app.post("/create_alarm")
+    async def create_alarm(request: Request) -> JSONResponse:
+        body = await request.json()
+        if body["input"] == "boom":
+            return JSONResponse(status_code=500, content={})
+        return JSONResponse(result(body["input"]))
+
+    @app.post("/create_alarms")
+    async def create_alarms(request: Request) -> JSONResponse:
+        body = await request.json()
+        return JSONResponse({"results": [result(text) for text in body["inputs"]]})
+
+    return app
+
+
+class TestLoadTestSummary:
+    """Tests for the percentile and summary helpers."""
+
+    def test_percentile_nearest_rank(self):
+        """Test that percentiles pick the nearest rank of sorted values."""
+        values = [float(value) for value in range(1, 101)]
+
+        assert percentile(values, 0.50) == 50.0
+        assert percentile(values, 0.95) == 95.0
+        assert percentile(values, 0.99) == 99.0
+        assert percentile([3.0], 0.99) == 3.0
+        assert percentile([], 0.5) == 0.0
+
+    def test_summarize(self):
+        """Test that the summary reports throughput, milliseconds and error rates per alarm."""
+        summary = summarize([0.1, 0.2, 0.3, 0.4], Counter(app=2), items=8, duration=2.0)
+
+        assert summary["requests"] == 4
+        assert summary["throughput_rps"] == 2.0
+        assert summary["alarms_per_s"] == 4.0
+        assert round(summary["latency_ms"]["p50"]) == 200
+        assert round(summary["latency_ms"]["max"]) == 400
+        assert round(summary["latency_ms"]["mean"]) == 250
+        assert summary["error_rate"] == 0.25
+        assert summary["errors"] == {"app": 2}
+
+    def test_summarize_empty_step(self):
+        """Test that a step without requests does not divide by zero."""
+        summary = summarize([], Counter(), items=0, duration=0.0)
+
+        assert summary["throughput_rps"] == 0.0
+        assert summary["error_rate"] == 0.0
+
+
+class TestLoadGenerator:
+    """Tests for driving a server with the load generator."""
+
+    def test_sweep_counts_errors_by_kind(self):
+        """Test that each step reports app errors and HTTP failures separately."""
+        corpus = ("Call mom at 8", "please fail", "boom")
+
+        with BackgroundServer(create_stub_app()) as server:
+            generator = LoadGenerator(server.url, corpus=corpus, seed=1)
+            steps = asyncio.run(
+                generator.sweep([1, 2], duration=0.3, log=lambda _: None)
+            )
+
+        assert [step["concurrency"] for step in steps] == [1, 2]
+        for step in steps:
+            assert step["requests"] > 0
+            assert set(step["errors"]) <= {"app", "http_500"}
+            assert 0 < step["error_rate"] < 1
+
+    def test_batch_requests_count_alarms(self):
+        """Test that batch requests count every input as an alarm."""
+        app = create_stub_app()
+
+        with BackgroundServer(app) as server:
+            generator = LoadGenerator(
+                server.url, corpus=("Call mom at 8",), batch_size=4, unique=True
+            )
+            step = asyncio.run(generator.run_step(1, duration=0.2))
+
+        assert step["alarms"] == step["requests"] * 4
+        assert step["error_rate"] == 0.0
+        assert len(set(app.state.inputs)) == len(app.state.inputs)
+
+    def test_sweep_stops_above_max_error_rate(self):
+        """Test that the sweep stops once a step fails too often."""
+        with BackgroundServer(create_stub_app()) as server:
+            generator = LoadGenerator(server.url, corpus=("boom",))
+            steps = asyncio.run(
+                generator.sweep(
+                    [1, 2, 4], duration=0.1, max_error_rate=0.5, log=lambda _: None
+                )
+            )
+
+        assert len(steps) == 1
+        assert steps[0]["errors"] == {"http_500": steps[0]["alarms"]}
+
+    def test_main_writes_json_report(self, tmp_path):
+        """Test that the command line writes one report entry per step."""
+        output = tmp_path / "results.json"
+
+        with BackgroundServer(create_stub_app()) as server:
+            code = main(
+                [
+                    "--target",
+                    server.url,
+                    "--concurrency",
+                    "1,2",
+                    "--duration",
+                    "0.1",
+                    "--warmup",
+                    "0",
+                    "--output",
+                    str(output),
+                ]
+            )
+
+        report = json.loads(output.read_text())
+        assert code == 0
+        assert report["endpoint"] == "/create_alarm"
+        assert [step["concurrency"] for step in report["steps"]] == [1, 2]
+        assert set(report["steps"][0]["latency_ms"]) == {
+            "p50",
+            "p95",
+            "p99",
+            "mean",
+            "max",
+        }
@@ -0,0 +1,93 @@
+"""Tests for the in-process metrics."""
+
+import pytest
+from haystack import Pipeline
+from haystack.components.builders import PromptBuilder
+
+from calarmhelp.services.calendarAlarmService import enable_stage_timing
+from calarmhelp.services.metrics import (
+    STAGE_DURATION,
+    Counter,
+    Histogram,
+    MetricsRegistry,
+    _Metric,
+)
+
+
+class TestMetrics:
+    """Tests for Counter, Histogram and MetricsRegistry."""
+
+    def test_counter_renders_each_label_set(self):
+        """Test that counters are kept and rendered per label set."""
+        errors = Counter("errors_total", "Errors by type.", ["type"])
+        errors.inc(type="RefreshError")
+        errors.inc(2, type="RefreshError")
+        errors.inc(type='say "hi"')
+
+        rendered = errors.render()
+
+        assert "# TYPE errors_total counter" in rendered
+        assert 'errors_total{type="RefreshError"} 3' in rendered
+        assert 'errors_total{type="say \\"hi\\""} 1' in rendered
+
+    def test_counter_rejects_wrong_labels(self):
+        """Test that a missing label is reported instead of creating a new series."""
+        errors = Counter("errors_total", "Errors by type.", ["type"])
+
+        with pytest.raises(ValueError):
+            errors.inc()
+
+    def test_metric_without_samples_cannot_be_created(self):
+        """Test that a metric type missing `_samples` fails when created, not when scraped."""
+
+        class Gauge(_Metric):
+            kind = "gauge"
+
+        with pytest.raises(TypeError):
+            Gauge("queue_depth", "Jobs waiting.")
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that bucket counts, sum and count follow the Prometheus format."""
+        latency = Histogram(
+            "latency_seconds", "Latency.", ["stage"], buckets=(0.1, 1.0)
+        )
+        latency.observe(0.05, stage="insert")
+        latency.observe(0.5, stage="insert")
+        latency.observe(5, stage="insert")
+
+        rendered = latency.render()
+
+        assert 'latency_seconds_bucket{stage="insert",le="0.1"} 1' in rendered
+        assert 'latency_seconds_bucket{stage="insert",le="1.0"} 2' in rendered
+        assert 'latency_seconds_bucket{stage="insert",le="+Inf"} 3' in rendered
+        assert 'latency_seconds_sum{stage="insert"} 5.55' in rendered
+        assert 'latency_seconds_count{stage="insert"} 3' in rendered
+
+    def test_histogram_time_observes_on_error(self):
+        """Test that a failing block is still timed."""
+        latency = Histogram("latency_seconds", "Latency.", ["stage"])
+
+        with pytest.raises(RuntimeError):
+            with latency.time(stage="insert"):
+                raise RuntimeError("boom")
+
+        assert latency.count(stage="insert") == 1
+
+    def test_registry_rejects_duplicates(self):
+        """Test that two metrics cannot share a name."""
+        registry = MetricsRegistry()
+        registry.register(Counter("errors_total", "Errors."))
+
+        with pytest.raises(ValueError):
+            registry.register(Counter("errors_total", "Errors."))
+
+    def test_pipeline_components_are_timed(self):
+        """Test that pipeline components are recorded under their stage name."""
+        pipeline = Pipeline()
+        pipeline.add_component("prompt_builder", PromptBuilder(template="{{input}}"))
+        enable_stage_timing()
+        before = STAGE_DURATION.count(stage="prompt_build")
+
+        pipeline.run({"prompt_builder": {"input": "hello"}})
+
+        assert STAGE_DURATION.count(stage="prompt_build") == before + 1
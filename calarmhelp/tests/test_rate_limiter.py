@@ -0,0 +1,81 @@
+"""Tests for the per-client token-bucket rate limiter."""
+
+import pytest
+
+from calarmhelp.services.rateLimiter import RateLimiter, RateLimitExceeded
+
+
+class TestRateLimiter:
+    """Tests for RateLimiter."""
+
+    def test_burst_then_reject_with_retry_after(self):
+        """Test that a full bucket allows `burst` requests and then reports when to retry."""
+        limiter = RateLimiter("llm", per_minute=6, burst=2)
+
+        limiter.acquire("a", now=0)
+        limiter.acquire("a", now=0)
+
+        with pytest.raises(RateLimitExceeded) as error:
+            limiter.acquire("a", now=0)
+
+        assert error.value.bucket == "llm"
+        assert error.value.retry_after == pytest.approx(10)
+
+    def test_bucket_refills_over_time(self):
+        """Test that tokens come back at `per_minute` a minute, up to the burst."""
+        limiter = RateLimiter("llm", per_minute=60, burst=1)
+
+        limiter.acquire("a", now=0)
+        with pytest.raises(RateLimitExceeded):
+            limiter.acquire("a", now=0.5)
+        limiter.acquire("a", now=1.0)
+
+    def test_clients_have_separate_buckets(self):
+        """Test that one client using up its bucket does not limit another."""
+        limiter = RateLimiter("calendar", per_minute=1, burst=1)
+
+        limiter.acquire("noisy", now=0)
+        with pytest.raises(RateLimitExceeded):
+            limiter.acquire("noisy", now=0)
+
+        limiter.acquire("quiet", now=0)
+
+    def test_rejected_cost_takes_nothing(self):
+        """Test that a request the bucket cannot cover leaves the bucket untouched."""
+        limiter = RateLimiter("calendar", per_minute=60, burst=3)
+
+        with pytest.raises(RateLimitExceeded):
+            limiter.acquire("a", cost=5, now=0)
+
+        limiter.acquire("a", cost=3, now=0)
+
+    def test_refund_returns_tokens(self):
+        """Test that refunded tokens can be spent again, without going over the burst."""
+        limiter = RateLimiter("calendar", per_minute=1, burst=2)
+
+        limiter.acquire("a", cost=2, now=0)
+        limiter.refund("a", cost=5, now=0)
+        limiter.acquire("a", cost=2, now=0)
+
+        with pytest.raises(RateLimitExceeded):
+            limiter.acquire("a", now=0)
+
+    def test_disabled_limiter_allows_everything(self):
+        """Test that a limit of 0 per minute turns the limiter off."""
+        limiter = RateLimiter("llm", per_minute=0, burst=1)
+
+        assert not limiter.enabled
+        for _ in range(100):
+            limiter.acquire("a", now=0)
+
+    def test_forgets_least_recently_seen_clients(self):
+        """Test that only `max_clients` buckets are kept, and a forgotten client starts full."""
+        limiter = RateLimiter("llm", per_minute=1, burst=1, max_clients=2)
+
+        limiter.acquire("a", now=0)
+        limiter.acquire("b", now=0)
+        limiter.acquire("c", now=0)
+
+        limiter.acquire("a", now=0)
+        with pytest.raises(RateLimitExceeded):
+            limiter.acquire("c", now=0)
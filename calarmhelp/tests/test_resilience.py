@@ -0,0 +1,238 @@
+"""Tests for retries, circuit breakers and hedged calls."""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import httpx
+import openai
+import pytest
+
+from calarmhelp.services.calendarAlarmService import (
+    ResilientGenerator,
+    is_retryable_openai_error,
+    openai_retry_after,
+)
+from calarmhelp.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    call_hedged,
+    call_with_retries,
+    openai_breaker,
+)
+
+NO_DELAY = RetryPolicy(attempts=3, base_delay=0, max_delay=0)
+
+
+class Transient(Exception):
+    """A failure the tests treat as retryable."""
+
+
+def is_transient(error: BaseException) -> bool:
+    return isinstance(error, Transient)
+
+
+def openai_status_error(
+    status: int, headers: dict | None = None
+) -> openai.APIStatusError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return openai.APIStatusError("error", response=response, body=None)
+
+
+class TestRetryPolicy:
+    """Tests for RetryPolicy."""
+
+    def test_backoff_is_jittered_and_capped(self):
+        """Test that delays stay within the doubling bound and the cap."""
+        policy = RetryPolicy(attempts=5, base_delay=1, max_delay=4)
+
+        for retry, bound in [(0, 1), (1, 2), (2, 4), (5, 4)]:
+            delays = [policy.backoff(retry) for _ in range(200)]
+            assert all(0 <= delay <= bound for delay in delays)
+            assert len(set(delays)) > 1
+
+    def test_retry_after_wins_but_is_capped(self):
+        """Test that a Retry-After delay is used as is, up to max_delay."""
+        policy = RetryPolicy(attempts=3, base_delay=1, max_delay=4)
+
+        assert policy.backoff(0, retry_after=2.5) == 2.5
+        assert policy.backoff(0, retry_after=60) == 4
+
+
+class TestCallWithRetries:
+    """Tests for call_with_retries."""
+
+    def test_retries_transient_failures(self):
+        """Test that transient failures are retried until a call succeeds."""
+        func = MagicMock(side_effect=[Transient(), Transient(), "ok"])
+
+        result = call_with_retries(func, CircuitBreaker("test"), NO_DELAY, is_transient)
+
+        assert result == "ok"
+        assert func.call_count == 3
+
+    def test_gives_up_after_attempts(self):
+        """Test that the last failure is raised once attempts run out."""
+        func = MagicMock(side_effect=Transient())
+
+        with pytest.raises(Transient):
+            call_with_retries(func, CircuitBreaker("test"), NO_DELAY, is_transient)
+
+        assert func.call_count == 3
+
+    def test_does_not_retry_permanent_failures(self):
+        """Test that other errors are raised straight away and leave the breaker closed."""
+        breaker = CircuitBreaker("test", failure_threshold=1)
+        func = MagicMock(side_effect=ValueError("bad request"))
+
+        with pytest.raises(ValueError):
+            call_with_retries(func, breaker, NO_DELAY, is_transient)
+
+        assert func.call_count == 1
+        assert breaker.state == "closed"
+
+    def test_sleeps_for_retry_after(self):
+        """Test that the delay a dependency asks for is honoured."""
+        func = MagicMock(side_effect=[Transient(), "ok"])
+        policy = RetryPolicy(attempts=2, base_delay=0, max_delay=1)
+
+        with patch("calarmhelp.services.resilience.time.sleep") as sleep:
+            call_with_retries(
+                func,
+                CircuitBreaker("test"),
+                policy,
+                is_transient,
+                retry_after=lambda error: 0.25,
+            )
+
+        sleep.assert_called_once_with(0.25)
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker."""
+
+    def test_opens_after_threshold_and_fails_fast(self):
+        """Test that an open breaker stops calling the dependency."""
+        breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+        func = MagicMock(side_effect=Transient())
+
+        with pytest.raises(Transient):
+            call_with_retries(func, breaker, NO_DELAY, is_transient)
+
+        assert breaker.state == "open"
+
+        with pytest.raises(CircuitOpenError) as raised:
+            call_with_retries(func, breaker, NO_DELAY, is_transient)
+
+        assert func.call_count == 3
+        assert 29 < raised.value.retry_after <= 30
+
+    def test_half_open_allows_one_trial(self):
+        """Test that after the reset timeout one trial call decides the state."""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+
+        breaker.before_call()
+        assert breaker.state == "half_open"
+
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_failed_trial_reopens(self):
+        """Test that a failed trial call opens the breaker again."""
+        breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=0.01)
+        for _ in range(5):
+            breaker.record_failure()
+        time.sleep(0.02)
+
+        breaker.before_call()
+        breaker.record_failure()
+
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+
+class TestCallHedged:
+    """Tests for call_hedged."""
+
+    def test_fast_call_is_not_hedged(self):
+        """Test that no backup call is made when the first call is quick."""
+        func = MagicMock(return_value="ok")
+
+        assert call_hedged(func, hedge_after=1, dependency="test") == "ok"
+        func.assert_called_once()
+
+    def test_backup_call_wins_when_first_is_slow(self):
+        """Test that a slow call is hedged and the faster backup answers."""
+        release = threading.Event()
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(5)
+                return "slow"
+            return "backup"
+
+        try:
+            assert call_hedged(func, hedge_after=0.01, dependency="test") == "backup"
+        finally:
+            release.set()
+
+        assert len(calls) == 2
+
+    def test_failed_backup_falls_back_to_first(self):
+        """Test that the first call's answer is used when the backup fails."""
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.05)
+                return "slow"
+            raise Transient()
+
+        assert call_hedged(func, hedge_after=0.01, dependency="test") == "slow"
+
+
+class TestResilientGenerator:
+    """Tests for the OpenAI side of the resilience layer."""
+
+    def test_classifies_openai_errors(self):
+        """Test that only rate limits, server errors and connection errors are retried."""
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+        assert is_retryable_openai_error(openai_status_error(429))
+        assert is_retryable_openai_error(openai_status_error(503))
+        assert is_retryable_openai_error(openai.APIConnectionError(request=request))
+        assert is_retryable_openai_error(openai.APITimeoutError(request=request))
+        assert not is_retryable_openai_error(openai_status_error(400))
+        assert not is_retryable_openai_error(openai_status_error(401))
+        assert not is_retryable_openai_error(ValueError())
+
+    def test_reads_retry_after(self):
+        """Test that the Retry-After header of a 429 is read in seconds."""
+        assert openai_retry_after(openai_status_error(429, {"retry-after": "2"})) == 2.0
+        assert openai_retry_after(openai_status_error(429)) is None
+        assert openai_retry_after(ValueError()) is None
+
+    def test_retries_rate_limited_calls(self):
+        """Test that a 429 from OpenAI is retried and counts against the breaker."""
+        generator = MagicMock()
+        generator.run.side_effect = [
+            openai_status_error(429),
+            {"replies": ["{}"], "meta": [{}]},
+        ]
+
+        result = ResilientGenerator(generator, NO_DELAY).run(prompt="prompt")
+
+        assert result == {"replies": ["{}"], "meta": [{}]}
+        assert generator.run.call_count == 2
+        assert openai_breaker.state == "closed"
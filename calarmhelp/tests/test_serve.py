@@ -0,0 +1,124 @@
+"""Tests for the production runner."""
+
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from unittest.mock import patch
+
+import pytest
+
+from calarmhelp.fakes.googleCalendarServer import create_calendar_app
+from calarmhelp.fakes.server import BackgroundServer
+from calarmhelp.scripts.serve import available_cpus, bind_socket, cgroup_cpu_quota
+
+
+def write_cgroup(root, files: dict[str, str]):
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+class TestWorkerCount:
+    """Tests for choosing the worker count from the available CPUs."""
+
+    @pytest.mark.parametrize(
+        "files, quota",
+        [
+            ({"cpu.max": "150000 100000\n"}, 1.5),
+            ({"cpu.max": "max 100000\n"}, None),
+            (
+                {
+                    "cpu/cpu.cfs_quota_us": "200000\n",
+                    "cpu/cpu.cfs_period_us": "100000\n",
+                },
+                2.0,
+            ),
+            (
+                {
+                    "cpu/cpu.cfs_quota_us": "-1\n",
+                    "cpu/cpu.cfs_period_us": "100000\n",
+                },
+                None,
+            ),
+            ({}, None),
+        ],
+    )
+    def test_cgroup_cpu_quota(self, tmp_path, files, quota):
+        """Test that cgroup v2 and v1 quotas are read, and a missing quota is None."""
+        write_cgroup(tmp_path, files)
+
+        assert cgroup_cpu_quota(str(tmp_path)) == quota
+
+    def test_available_cpus_capped_by_quota(self, tmp_path):
+        """Test that a fractional quota rounds up, and the CPU affinity caps the quota."""
+        write_cgroup(tmp_path, {"cpu.max": "150000 100000\n"})
+
+        with patch("os.sched_getaffinity", return_value={0, 1, 2, 3}, create=True):
+            assert available_cpus(str(tmp_path)) == 2
+        with patch("os.sched_getaffinity", return_value={0}, create=True):
+            assert available_cpus(str(tmp_path)) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="The workers are forked")
+class TestServe:
+    """End to end tests for serving with several workers."""
+
+    def test_workers_warm_up_and_shut_down_gracefully(self):
+        """Test that workers report ready after the warmup and exit cleanly on SIGTERM."""
+        with bind_socket("127.0.0.1", 0) as sock:
+            port = sock.getsockname()[1]
+
+        with BackgroundServer(create_calendar_app()) as calendar_server:
+            process = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "calarmhelp.scripts.serve",
+                    "--host",
+                    "127.0.0.1",
+                    "--port",
+                    str(port),
+                    "--workers",
+                    "2",
+                    "--drain-timeout",
+                    "5",
+                ],
+                env={
+                    **os.environ,
+                    "ORIGINS": "http://localhost",
+                    "OPENAI_API_KEY": "fake",
+                    "STARTUP_WARMUP": "background",
+                    "GOOGLE_CALENDAR_ROOT_URL": f"{calendar_server.url}/",
+                    "CALENDAR_ID": "primary",
+                },
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+            )
+
+            try:
+                deadline = time.monotonic() + 30
+                status = None
+                while status != 200 and time.monotonic() < deadline:
+                    try:
+                        with urllib.request.urlopen(
+                            f"http://127.0.0.1:{port}/ready", timeout=5
+                        ) as response:
+                            status = response.status
+                    except OSError:
+                        time.sleep(0.1)
+
+                process.send_signal(signal.SIGTERM)
+                output, _ = process.communicate(timeout=30)
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.communicate()
+
+        assert status == 200, output
+        assert process.returncode == 0, output
+        assert output.count("Application shutdown complete") == 2
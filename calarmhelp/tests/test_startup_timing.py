@@ -0,0 +1,73 @@
+"""Tests for the cold start timing script and the imports it guards."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from calarmhelp.scripts.startup_timing import package_breakdown, parse_importtime
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     haystack.core
+import time:       300 |        420 |   haystack
+import time:        50 |         50 |   calarmhelp.services.metrics
+import time:       200 |        670 | calarmhelp.main
+"""
+
+
+class TestStartupTiming:
+    """Tests for the startup timing report."""
+
+    def test_parse_importtime(self):
+        """Test that each module's nesting and self and cumulative times are read."""
+        imports = parse_importtime(IMPORTTIME_OUTPUT)
+
+        assert [entry["module"] for entry in imports] == [
+            "haystack.core",
+            "haystack",
+            "calarmhelp.services.metrics",
+            "calarmhelp.main",
+        ]
+        assert [entry["depth"] for entry in imports] == [2, 1, 1, 0]
+        assert imports[-1]["self_seconds"] == 200e-6
+        assert imports[-1]["cumulative_seconds"] == 670e-6
+
+    def test_package_breakdown(self):
+        """Test that self times are summed per top level package, slowest first."""
+        packages = package_breakdown(parse_importtime(IMPORTTIME_OUTPUT))
+
+        assert list(packages) == ["haystack", "calarmhelp"]
+        assert packages["haystack"] == pytest.approx(420e-6)
+        assert packages["calarmhelp"] == pytest.approx(250e-6)
+
+    def test_main_defers_heavy_imports(self):
+        """Test that importing calarmhelp.main leaves Haystack, OpenAI and the Google clients to the warmup."""
+        heavy = [
+            "haystack",
+            "haystack_integrations",
+            "openai",
+            "langfuse",
+            "googleapiclient.discovery",
+            "google.oauth2.service_account",
+        ]
+        completed = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import json, sys; import calarmhelp.main; "
+                f"print(json.dumps([m for m in {heavy!r} if m in sys.modules]))",
+            ],
+            env={
+                **os.environ,
+                "ORIGINS": "http://localhost",
+                "OPENAI_API_KEY": "fake",
+            },
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        assert json.loads(completed.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,226 @@
+"""Tests for sampled, background exported pipeline traces."""
+
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from haystack import Pipeline, component, tracing
+
+from calarmhelp.services.metrics import TRACES
+from calarmhelp.services.traceExporter import (
+    LangfuseSink,
+    RecordedSpan,
+    TraceExporter,
+    TraceRecord,
+    TraceRecorder,
+)
+
+
+@component
+class Echo:
+    """Pipeline component standing in for a generator."""
+
+    @component.output_types(replies=list[str], meta=list[dict])
+    def run(self, prompt: str):
+        if prompt == "fail":
+            raise ValueError("no reply")
+        return {"replies": [prompt], "meta": [{"model": "gpt-test"}]}
+
+
+def make_recorder(**kwargs) -> tuple[TraceRecorder, list[TraceRecord]]:
+    exported: list[TraceRecord] = []
+    exporter = TraceExporter(lambda: exported.append, **kwargs)
+    return TraceRecorder(exporter), exported
+
+
+@pytest.fixture
+def install():
+    """Installs a recorder as the Haystack tracer for the test."""
+    previous = tracing.tracer.actual_tracer
+
+    def install(recorder: TraceRecorder):
+        tracing.enable_tracing(recorder)
+
+    yield install
+    tracing.enable_tracing(previous)
+
+
+def echo_pipeline() -> Pipeline:
+    pipeline = Pipeline()
+    pipeline.add_component("generator", Echo())
+    return pipeline
+
+
+class TestTraceRecorder:
+    """Tests for recording and sampling pipeline runs."""
+
+    def test_records_pipeline_spans(self, install):
+        """Test that component spans are recorded under the pipeline span and exported."""
+        recorder, exported = make_recorder(sample_rate=1.0)
+        install(recorder)
+
+        with recorder.record("run", input="hello") as trace:
+            echo_pipeline().run({"generator": {"prompt": "hello"}})
+            trace.output = "done"
+
+        assert recorder.exporter.flush()
+        assert exported == [trace]
+        pipeline_span, component_span = trace.spans
+        assert pipeline_span.parent is None
+        assert component_span.parent == 0
+        assert component_span.name == "generator"
+        assert component_span.is_generation
+        assert pipeline_span.start <= component_span.start <= component_span.end
+        assert trace.sampled and trace.error is None
+
+    def test_spans_outside_record_are_delegated(self, install):
+        """Test that runs outside `record` go to the previous tracer and are not recorded."""
+        inner = MagicMock()
+        recorder, exported = make_recorder()
+        recorder.tracer = inner
+        install(recorder)
+
+        echo_pipeline().run({"generator": {"prompt": "hello"}})
+
+        assert inner.trace.call_count == 2
+        assert exported == []
+
+    def test_unsampled_runs_are_exported_on_error(self, install):
+        """Test that sampled out runs are only exported when they fail."""
+        recorder, exported = make_recorder(sample_rate=0.0, trace_errors=True)
+        install(recorder)
+        sampled_out = TRACES.value(result="sampled_out")
+
+        with recorder.record("ok"):
+            echo_pipeline().run({"generator": {"prompt": "hello"}})
+        with pytest.raises(Exception):
+            with recorder.record("failed"):
+                echo_pipeline().run({"generator": {"prompt": "fail"}})
+
+        assert recorder.exporter.flush()
+        assert [trace.name for trace in exported] == ["failed"]
+        assert "ValueError" in exported[0].spans[-1].error
+        assert not exported[0].sampled
+        assert TRACES.value(result="sampled_out") == sampled_out + 1
+
+    def test_returned_errors_are_exported(self):
+        """Test that an error set by the caller counts as a failed run."""
+        recorder, exported = make_recorder(sample_rate=0.0, trace_errors=True)
+
+        with recorder.record("failed") as trace:
+            trace.error = "Error in Google Calendar Service"
+
+        assert recorder.exporter.flush()
+        assert exported == [trace]
+
+    def test_nothing_is_recorded_when_sampled_out(self, install):
+        """Test that no trace is built when neither sampling nor error tracing applies."""
+        recorder, exported = make_recorder(sample_rate=0.0, trace_errors=False)
+        install(recorder)
+
+        with recorder.record("run") as trace:
+            echo_pipeline().run({"generator": {"prompt": "hello"}})
+
+        assert trace is None
+        assert exported == []
+
+
+class TestTraceExporter:
+    """Tests for the background export queue."""
+
+    def test_full_queue_drops_without_blocking(self):
+        """Test that traces are dropped rather than waiting for a stuck export."""
+        release = threading.Event()
+        exported = []
+
+        def sink(trace):
+            release.wait(5)
+            exported.append(trace)
+
+        exporter = TraceExporter(lambda: sink, sample_rate=1.0, queue_size=1)
+        dropped = TRACES.value(result="dropped")
+        traces = [TraceRecord(name=str(n), start=0.0, sampled=True) for n in range(4)]
+
+        # The export thread holds at most one trace, the queue one more
+        for trace in traces:
+            exporter.submit(trace)
+
+        assert TRACES.value(result="dropped") >= dropped + 2
+        release.set()
+        assert exporter.flush()
+        assert exported[0] is traces[0]
+
+    def test_sink_errors_are_counted(self):
+        """Test that a failing sink does not stop the export thread."""
+        sink = MagicMock(side_effect=[RuntimeError("down"), None])
+        exporter = TraceExporter(lambda: sink, sample_rate=1.0)
+        failed = TRACES.value(result="failed")
+
+        exporter.submit(TraceRecord(name="first", start=0.0, sampled=True))
+        exporter.submit(TraceRecord(name="second", start=0.0, sampled=True))
+
+        assert exporter.flush()
+        assert sink.call_count == 2
+        assert TRACES.value(result="failed") == failed + 1
+
+    def test_close_flushes_the_sink(self):
+        """Test that closing drains the queue and flushes the sink."""
+        sink = MagicMock()
+        exporter = TraceExporter(lambda: sink, sample_rate=1.0)
+        exporter.submit(TraceRecord(name="run", start=0.0, sampled=True))
+
+        exporter.close()
+
+        sink.assert_called_once()
+        sink.flush.assert_called_once()
+
+
+class TestLangfuseSink:
+    """Tests for sending recorded traces to Langfuse."""
+
+    def test_sends_spans_and_generations(self):
+        """Test that spans keep their nesting and timings, and LLM calls become generations."""
+        trace = TraceRecord(
+            name="Calendar Alarm Service",
+            start=1.0,
+            end=3.0,
+            sampled=False,
+            error="Error in Google Calendar Service",
+        )
+        trace.spans = [
+            RecordedSpan(
+                operation="haystack.pipeline.run",
+                tags={},
+                parent=None,
+                start=1.0,
+                end=3.0,
+            ),
+            RecordedSpan(
+                operation="haystack.component.run",
+                tags={
+                    "haystack.component.name": "generator",
+                    "haystack.component.output_spec": {"replies": {}, "meta": {}},
+                },
+                parent=0,
+                start=1.5,
+                end=2.5,
+                output={
+                    "replies": ["{}"],
+                    "meta": [{"model": "gpt-test", "usage": {"prompt_tokens": 3}}],
+                },
+            ),
+        ]
+
+        with patch("calarmhelp.services.traceExporter.Langfuse") as mock_langfuse:
+            LangfuseSink()(trace)
+
+        client = mock_langfuse.return_value
+        assert client.trace.call_args.kwargs["tags"] == ["error"]
+        pipeline_span = client.trace.return_value.span
+        assert pipeline_span.call_args.kwargs["name"] == "haystack.pipeline.run"
+        generation = pipeline_span.return_value.generation.call_args.kwargs
+        assert generation["name"] == "generator"
+        assert generation["model"] == "gpt-test"
+        assert generation["usage"] == {"prompt_tokens": 3}
+        assert generation["start_time"].timestamp() == 1.5
+        assert generation["end_time"].timestamp() == 2.5
@@ -1,10 +1,15 @@
 """Tests for utility models and functions."""
 
+import dataclasses
 import json
 from datetime import datetime
 import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
 
 from calarmhelp.services.util.util import (
+    AlarmBatchResult,
     CreateAlarmRequest,
     Category,
     CalendarAlarmResponse,
@@ -47,6 +52,68 @@ class TestCalendarAlarmResponse:
             parsed_json = json.loads(model_json)
             assert parsed_json["name"] == "Test Event"
 
+    @pytest.mark.parametrize(
+        "rule, expected",
+        [
+            (
+                "RRULE:FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+                "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+            ),
+            (
+                "freq=monthly;bymonthday=-1;count=12",
+                "FREQ=MONTHLY;BYMONTHDAY=-1;COUNT=12",
+            ),
+            ("FREQ=DAILY;UNTIL=20241231T235959Z;", "FREQ=DAILY;UNTIL=20241231T235959Z"),
+            ("", None),
+            (None, None),
+        ],
+    )
+    def test_recurrence_is_normalized(
+        self, sample_calendar_alarm_response, rule, expected
+    ):
+        """Test that a recurrence is kept as an upper case RRULE without its prefix."""
+        data = {**sample_calendar_alarm_response.model_dump(), "recurrence": rule}
+
+        assert CalendarAlarmResponse(**data).recurrence == expected
+
+    @pytest.mark.parametrize(
+        "rule",
+        [
+            "BYDAY=MO",
+            "FREQ=HOURLY",
+            "FREQ=WEEKLY;BYDAY=MONDAY",
+            "FREQ=DAILY;COUNT=5;UNTIL=20241231",
+            "FREQ=DAILY;FREQ=WEEKLY",
+            "FREQ=DAILY;EXDATE=20241225",
+        ],
+    )
+    def test_invalid_recurrence_is_rejected(self, sample_calendar_alarm_response, rule):
+        """Test that a rule Google Calendar would refuse fails validation, so the LLM retries."""
+        data = {**sample_calendar_alarm_response.model_dump(), "recurrence": rule}
+
+        with pytest.raises(ValidationError, match="RRULE"):
+            CalendarAlarmResponse(**data)
+
+    @pytest.mark.parametrize(
+        "name, location", [('Call "Zoë" \\ Ana', "Café\n2F"), ("Test Event", None)]
+    )
+    def test_to_json_bytes_matches_json_response(
+        self, sample_calendar_alarm_response, name, location
+    ):
+        """Test that the fast serialization renders the bytes FastAPI renders for `to_dict`."""
+        alarm = sample_calendar_alarm_response.model_copy(
+            update={
+                "name": name,
+                "location": location,
+                "recurrence": location and "FREQ=DAILY",
+            }
+        )
+
+        assert (
+            alarm.to_json_bytes()
+            == JSONResponse(jsonable_encoder(alarm.to_dict())).body
+        )
+
 
 class TestGoogleCalendarInfoInput:
     """Tests for the GoogleCalendarInfoInput model."""
@@ -62,6 +129,14 @@ class TestGoogleCalendarInfoInput:
             parsed_json = json.loads(model_json)
             assert parsed_json["response"] == "Test response"
 
+    def test_to_json_bytes_matches_json_response(
+        self, sample_google_calendar_info_input
+    ):
+        """Test that the fast serialization renders the bytes FastAPI renders for `to_dict`."""
+        info = sample_google_calendar_info_input
+
+        assert info.to_json_bytes() == JSONResponse(info.to_dict()).body
+
 
 class TestGoogleCalendarResponse:
     """Tests for the GoogleCalendarResponse model."""
@@ -85,3 +160,41 @@ class TestGoogleCalendarResponse:
         model_dict = response.to_dict()
         assert model_dict["error"] == "Failed to create event"
         assert model_dict["success"] is None
+
+    def test_google_calendar_response_is_typed(self):
+        """Test that only `success` and `error` exist, and results cannot be changed once shared."""
+        response = GoogleCalendarResponse(success="Event Created")
+
+        with pytest.raises(TypeError):
+            GoogleCalendarResponse(success="Event Created", event_id="abc123")
+        with pytest.raises(KeyError):
+            response["event_id"]
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            response.error = "Failed to create event"
+
+    def test_to_json_bytes_matches_json_response(self):
+        """Test that the fast serialization renders the bytes FastAPI renders for `to_dict`."""
+        for response in (
+            GoogleCalendarResponse(success="Event Created"),
+            GoogleCalendarResponse(error='Calendar "work" not found'),
+        ):
+            assert response.to_json_bytes() == JSONResponse(response.to_dict()).body
+            assert response.to_json() == response.to_json_bytes().decode()
+
+
+class TestAlarmBatchResult:
+    """Tests for the `/create_alarms` result."""
+
+    def test_to_json_bytes_matches_json_response(
+        self, sample_google_calendar_info_input
+    ):
+        """Test that alarms and errors are rendered in input order, as FastAPI renders `to_dict`."""
+        batch = AlarmBatchResult(
+            [
+                sample_google_calendar_info_input,
+                GoogleCalendarResponse(error="Calendar not found"),
+            ]
+        )
+
+        assert batch.to_json_bytes() == JSONResponse(batch.to_dict()).body
+        assert AlarmBatchResult([]).to_json_bytes() == b'{"results":[]}'